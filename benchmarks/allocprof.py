@@ -0,0 +1,44 @@
+"""
+Coût du profil des allocations (MiniZamVM.enable_allocation_profiling) sur les
+programmes synthétiques de benchmarks.workloads : temps d'exécution du programme
+optimisé, sans puis avec profil, surcoût, nombre d'allocations profilées et site qui
+alloue le plus d'octets.
+
+    python -m benchmarks.allocprof [n] [repeat]
+"""
+
+import sys
+
+from src.minizam.vm.vm import MiniZamVM
+from .common import timeit_interleaved
+from .workloads import WORKLOADS
+
+
+def _load(text, profiled):
+    vm = MiniZamVM()
+    vm.load_text(text)
+    vm.optimize()
+    profiler = vm.enable_allocation_profiling() if profiled else None
+    return vm, profiler
+
+
+def main(argv):
+    n = int(argv[0]) if argv else 300
+    repeat = int(argv[1]) if len(argv) > 1 else 3
+    print("%-12s %12s %12s %9s %12s  %s" % ("programme", "sans (ms)", "profil (ms)", "surcoût",
+                                            "allocations", "premier site"))
+    for name, workload in sorted(WORKLOADS.items()):
+        text = workload(n)
+        plain, profiled = timeit_interleaved([lambda: _load(text, False)[0].run(),
+                                              lambda: _load(text, True)[0].run()], repeat)
+        vm, profiler = _load(text, True)
+        vm.run()
+        top = profiler.top(1)
+        site = "%s %s" % (profiler.name(top[0].pc), top[0].command) if top else "-"
+        print("%-12s %12.2f %12.2f %8.1f%% %12d  %s" % (name, plain * 1e3, profiled * 1e3,
+                                                        (profiled / plain - 1) * 100, profiler.allocations,
+                                                        site))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
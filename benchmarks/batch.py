@@ -0,0 +1,71 @@
+"""
+Exécution par lots (batch.run_batch) d'un programme de tests/ sur N entrées tirées
+au hasard, comparée à N exécutions séquentielles du même programme.
+
+Les exécutions séquentielles coûtent à peu près le même temps par entrée : au-delà de
+--sample entrées, leur temps est extrapolé à partir d'un échantillon (marqué ~).
+Requiert NumPy.
+
+    python -m benchmarks.batch [--sizes 1000,10000,100000,1000000] [--sample 2000]
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from src.minizam.vm.batch import np, run_batch, BatchRunner
+from src.minizam.vm.vm import MiniZamVM
+from .common import program_path
+
+# programme, opérande du CONST qui reçoit l'entrée, entrées possibles
+WORKLOADS = [("rec_funs/facto.txt", 5, range(0, 21)),
+             ("appterm/facto_tailrec.txt", 20, range(0, 21)),
+             ("rec_funs/fibo.txt", 8, range(0, 13))]
+
+
+def sequential(vm, inputs, placeholder):
+    """
+    :return: le temps d'exécution séquentielle des entrées, sur des machines neuves
+    """
+
+    runner = BatchRunner(vm, inputs[:1], placeholder)
+    start = time.perf_counter()
+    for value in inputs:
+        runner.sequential(int(value))
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000", help="nombres d'entrées N")
+    parser.add_argument("--sample", type=int, default=2000,
+                        help="nombre maximal d'entrées exécutées séquentiellement")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    if np is None:
+        print("numpy is not installed")
+        return 1
+
+    rng = random.Random(args.seed)
+    print("%-28s %9s %12s %12s %9s %7s %8s" % ("programme", "N", "séquentiel", "lot (s)", "gain",
+                                               "warps", "rejetées"))
+    for name, placeholder, domain in WORKLOADS:
+        vm = MiniZamVM()
+        vm.load_file(program_path(name))
+        for size in [int(n) for n in args.sizes.split(",")]:
+            inputs = [rng.choice(domain) for _ in range(size)]
+            start = time.perf_counter()
+            result = run_batch(vm, inputs, placeholder)
+            batched = time.perf_counter() - start
+
+            sample = min(size, args.sample)
+            elapsed = sequential(vm, inputs[:sample], placeholder) * size / sample
+            estimate = "~" if sample < size else " "
+            print("%-28s %9d %11.3f%s %12.3f %8.1fx %7d %8d"
+                  % (name, size, elapsed, estimate, batched, elapsed / batched, result.stats["warps"],
+                     result.stats["ejected"]))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
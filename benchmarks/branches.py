@@ -0,0 +1,53 @@
+"""
+Benchmark des branchements fusionnés (BEQ, BNEQ, BLT, ... et leurs variantes
+immédiates) sur fibo et sur des boucles récursives terminales.
+
+Chaque programme est exécuté chargé tel quel puis après MiniZamVM.fuse_branches.
+"""
+
+import sys
+
+from src.minizam.vm.vm import MiniZamVM
+from .common import program_path, run_program, set_const, timeit
+
+# (programme, constante d'entrée d'origine, nouvelle entrée)
+PROGRAMS = [("rec_funs/fibo.txt", 8, 16),
+            ("appterm/facto_tailrec.txt", 20, 2000),
+            ("appterm/fun_appterm.txt", 234, 5000)]
+
+
+class _CountingVM(MiniZamVM):
+    def run(self):
+        self.dispatches = 0
+        self.running = True
+        while self.running:
+            inst = self.prog[self.increment_pc()]
+            self.dispatches += 1
+            self.instructions[inst.command].execute(self, inst.args)
+
+
+def _load(path, old, new, fused):
+    vm = MiniZamVM()
+    vm.load_file(program_path(path))
+    set_const(vm.prog, old, new)
+    vm.merge_tail_calls()
+    count = vm.fuse_branches() if fused else 0
+    return vm.prog, count
+
+
+def main(argv):
+    sys.setrecursionlimit(10000)
+    for path, old, new in PROGRAMS:
+        results = []
+        for fused in (False, True):
+            prog, count = _load(path, old, new, fused)
+            dispatches = run_program(prog, _CountingVM).dispatches
+            best = timeit(lambda: run_program(prog), 3)
+            results.append((count, dispatches, best))
+        (_, d0, t0), (count, d1, t1) = results
+        print("%-28s n=%-5d %d branchements fusionnés, %d -> %d instructions, %.1f -> %.1f ms (x%.2f)"
+              % (path, new, count, d0, d1, t0 * 1e3, t1 * 1e3, t0 / t1))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,74 @@
+"""
+Micro-benchmark de la convention d'appel (APPLY, APPTERM, RETURN) selon l'arité.
+
+Pour chaque arité k, une boucle de n tours applique à k constantes une fonction g
+qui passe ses k arguments par APPTERM à une fonction f, laquelle rend son premier
+argument par RETURN k : chaque tour exécute un APPLY k, un APPTERM k, 2k et un
+RETURN k, plus l'APPTERM 1, 2 de la boucle.
+
+    python -m benchmarks.call_frames [n] [repeat]
+"""
+
+import sys
+
+from src.minizam.vm.vm import MiniZamVM
+from .common import timeit
+
+ARITIES = [1, 2, 4, 8, 16]
+CALLS_PER_TURN = 4
+
+
+def _function(label, k, body):
+    """
+    :return: les lignes d'une fonction d'arité k, précédée de RESTART et GRAB si k > 1
+    """
+
+    if k == 1:
+        return ["%s:%s" % (label, body[0])] + body[1:]
+    return ["\tRESTART", "%s:\tGRAB %d" % (label, k - 1)] + body
+
+
+def program(k, n):
+    """
+    :return: le texte du programme d'arité k à n tours, qui s'arrête avec 0 dans acc
+    """
+
+    f = _function("F", k, ["\tACC 0", "\tRETURN %d" % k])
+    g = _function("G", k, ["\tACC %d" % (k - 1), "\tPUSH"] * k + ["\tENVACC 0", "\tAPPTERM %d,%d" % (k, 2 * k)])
+    args = []
+    for j in range(k, 0, -1):
+        args += ["\tCONST %d" % j, "\tPUSH"]
+    loop = ["L:\tACC 0", "\tPUSH", "\tCONST 0", "\tPRIM =", "\tBRANCHIFNOT K", "\tCONST 0", "\tRETURN 1",
+            "K:" + args[0]] + args[1:] \
+        + ["\tENVACC 1", "\tAPPLY %d" % k,
+           "\tCONST 1", "\tPUSH", "\tACC 1", "\tPRIM -", "\tPUSH", "\tOFFSETCLOSURE 0", "\tAPPTERM 1,2"]
+    main = ["M:\tCLOSURE F,0", "\tPUSH", "\tCLOSURE G,1", "\tCLOSUREREC L,1", "\tCONST %d" % n, "\tPUSH",
+            "\tACC 1", "\tAPPLY 1", "\tSTOP"]
+    return "\n".join(["\tBRANCH M"] + f + g + loop + main) + "\n"
+
+
+def bench(k, n, repeat):
+    """
+    :return: le nombre d'appels par seconde à l'arité k
+    """
+
+    text = program(k, n)
+
+    def run():
+        vm = MiniZamVM()
+        vm.load_text(text)
+        vm.run()
+
+    return CALLS_PER_TURN * n / timeit(run, repeat)
+
+
+def main(argv):
+    n = int(argv[0]) if argv else 20000
+    repeat = int(argv[1]) if len(argv) > 1 else 3
+    print("%6s %14s" % ("arité", "appels/s"))
+    for k in ARITIES:
+        print("%6d %14.0f" % (k, bench(k, n, repeat)))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
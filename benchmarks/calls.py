@@ -0,0 +1,56 @@
+"""
+Micro-benchmark du nombre d'appels de fonctions par seconde.
+
+Mesure les programmes de tests/n-ary_funs : application unaire (grab1),
+n-aire exacte (grab2), partielle (grab3) et sur-application (grab4).
+"""
+
+import sys
+
+from src.minizam.vm.vm import MiniZamVM
+from .common import load_program, program_path, run_program, timeit
+
+PROGRAMS = [("unaire", "n-ary_funs/grab1.txt"),
+            ("n-aire", "n-ary_funs/grab2.txt"),
+            ("partielle", "n-ary_funs/grab3.txt"),
+            ("sur-application", "n-ary_funs/grab4.txt")]
+
+CALLS = ("APPLY", "APPTERM")
+
+
+class _CountingVM(MiniZamVM):
+    """
+    Machine qui compte les appels exécutés, utilisée une seule fois par programme
+    """
+
+    def run(self):
+        self.calls = 0
+        self.running = True
+        while self.running:
+            inst = self.prog[self.increment_pc()]
+            if inst.command in CALLS:
+                self.calls += 1
+            self.instructions[inst.command].execute(self, inst.args)
+
+
+def bench(name, path, runs=2000, repeat=5):
+    prog = load_program(program_path(path))
+    calls = run_program(prog, _CountingVM).calls
+
+    def loop():
+        for _ in range(runs):
+            run_program(prog)
+
+    best = timeit(loop, repeat)
+    print("%-16s %-24s %6d appels/exécution %12.0f appels/s"
+          % (name, path, calls, calls * runs / best))
+
+
+def main(argv):
+    runs = int(argv[0]) if argv else 2000
+    for name, path in PROGRAMS:
+        bench(name, path, runs)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,110 @@
+"""
+Benchmark des opérations sur les fermetures et de leurs allocations.
+
+Pour chaque opération (CLOSURE, CLOSUREREC, GRAB partiel, RESTART) on mesure :
+  - le temps par opération,
+  - le nombre de blocs mémoire retenus par opération (sys.getallocatedblocks),
+  - le pic d'octets transitoires par opération (tracemalloc), qui compte les
+    copies intermédiaires libérées aussitôt.
+Puis on chronomètre des programmes curryfiés de tests/.
+"""
+
+import sys
+import time
+import tracemalloc
+
+from src.minizam.vm.vm import MiniZamVM, LineInstruction
+from src.minizam.vm.mlvalue import MLValue
+from .common import load_program, program_path, run_program, timeit
+
+PROGRAMS = ["n-ary_funs/grab3.txt", "n-ary_funs/grab4.txt", "unary_funs/fun5.txt"]
+
+STACK_DEPTH = 64
+
+
+def _prepare_vm():
+    vm = MiniZamVM()
+    lines = [("", "CONST", "0"), ("R", "RESTART", ""), ("L", "GRAB", "3"), ("", "STOP", "")]
+    vm.prog = list(map(LineInstruction.build, lines))
+    vm.push(list(map(MLValue.from_int, range(STACK_DEPTH))))
+    vm.acc = MLValue.from_int(42)
+    vm.env = (MLValue.from_int(1),)
+    return vm
+
+
+def _closure(vm):
+    MiniZamVM.instructions["CLOSURE"].execute(vm, ["L", 3])
+    result = vm.acc
+    vm.push([MLValue.from_int(0), MLValue.from_int(0)])
+    return result
+
+
+def _closurerec(vm):
+    MiniZamVM.instructions["CLOSUREREC"].execute(vm, ["L", 3])
+    result = vm.acc
+    vm.pop()
+    vm.push([MLValue.from_int(0), MLValue.from_int(0)])
+    return result
+
+
+def _grab(vm):
+    vm.push([MLValue.from_int(1), 0, vm.env, 0])
+    vm.extra_args = 0
+    vm.pc = 3
+    MiniZamVM.instructions["GRAB"].execute(vm, 3)
+    return vm.acc
+
+
+def _restart(vm):
+    vm.env = (vm.env, MLValue.from_int(1), MLValue.from_int(2), MLValue.from_int(3))
+    MiniZamVM.instructions["RESTART"].execute(vm, None)
+    vm.pop(3)
+    return vm.env
+
+
+OPERATIONS = [("CLOSURE L,3", _closure), ("CLOSUREREC L,3", _closurerec),
+              ("GRAB partiel", _grab), ("RESTART", _restart)]
+
+
+def measure(op, count=20000):
+    vm = _prepare_vm()
+    op(vm)
+
+    start = time.perf_counter()
+    for _ in range(count):
+        op(vm)
+    elapsed = time.perf_counter() - start
+
+    kept = []
+    before = sys.getallocatedblocks()
+    for _ in range(count):
+        kept.append(op(vm))
+    retained = (sys.getallocatedblocks() - before) / count
+
+    tracemalloc.start()
+    op(vm)
+    tracemalloc.reset_peak()
+    current, _ = tracemalloc.get_traced_memory()
+    op(vm)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed / count * 1e9, retained, peak - current
+
+
+def main(argv):
+    print("%-16s %10s %16s %18s" % ("opération", "ns/op", "blocs retenus/op", "octets transitoires"))
+    for name, op in OPERATIONS:
+        ns, retained, transient = measure(op)
+        print("%-16s %10.0f %16.1f %18d" % (name, ns, retained, transient))
+
+    print()
+    runs = int(argv[0]) if argv else 2000
+    for path in PROGRAMS:
+        prog = load_program(program_path(path))
+        best = timeit(lambda: [run_program(prog) for _ in range(runs)], 5)
+        print("%-24s %8.1f µs/exécution" % (path, best / runs * 1e6))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
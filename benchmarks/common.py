@@ -0,0 +1,99 @@
+"""
+Outils partagés par les benchmarks de la machine Mini-ZAM.
+
+Les benchmarks se lancent depuis la racine du dépôt, par exemple :
+
+    python -m benchmarks.calls
+"""
+
+import os
+import time
+
+from src.minizam.vm.vm import MiniZamVM
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TESTS = os.path.join(ROOT, "tests")
+
+
+def program_path(name):
+    """
+    Renvoie le chemin d'un programme de tests/ à partir de son nom relatif
+
+    :param name: par exemple "n-ary_funs/grab3.txt"
+    """
+
+    return os.path.join(TESTS, name)
+
+
+def load_program(path, optimized=False):
+    """
+    Charge un programme une seule fois et renvoie ses instructions
+
+    :param path: chemin du fichier .txt
+    :param optimized: utilise load_file_optimized
+    """
+
+    vm = MiniZamVM()
+    if optimized:
+        vm.load_file_optimized(path)
+    else:
+        vm.load_file(path)
+    return vm.prog
+
+
+def set_const(prog, old, new):
+    """
+    Remplace l'opérande des instructions CONST old par new, pour agrandir
+    l'entrée d'un programme de tests/
+
+    :return: le programme modifié
+    """
+
+    for inst in prog:
+        if inst.command == "CONST" and inst.args == old:
+            inst.args = new
+    return prog
+
+
+def run_program(prog, vm_class=MiniZamVM):
+    """
+    Exécute un programme déjà chargé sur une machine neuve
+
+    :return: la machine après exécution
+    """
+
+    vm = vm_class()
+    vm.prog = prog
+    vm.run()
+    return vm
+
+
+def timeit(fn, repeat):
+    """
+    Renvoie le meilleur temps (en secondes) de repeat appels à fn
+    """
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def timeit_interleaved(fns, repeat):
+    """
+    Renvoie le meilleur temps de chaque fonction de fns en alternant leurs
+    exécutions, pour que les variations de charge de la machine les touchent
+    toutes de la même façon
+    """
+
+    best = [None] * len(fns)
+    for _ in range(repeat):
+        for i, fn in enumerate(fns):
+            elapsed = timeit(fn, 1)
+            if best[i] is None or elapsed < best[i]:
+                best[i] = elapsed
+    return best
@@ -0,0 +1,156 @@
+"""
+Banc différentiel : exécute les programmes de tests/, les programmes synthétiques
+(benchmarks.workloads) et des programmes aléatoires (benchmarks.random_programs)
+sur tous les moteurs de benchmarks.engines, compare
+l'accumulateur final, le statut et la sortie de chaque moteur à ceux du moteur
+"plain", et mesure pour chacun le débit (instructions par seconde), le pic de
+mémoire et le temps de démarrage (chargement et passes d'optimisation).
+
+Le débit est calculé avec le nombre d'instructions du programme non optimisé,
+pour que les moteurs qui en exécutent moins soient comparables.
+
+    python -m benchmarks.differential --random 200 --report differential.json
+
+Le code de sortie vaut 1 si au moins un moteur diverge.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from benchmarks.common import TESTS, timeit
+from benchmarks.engines import ENGINES, count_instructions
+from benchmarks.random_programs import generate
+from benchmarks.workloads import WORKLOADS
+
+
+def outcome(engine, text):
+    """
+    Exécute text sur engine
+
+    :return: le résultat observable de l'exécution : statut, accumulateur et sortie,
+        ou le type de l'exception levée par la machine
+    """
+
+    try:
+        result = engine.execute(engine.load(text))
+    except Exception as e:
+        return {"status": "error", "error": type(e).__name__}
+    return {"status": result.status, "acc": str(result.acc), "output": result.output}
+
+
+def peak_memory(engine, text):
+    """
+    :return: le pic d'allocations (en octets) du chargement et de l'exécution de text
+    """
+
+    tracemalloc.start()
+    try:
+        outcome(engine, text)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(engine, text, instructions, repeat):
+    """
+    :return: les mesures de engine sur text
+    """
+
+    startup = timeit(lambda: engine.load(text), repeat)
+
+    def run():
+        vm = engine.load(text)
+        start = time.perf_counter()
+        try:
+            engine.execute(vm)
+        except Exception:
+            pass
+        timings.append(time.perf_counter() - start)
+
+    timings = []
+    for _ in range(repeat):
+        run()
+    elapsed = min(timings)
+    return {"startup_s": startup, "run_s": elapsed,
+            "instructions_per_s": instructions / elapsed if instructions and elapsed else None,
+            "peak_memory_bytes": peak_memory(engine, text)}
+
+
+def check(name, text, engines, repeat):
+    """
+    Compare les moteurs sur le programme text
+
+    :return: l'entrée du rapport pour ce programme
+    """
+
+    instructions = count_instructions(text)
+    reference = outcome(ENGINES["plain"], text)
+    entry = {"name": name, "instructions": instructions, "reference": reference, "engines": {}}
+    for engine_name in engines:
+        engine = ENGINES[engine_name]
+        result = outcome(engine, text)
+        record = {"agrees": result == reference}
+        if not record["agrees"]:
+            record["outcome"] = result
+        if repeat:
+            record.update(measure(engine, text, instructions, repeat))
+        entry["engines"][engine_name] = record
+    return entry
+
+
+def programs(random_count, seed, size, workload_size):
+    """
+    :return: les couples (nom, texte) des programmes de tests/, des programmes synthétiques
+        de benchmarks.workloads puis des programmes aléatoires
+    """
+
+    for path in sorted(glob.glob(os.path.join(TESTS, "**", "*.txt"), recursive=True)):
+        with open(path) as f:
+            yield os.path.relpath(path, TESTS), f.read()
+    if workload_size:
+        for name, workload in sorted(WORKLOADS.items()):
+            yield "workload:%s:%d" % (name, workload_size), workload(workload_size)
+    for i in range(random_count):
+        yield "random:%d" % (seed + i), generate(seed + i, size)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--random", type=int, default=100, help="nombre de programmes aléatoires")
+    parser.add_argument("--seed", type=int, default=0, help="graine du premier programme aléatoire")
+    parser.add_argument("--size", type=int, default=4, help="profondeur des programmes aléatoires")
+    parser.add_argument("--workload-size", type=int, default=50,
+                        help="taille des programmes synthétiques (0 : aucun)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="nombre de mesures par moteur (0 : comparaison seule)")
+    parser.add_argument("--engines", default=",".join(ENGINES), help="moteurs comparés, séparés par des virgules")
+    parser.add_argument("--report", default="differential_report.json", help="fichier du rapport JSON")
+    args = parser.parse_args(argv)
+
+    engines = args.engines.split(",")
+    report = {"engines": engines, "programs": [], "mismatches": []}
+    for name, text in programs(args.random, args.seed, args.size, args.workload_size):
+        entry = check(name, text, engines, args.repeat)
+        report["programs"].append(entry)
+        for engine_name, record in entry["engines"].items():
+            if not record["agrees"]:
+                report["mismatches"].append({"program": name, "engine": engine_name,
+                                             "expected": entry["reference"], "got": record["outcome"],
+                                             "listing": text})
+                print("divergence : %s sur %s" % (engine_name, name))
+
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print("%d programmes, %d moteurs, %d divergences, rapport : %s"
+          % (len(report["programs"]), len(engines), len(report["mismatches"]), args.report))
+    return 1 if report["mismatches"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+"""
+Moteurs d'exécution comparés par le banc différentiel (benchmarks.differential).
+
+Un moteur charge un programme à partir de son texte puis l'exécute jusqu'au
+bout ; tous doivent donner le même résultat que le moteur de référence "plain".
+Les moteurs ajoutés par la suite s'enregistrent avec register.
+"""
+
+from src.minizam.vm import batch, snapshot
+from src.minizam.vm.governor import ResourceLimits
+from src.minizam.vm.metrics import MetricsRegistry
+from src.minizam.vm.output import OutputChannel
+from src.minizam.vm.vm import MiniZamVM, RunResult
+
+
+class Engine:
+    """
+    Moteur de référence : le programme tel qu'il est écrit, exécuté d'une traite
+    """
+
+    name = "plain"
+
+    def load(self, text):
+        """
+        :return: une machine chargée avec le programme text, dont la sortie est capturée
+        """
+
+        vm = MiniZamVM(output=OutputChannel("memory"))
+        vm.load_text(text)
+        return vm
+
+    def execute(self, vm):
+        """
+        :return: le RunResult de l'exécution complète de vm
+        """
+
+        return vm.run()
+
+
+class OptimizedEngine(Engine):
+    """
+    Programme transformé par les passes de MiniZamVM.optimize
+    """
+
+    name = "optimized"
+
+    def load(self, text):
+        vm = Engine.load(self, text)
+        vm.optimize()
+        return vm
+
+
+class SlicedEngine(OptimizedEngine):
+    """
+    Exécution par quanta, comme sous l'ordonnanceur
+    """
+
+    name = "sliced"
+    quantum = 61
+
+    def execute(self, vm):
+        result = vm.run(quantum=self.quantum)
+        while result.status == RunResult.RUNNING:
+            result = vm.resume(self.quantum)
+        return result
+
+
+class GovernedEngine(OptimizedEngine):
+    """
+    Exécution sous un gouverneur dont les limites ne sont jamais atteintes
+    """
+
+    name = "governed"
+
+    def execute(self, vm):
+        return vm.run(ResourceLimits(max_instructions=10 ** 12, check_interval=101))
+
+
+class SnapshotEngine(OptimizedEngine):
+    """
+    Exécution interrompue après quantum instructions, puis reprise sur une machine
+    restaurée depuis un snapshot
+    """
+
+    name = "snapshot"
+    quantum = 97
+
+    def execute(self, vm):
+        result = vm.run(quantum=self.quantum)
+        if result.status != RunResult.RUNNING:
+            return result
+        before = vm.output.getvalue()
+        restored = snapshot.loads(snapshot.dumps(vm))
+        restored.output = OutputChannel("memory")
+        result = restored.run()
+        result.output = before + result.output
+        return result
+
+
+class MemoEngine(OptimizedEngine):
+    """
+    Programme optimisé dont les fonctions pures sont mémoïsées
+    """
+
+    name = "memo"
+
+    def load(self, text):
+        vm = OptimizedEngine.load(self, text)
+        vm.enable_memoization()
+        return vm
+
+
+class TraceEngine(OptimizedEngine):
+    """
+    Programme optimisé dont les boucles terminales sont compilées ; le seuil et le
+    nombre de tours par trace sont petits pour exercer l'enregistrement et les sorties
+    """
+
+    name = "trace"
+
+    def load(self, text):
+        vm = OptimizedEngine.load(self, text)
+        vm.enable_tracing(threshold=2, fuel=3)
+        return vm
+
+
+class QuickEngine(OptimizedEngine):
+    """
+    Programme optimisé dont les instructions se spécialisent à leur première exécution
+    """
+
+    name = "quick"
+
+    def load(self, text):
+        vm = OptimizedEngine.load(self, text)
+        vm.enable_quickening()
+        return vm
+
+
+class HashConsEngine(OptimizedEngine):
+    """
+    Programme optimisé dont les blocs sont partagés, s'il ne les modifie jamais
+    """
+
+    name = "hashcons"
+
+    def load(self, text):
+        vm = OptimizedEngine.load(self, text)
+        vm.enable_hash_consing()
+        return vm
+
+
+class AllocationProfileEngine(OptimizedEngine):
+    """
+    Programme optimisé dont les allocations sont profilées, avec un point de la série
+    à chaque allocation
+    """
+
+    name = "allocprof"
+
+    def load(self, text):
+        vm = OptimizedEngine.load(self, text)
+        vm.enable_allocation_profiling(interval=1)
+        return vm
+
+
+class MetricsEngine(SlicedEngine):
+    """
+    Exécution par quanta mesurée (enable_metrics) : les compteurs sont reportés à
+    chaque quantum
+    """
+
+    name = "metrics"
+    quantum = 7
+
+    def load(self, text):
+        vm = SlicedEngine.load(self, text)
+        vm.enable_metrics(MetricsRegistry())
+        return vm
+
+
+class BatchEngine(OptimizedEngine):
+    """
+    Exécution par lots (batch.run_batch) de trois voies dont l'entrée est l'opérande du
+    premier CONST : les voies ne divergent pas, le programme passe par les warps
+    """
+
+    name = "batch"
+    lanes = 3
+
+    def execute(self, vm):
+        consts = [inst.args for inst in vm.prog if inst.command == "CONST"]
+        if not consts:
+            return OptimizedEngine.execute(self, vm)
+        return batch.run_batch(vm, [consts[0]] * self.lanes, consts[0])[0]
+
+
+ENGINES = {}
+
+
+def register(engine):
+    """
+    Ajoute engine aux moteurs comparés
+    """
+
+    ENGINES[engine.name] = engine
+    return engine
+
+
+for _engine in (Engine(), OptimizedEngine(), SlicedEngine(), GovernedEngine(), SnapshotEngine(),
+                MemoEngine(), TraceEngine(), QuickEngine(), HashConsEngine(),
+                AllocationProfileEngine(), MetricsEngine()):
+    register(_engine)
+if batch.np is not None:
+    register(BatchEngine())
+
+
+def count_instructions(text):
+    """
+    :return: le nombre d'instructions exécutées par le programme text non optimisé,
+        None si son exécution échoue
+    """
+
+    vm = Engine().load(text)
+    try:
+        return vm.run(ResourceLimits(max_instructions=10 ** 12)).instructions
+    except Exception:
+        return None
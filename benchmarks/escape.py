@@ -0,0 +1,132 @@
+"""
+Blocs supprimés par l'analyse d'échappement (MiniZamVM.unbox_blocks) sur des fonctions
+récursives qui reçoivent un couple, comme h dans tests/new_test/ocaml1.ml :
+
+    terminale      let rec h (x, y) = if x < 0 then y else h (x - 1, y + 1) in h (n, 0)
+    non terminale  let rec s (x, y) = if x = 0 then y else 1 + s (x - 1, y) in s (n, 0)
+
+Pour chaque programme, optimisé sans puis avec unbox_blocks : les mots alloués
+(heap_words), les couples alloués (deux mots chacun, hors la fermeture) et le meilleur
+temps d'exécution.
+
+    python -m benchmarks.escape [n] [repeat]
+"""
+
+import sys
+
+from src.minizam.vm.vm import MiniZamVM
+from .common import timeit_interleaved
+
+TAIL = """\tBRANCH L2
+L1:\tACC 0
+\tGETFIELD 1
+\tPUSH
+\tACC 1
+\tGETFIELD 0
+\tPUSH
+\tCONST 0
+\tPUSH
+\tACC 1
+\tPRIM <
+\tBRANCHIFNOT L3
+\tACC 1
+\tRETURN 3
+L3:\tCONST 1
+\tPUSH
+\tACC 2
+\tPRIM +
+\tPUSH
+\tCONST 1
+\tPUSH
+\tACC 2
+\tPRIM -
+\tMAKEBLOCK 2
+\tPUSH
+\tOFFSETCLOSURE 0
+\tAPPTERM 1,4
+L2:\tCLOSUREREC L1,0
+\tCONST 0
+\tPUSH
+\tCONST {n}
+\tMAKEBLOCK 2
+\tPUSH
+\tACC 1
+\tAPPLY 1
+\tSTOP
+"""
+
+NON_TAIL = """\tBRANCH L2
+L1:\tACC 0
+\tGETFIELD 0
+\tBRANCHIFNOT L3
+\tACC 0
+\tGETFIELD 1
+\tPUSH
+\tCONST 1
+\tPUSH
+\tACC 2
+\tGETFIELD 0
+\tPRIM -
+\tMAKEBLOCK 2
+\tPUSH
+\tOFFSETCLOSURE 0
+\tAPPLY 1
+\tPUSH
+\tCONST 1
+\tPRIM +
+\tRETURN 1
+L3:\tACC 0
+\tGETFIELD 1
+\tRETURN 1
+L2:\tCLOSUREREC L1,0
+\tCONST 0
+\tPUSH
+\tCONST {n}
+\tMAKEBLOCK 2
+\tPUSH
+\tACC 1
+\tAPPLY 1
+\tSTOP
+"""
+
+
+def load(text, unbox):
+    """
+    :return: le programme optimisé, avec ou sans unbox_blocks
+    """
+
+    vm = MiniZamVM()
+    vm.load_text(text)
+    if unbox:
+        vm.optimize()
+    else:
+        vm.fold_constants()
+        vm.merge_tail_calls()
+        vm.fuse_branches()
+    return vm.prog
+
+
+def run(prog):
+    vm = MiniZamVM()
+    vm.prog = prog
+    vm.run()
+    return vm
+
+
+def main(argv):
+    n = int(argv[0]) if argv else 100000
+    repeat = int(argv[1]) if len(argv) > 1 else 3
+    print("%-14s %-8s %10s %10s %10s" % ("programme", "unbox", "mots", "couples", "temps (s)"))
+    # la récursion non terminale empile en tête de liste : n plus petit
+    for name, text, size in (("terminale", TAIL, n), ("non terminale", NON_TAIL, min(n, 5000))):
+        progs = [load(text.format(n=size), unbox) for unbox in (False, True)]
+        vms = [run(prog) for prog in progs]
+        assert vms[0].acc == vms[1].acc
+        times = timeit_interleaved([lambda prog=prog: run(prog) for prog in progs], repeat)
+        for unbox, vm, elapsed in zip(("non", "oui"), vms, times):
+            print("%-14s %-8s %10d %10d %10.3f" % (name, unbox, vm.heap_words, (vm.heap_words - 2) // 2,
+                                                   elapsed))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,44 @@
+"""
+Benchmark du surcoût du contrôle des ressources (ResourceLimits).
+
+Compare run() sans limites et run(limits) avec toutes les limites actives
+mais jamais atteintes, pour plusieurs intervalles de vérification. Les
+exécutions sont alternées et on garde le meilleur temps de chacune.
+"""
+
+import sys
+
+from src.minizam.vm.governor import ResourceLimits
+from src.minizam.vm.vm import MiniZamVM
+from .common import load_program, program_path, set_const, timeit_interleaved
+
+# (programme, constante d'entrée d'origine, nouvelle entrée)
+PROGRAMS = [("rec_funs/fibo.txt", 8, 16),
+            ("appterm/fun_appterm.txt", 234, 5000),
+            ("appterm/facto_tailrec.txt", 20, 2000)]
+
+INTERVALS = [100, 1000, 10000]
+
+
+def _run(prog, limits):
+    vm = MiniZamVM()
+    vm.prog = prog
+    return vm.run(limits)
+
+
+def main(argv):
+    repeat = int(argv[0]) if argv else 20
+    for path, old, new in PROGRAMS:
+        prog = set_const(load_program(program_path(path), optimized=True), old, new)
+        limits = [ResourceLimits(max_instructions=10 ** 12, max_time=3600, max_stack=10 ** 9,
+                                 max_heap=10 ** 12, check_interval=interval) for interval in INTERVALS]
+        fns = [lambda: _run(prog, None)] + [lambda l=l: _run(prog, l) for l in limits]
+        base, *governed = timeit_interleaved(fns, repeat)
+        print("%-26s sans limites       %8.2f ms" % (path, base * 1e3))
+        for interval, elapsed in zip(INTERVALS, governed):
+            print("%-26s intervalle %-7d %8.2f ms  surcoût %+.1f%%"
+                  % (path, interval, elapsed * 1e3, (elapsed / base - 1) * 100))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,137 @@
+"""
+Partage des blocs (hash-consing, MiniZamVM.enable_hash_consing) sur des programmes
+qui construisent des structures répétées :
+
+    lists     la liste de n copies de la liste [1; 2; 3], reconstruite à chaque fois
+    tree      l'arbre binaire complet de profondeur n, Node (gauche, d, droit)
+    distinct  la liste des n blocs [k; k], tous différents : le coût des recherches
+              dans la table sans aucun partage
+
+Pour chaque programme : la mémoire occupée par le résultat (tracemalloc, machine
+vivante), les mots alloués (heap_words), les blocs vivants et le temps d'exécution,
+sans puis avec partage.
+
+    python -m benchmarks.hashcons [n] [repeat]
+"""
+
+import sys
+import tracemalloc
+
+from src.minizam.vm.vm import MiniZamVM
+from .common import timeit
+
+# build k = if k = 0 then [] else element :: build (k - 1)
+LIST = """\tBRANCH M
+L:\tACC 0
+\tBRANCHIFNOT Z
+{element}\tPUSH
+\tCONST 1
+\tPUSH
+\tACC 2
+\tPRIM -
+\tPUSH
+\tOFFSETCLOSURE
+\tAPPLY 1
+\tPUSH
+\tACC 1
+\tMAKEBLOCK 2
+\tRETURN 2
+Z:\tCONST 0
+\tRETURN 1
+M:\tCLOSUREREC L,0
+\tCONST {n}
+\tPUSH
+\tACC 1
+\tAPPLY 1
+\tSTOP
+"""
+
+# [1; 2; 3]
+CONSTANT_LIST = "\tCONST 0\n\tPUSH\n\tCONST 3\n\tMAKEBLOCK 2\n\tPUSH\n\tCONST 2\n\tMAKEBLOCK 2\n" \
+                "\tPUSH\n\tCONST 1\n\tMAKEBLOCK 2\n"
+
+# [k; k]
+DISTINCT_LIST = "\tCONST 0\n\tPUSH\n\tACC 1\n\tMAKEBLOCK 2\n\tPUSH\n\tACC 1\n\tMAKEBLOCK 2\n"
+
+# tree d = if d = 0 then Leaf else Node (tree (d - 1), d, tree (d - 1))
+TREE = """\tBRANCH M
+T:\tACC 0
+\tBRANCHIFNOT Z
+\tCONST 1
+\tPUSH
+\tACC 1
+\tPRIM -
+\tPUSH
+\tOFFSETCLOSURE
+\tAPPLY 1
+\tPUSH
+\tCONST 1
+\tPUSH
+\tACC 2
+\tPRIM -
+\tPUSH
+\tOFFSETCLOSURE
+\tAPPLY 1
+\tMAKEBLOCK 3
+\tRETURN 0
+Z:\tCONST 0
+\tRETURN 1
+M:\tCLOSUREREC T,0
+\tCONST {n}
+\tPUSH
+\tACC 1
+\tAPPLY 1
+\tSTOP
+"""
+
+
+def programs(n):
+    """
+    :return: les couples (nom, texte) des programmes de taille n
+    """
+
+    depth = max(1, n.bit_length() - 1)
+    return [("lists", LIST.format(element=CONSTANT_LIST, n=n)),
+            ("tree", TREE.format(n=depth)),
+            ("distinct", LIST.format(element=DISTINCT_LIST, n=n))]
+
+
+def measure(text, shared, repeat):
+    """
+    :return: la mémoire du résultat en kio, les mots alloués, les blocs vivants de la
+        table (None sans partage) et le meilleur temps d'exécution
+    """
+
+    def load():
+        vm = MiniZamVM()
+        vm.load_text(text)
+        table = vm.enable_hash_consing() if shared else None
+        return vm, table
+
+    vm, table = load()
+    tracemalloc.start()
+    vm.run()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    live = table.stats()["live"] if table is not None else None
+
+    def run():
+        load()[0].run()
+
+    return memory / 1024, vm.heap_words, live, timeit(run, repeat)
+
+
+def main(argv):
+    n = int(argv[0]) if argv else 5000
+    repeat = int(argv[1]) if len(argv) > 1 else 3
+    print("%-9s %-8s %12s %10s %10s %10s" % ("programme", "partage", "mémoire (kio)", "mots", "vivants",
+                                             "temps (s)"))
+    for name, text in programs(n):
+        for shared in (False, True):
+            memory, words, live, elapsed = measure(text, shared, repeat)
+            print("%-9s %-8s %12.0f %10d %10s %10.3f" % (name, "oui" if shared else "non", memory, words,
+                                                         "-" if live is None else live, elapsed))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
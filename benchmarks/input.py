@@ -0,0 +1,148 @@
+"""
+Débit de lecture d'un fichier d'entiers (un par ligne) par un programme Mini-ZAM :
+
+    read_ints mmap   boucle de PRIM read_ints par blocs de CHUNK entiers, fichier projeté
+    read_ints flux   la même boucle, fichier lu par blocs de 1 Mio
+    read_int         boucle de PRIM read_int, un entier par tour (sur un préfixe du fichier)
+    constantes       les entiers écrits dans le programme en une liste de CONST, PUSH et
+                     MAKEBLOCK 2, chargée puis exécutée (sur un préfixe du fichier)
+
+    python -m benchmarks.input [--size-mb 100] [--prefix-mb 1]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from src.minizam.vm.input import InputChannel
+from src.minizam.vm.output import OutputChannel
+from src.minizam.vm.vm import MiniZamVM
+
+CHUNK = 65536
+
+# count n = if eof then n else count (n + length (read_ints CHUNK))
+READ_INTS = """\tBRANCH M
+L:\tCONST 0
+\tPRIM eof
+\tBRANCHIFNOT R
+\tACC 0
+\tRETURN 1
+R:\tCONST %d
+\tPRIM read_ints
+\tVECTLENGTH
+\tPUSH
+\tACC 1
+\tPRIM +
+\tPUSH
+\tOFFSETCLOSURE
+\tAPPTERM 1,2
+M:\tCLOSUREREC L,0
+\tCONST 0
+\tPUSH
+\tACC 1
+\tAPPLY 1
+\tSTOP
+""" % CHUNK
+
+# sum s = if eof then s else sum (s + read_int ())
+READ_INT = """\tBRANCH M
+L:\tCONST 0
+\tPRIM eof
+\tBRANCHIFNOT R
+\tACC 0
+\tRETURN 1
+R:\tCONST 0
+\tPRIM read_int
+\tPUSH
+\tACC 1
+\tPRIM +
+\tPUSH
+\tOFFSETCLOSURE
+\tAPPTERM 1,2
+M:\tCLOSUREREC L,0
+\tCONST 0
+\tPUSH
+\tACC 1
+\tAPPLY 1
+\tSTOP
+"""
+
+
+def generate(path, size, seed=0):
+    """
+    Écrit dans path des entiers aléatoires, un par ligne, jusqu'à size octets environ
+    """
+
+    rng = random.Random(seed)
+    written = 0
+    with open(path, "w") as f:
+        while written < size:
+            text = "".join("%d\n" % rng.randrange(-10 ** 9, 10 ** 9) for _ in range(100000))
+            f.write(text)
+            written += len(text)
+
+
+def run(text, channel):
+    """
+    :return: l'accumulateur final et le temps de chargement et d'exécution de text
+    """
+
+    start = time.perf_counter()
+    vm = MiniZamVM(output=OutputChannel("memory"), input=channel)
+    vm.load_text(text)
+    acc = vm.run().acc
+    return acc, time.perf_counter() - start
+
+
+def baked(data):
+    """
+    :return: le texte du programme qui construit la liste des entiers de data
+    """
+
+    lines = ["\tCONST 0"]
+    for value in data.split():
+        lines += ["\tPUSH", "\tCONST %d" % int(value), "\tMAKEBLOCK 2"]
+    return "\n".join(lines + ["\tSTOP"]) + "\n"
+
+
+def prefix(path, size):
+    """
+    :return: les size premiers octets du fichier, coupés après une ligne complète
+    """
+
+    with open(path, "rb") as f:
+        data = f.read(size)
+    return data[:data.rfind(b"\n") + 1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--size-mb", type=float, default=100, help="taille du fichier d'entiers")
+    parser.add_argument("--prefix-mb", type=float, default=1,
+                        help="taille du préfixe lu par read_int et par les constantes")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "ints.txt")
+        generate(path, int(args.size_mb * 2 ** 20))
+        size = os.path.getsize(path)
+        head = prefix(path, int(args.prefix_mb * 2 ** 20))
+        text = baked(head)
+
+        print("%-16s %10s %12s %10s %10s" % ("mode", "Mio", "entiers", "temps (s)", "Mio/s"))
+        modes = [("read_ints mmap", READ_INTS, lambda: InputChannel.open(path, mapped=True), size),
+                 ("read_ints flux", READ_INTS, lambda: InputChannel.open(path), size),
+                 ("read_int", READ_INT, lambda: InputChannel(head), len(head)),
+                 ("constantes", text, lambda: None, len(head))]
+        for mode, program, channel, length in modes:
+            acc, elapsed = run(program, channel())
+            count = acc.value if mode.startswith("read_ints") else head.count(b"\n")
+            print("%-16s %10.1f %12d %10.3f %10.1f" % (mode, length / 2 ** 20, count, elapsed,
+                                                       length / 2 ** 20 / elapsed))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+Benchmark du cache des petits entiers de MLValue sur des boucles de comptage.
+
+Pour chaque configuration du cache, on compte les MLValue créées, les
+collectes du ramasse-miettes et le temps d'exécution.
+"""
+
+import gc
+import sys
+
+from src.minizam.vm.mlvalue import MLValue
+from .common import load_program, program_path, run_program, set_const, timeit
+
+# (programme, constante d'entrée d'origine, nouvelle entrée)
+PROGRAMS = [("appterm/fun_appterm.txt", 234, 1000),
+            ("unary_funs/arithexpr.txt", None, None),
+            ("block_values/array_sum.txt", None, None)]
+
+CACHES = [("sans cache", 0, -1), ("-128..1023", -128, 1023), ("-128..65535", -128, 65535)]
+
+
+class _AllocationCounter:
+    """
+    Compte les appels à MLValue.__init__ et les collectes du ramasse-miettes
+    """
+
+    def __enter__(self):
+        self.values = 0
+        self.collections = 0
+        self._init = MLValue.__init__
+        counter = self
+
+        def counting_init(value):
+            counter.values += 1
+            counter._init(value)
+
+        MLValue.__init__ = counting_init
+        gc.callbacks.append(self._on_gc)
+        return self
+
+    def _on_gc(self, phase, info):
+        if phase == "start":
+            self.collections += 1
+
+    def __exit__(self, *exc):
+        MLValue.__init__ = self._init
+        gc.callbacks.remove(self._on_gc)
+
+
+def main(argv):
+    runs = int(argv[0]) if argv else 20
+    for path, old, new in PROGRAMS:
+        prog = load_program(program_path(path), optimized=True)
+        if old is not None:
+            set_const(prog, old, new)
+        for name, low, high in CACHES:
+            MLValue.configure_int_cache(low, high)
+            with _AllocationCounter() as counter:
+                for _ in range(runs):
+                    run_program(prog)
+            best = timeit(lambda: [run_program(prog) for _ in range(runs)], 3)
+            print("%-28s %-12s %9d MLValue/exécution %5d collectes %8.2f ms/exécution"
+                  % (path, name, counter.values // runs, counter.collections, best / runs * 1e3))
+    MLValue.configure_int_cache(-128, 1023)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
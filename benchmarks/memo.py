@@ -0,0 +1,38 @@
+"""
+Benchmark de la mémoïsation des fonctions pures sur fibo (tests/rec_funs/fibo.txt).
+
+Sans mémoïsation, le nombre d'appels de fibo n croît comme fibo n ; avec, chaque
+fibo k n'est calculé qu'une fois et le temps devient linéaire en n. La version
+non mémoïsée n'est mesurée que jusqu'à MAX_PLAIN.
+"""
+
+import sys
+
+from src.minizam.vm.vm import MiniZamVM
+from .common import load_program, program_path, set_const, timeit
+
+SIZES = [10, 15, 20, 22, 24, 30, 100, 400]
+MAX_PLAIN = 24
+
+
+def _run(n, memo):
+    vm = MiniZamVM()
+    vm.prog = set_const(load_program(program_path("rec_funs/fibo.txt"), optimized=True), 8, n)
+    table = vm.enable_memoization() if memo else None
+    vm.run()
+    return table
+
+
+def main(argv):
+    repeat = int(argv[0]) if argv else 3
+    print("%5s %14s %14s %8s %10s" % ("n", "sans (ms)", "mémoïsé (ms)", "succès", "taux"))
+    for n in SIZES:
+        plain = timeit(lambda: _run(n, False), repeat) * 1e3 if n <= MAX_PLAIN else None
+        memo = timeit(lambda: _run(n, True), repeat) * 1e3
+        stats = _run(n, True).stats()
+        print("%5d %14s %14.2f %8d %9.1f%%" % (n, "%.2f" % plain if plain is not None else "-", memo,
+                                             stats["hits"], stats["hit_rate"] * 100))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,48 @@
+"""
+Coût de la mesure des exécutions (MiniZamVM.enable_metrics) sur les programmes
+synthétiques de benchmarks.workloads : temps d'exécution du programme optimisé, sans
+puis avec mesure dans un registre partagé, surcoût, et instructions et appels comptés.
+array_sort, quadratique, est exécuté sur n / 10.
+
+    python -m benchmarks.metrics [n] [repeat]
+"""
+
+import sys
+
+from src.minizam.vm.metrics import MetricsRegistry
+from src.minizam.vm.vm import MiniZamVM
+from .common import timeit_interleaved
+from .workloads import WORKLOADS
+
+
+def _load(text, registry=None):
+    vm = MiniZamVM()
+    vm.load_text(text)
+    vm.optimize()
+    if registry is not None:
+        vm.enable_metrics(registry)
+    return vm
+
+
+def main(argv):
+    n = int(argv[0]) if argv else 3000
+    repeat = int(argv[1]) if len(argv) > 1 else 15
+    registry = MetricsRegistry()
+    print("%-12s %12s %12s %9s %14s %10s" % ("programme", "sans (ms)", "mesure (ms)", "surcoût",
+                                             "instructions", "appels"))
+    for name, workload in sorted(WORKLOADS.items()):
+        text = workload(n // 10 if name == "array_sort" else n)
+        plain, measured = timeit_interleaved([lambda: _load(text).run(), lambda: _load(text, registry).run()],
+                                             repeat)
+        metrics = _load(text, MetricsRegistry())
+        metrics.run()
+        print("%-12s %12.2f %12.2f %8.1f%% %14d %10d" % (name, plain * 1e3, measured * 1e3,
+                                                         (measured / plain - 1) * 100,
+                                                         metrics.metrics.instructions.get(),
+                                                         metrics.metrics.calls.get()))
+    print()
+    print(registry.render(), end="")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
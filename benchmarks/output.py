@@ -0,0 +1,44 @@
+"""
+Benchmark du canal de sortie : un programme écrit n caractères avec PRIM print
+(1 million par défaut), vers différents puits et tailles de buffer.
+"""
+
+import os
+import sys
+import time
+
+from src.minizam.vm.output import OutputChannel
+from src.minizam.vm.vm import MiniZamVM, LineInstruction
+
+# boucle de n/10 tours, chaque tour écrit "0123456789"
+PRINT_LOOP = "\tCONST %d\n\tPUSH\nL:\tACC 0\n\tPUSH\n\tCONST 0\n\tPRIM =\n\tBRANCHIFNOT M\n\tSTOP\nM:" \
+             + "".join("\tCONST %d\n\tPRIM print\n" % (48 + i) for i in range(10)) \
+             + "\tACC 0\n\tPUSH\n\tCONST -1\n\tPRIM +\n\tASSIGN 0\n\tBRANCH L\n"
+
+
+def _run(n, output):
+    vm = MiniZamVM(output)
+    vm.prog = list(map(LineInstruction.build, LineInstruction.parse(PRINT_LOOP % (n // 10))))
+    start = time.perf_counter()
+    result = vm.run()
+    return time.perf_counter() - start, result
+
+
+def main(argv):
+    n = int(argv[0]) if argv else 1000000
+    with open(os.devnull, "w") as devnull:
+        sinks = [("print par caractère", lambda: OutputChannel(lambda text: print(text, file=devnull),
+                                                             buffer_size=1)),
+                 ("fichier, sans buffer", lambda: OutputChannel(devnull, buffer_size=1)),
+                 ("fichier, buffer 8192", lambda: OutputChannel(devnull)),
+                 ("fonction, buffer 8192", lambda: OutputChannel(devnull.write)),
+                 ("mémoire", lambda: OutputChannel("memory"))]
+        for name, make in sinks:
+            elapsed, result = _run(n, make())
+            if result.output is not None:
+                assert len(result.output) == n
+            print("%-22s %d caractères en %7.2f s  (%.0f caractères/s)" % (name, n, elapsed, n / elapsed))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
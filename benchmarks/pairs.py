@@ -0,0 +1,176 @@
+"""
+Représentation compacte des blocs de deux champs (Pair) sur une liste OCaml de n
+éléments, construite par MAKEBLOCK 2 comme dans tests/block_values/liste_length.txt
+(par une fonction récursive terminale, pour aller jusqu'au million d'éléments) :
+
+    construction  build n [] : la liste [1; ...; n]
+    longueur      length l 0, qui ne lit que GETFIELD 1
+    somme         sum l 0, qui lit GETFIELD 0 et GETFIELD 1
+
+Pour chaque représentation, Pair puis un MLValue qui contient une liste Python (la
+représentation des autres blocs) : la mémoire de la liste construite (tracemalloc)
+et le meilleur temps de chaque phase.
+
+    python -m benchmarks.pairs [n] [repeat]
+"""
+
+import sys
+import tracemalloc
+
+from src.minizam.vm.mlvalue import MLValue
+from src.minizam.vm.vm import MiniZamVM
+from .common import timeit_interleaved
+
+# build k acc = if k = 0 then acc else build (k - 1) (k :: acc)
+BUILD = """\tBRANCH M
+B:\tGRAB 1
+\tACC 0
+\tBRANCHIFNOT Z
+\tACC 1
+\tPUSH
+\tACC 1
+\tMAKEBLOCK 2
+\tPUSH
+\tCONST 1
+\tPUSH
+\tACC 2
+\tPRIM -
+\tPUSH
+\tOFFSETCLOSURE
+\tAPPTERM 2,4
+Z:\tACC 1
+\tRETURN 2
+M:\tCLOSUREREC B,0
+\tCONST 0
+\tPUSH
+\tCONST {n}
+\tPUSH
+\tACC 2
+\tAPPLY 2
+\tSTOP
+"""
+
+# un pas de parcours part de la pile (l, x) avec l non vide, empile le nouvel x et
+# laisse la queue de l dans acc
+
+# length l n = match l with [] -> n | _ :: t -> length t (n + 1)
+LENGTH = """\tCONST 1
+\tPUSH
+\tACC 2
+\tPRIM +
+\tPUSH
+\tACC 1
+\tGETFIELD 1
+"""
+
+# sum l s = match l with [] -> s | h :: t -> sum t (s + h)
+SUM = """\tACC 0
+\tGETFIELD 0
+\tPUSH
+\tACC 2
+\tPRIM +
+\tPUSH
+\tACC 1
+\tGETFIELD 1
+"""
+
+# walk l 0 avec le pas step, la liste l est dans acc au départ
+WALK = """\tBRANCH M
+W:\tGRAB 1
+\tACC 0
+\tBRANCHIFNOT Z
+{step}\tPUSH
+\tOFFSETCLOSURE
+\tAPPTERM 2,4
+Z:\tACC 1
+\tRETURN 2
+M:\tPUSH
+\tCLOSUREREC W,0
+\tCONST 0
+\tPUSH
+\tACC 2
+\tPUSH
+\tACC 2
+\tAPPLY 2
+\tSTOP
+"""
+
+STEPS = [("longueur", LENGTH), ("somme", SUM)]
+
+
+class ListBlocks:
+    """
+    Fait construire à MAKEBLOCK 2 des blocs qui contiennent une liste Python, la
+    représentation des blocs avant Pair
+    """
+
+    def __enter__(self):
+        self.pair = MLValue.pair
+        MLValue.pair = staticmethod(lambda head, tail: MLValue.from_block([head, tail]))
+        return self
+
+    def __exit__(self, *exc):
+        MLValue.pair = self.pair
+
+
+def load(text):
+    vm = MiniZamVM()
+    vm.load_text(text)
+    return vm
+
+
+def build(n, pairs):
+    """
+    :param pairs: False pour construire des blocs qui contiennent une liste
+    :return: la liste [1; ...; n]
+    """
+
+    if pairs:
+        return load(BUILD.format(n=n)).run().acc
+    with ListBlocks():
+        return load(BUILD.format(n=n)).run().acc
+
+
+def walker(step, lst):
+    """
+    :return: la fonction qui parcourt lst avec le pas step
+    """
+
+    prog = load(WALK.format(step=step)).prog
+
+    def run():
+        vm = MiniZamVM()
+        vm.prog = prog
+        vm.acc = lst
+        return vm.run().acc
+
+    return run
+
+
+def main(argv):
+    n = int(argv[0]) if argv else 1000000
+    repeat = int(argv[1]) if len(argv) > 1 else 3
+
+    lists, memory = [], []
+    for pairs in (True, False):
+        tracemalloc.start()
+        lists.append(build(n, pairs))
+        memory.append(tracemalloc.get_traced_memory()[0] / 2 ** 20)
+        tracemalloc.stop()
+
+    # les deux représentations alternent, pour subir les mêmes variations de charge
+    times = [timeit_interleaved([lambda: build(n, True), lambda: build(n, False)], repeat)]
+    for name, step in STEPS:
+        walks = [walker(step, lst) for lst in lists]
+        expected = n if name == "longueur" else n * (n + 1) // 2
+        assert all(walk().value == expected for walk in walks)
+        times.append(timeit_interleaved(walks, repeat))
+
+    print("%-8s %12s %16s %14s %12s" % ("blocs", "mémoire (Mio)", "construction (s)",
+                                         "longueur (s)", "somme (s)"))
+    for i, name in enumerate(("Pair", "liste")):
+        print("%-8s %12.1f %16.3f %14.3f %12.3f" % ((name, memory[i]) + tuple(t[i] for t in times)))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,41 @@
+"""
+Benchmark de l'accélération (quickening) sur les programmes synthétiques de
+benchmarks.workloads : temps d'exécution du programme optimisé, avec et sans
+spécialisation des instructions, et nombre d'instructions spécialisées.
+
+    python -m benchmarks.quickening [n] [repeat]
+"""
+
+import sys
+
+from src.minizam.vm.vm import MiniZamVM
+from .common import timeit_interleaved
+from .workloads import WORKLOADS
+
+
+def _load(text, quick):
+    vm = MiniZamVM()
+    vm.load_text(text)
+    vm.optimize()
+    quickener = vm.enable_quickening() if quick else None
+    return vm, quickener
+
+
+def main(argv):
+    n = int(argv[0]) if argv else 300
+    repeat = int(argv[1]) if len(argv) > 1 else 3
+    print("%-12s %12s %12s %8s %12s %10s" % ("programme", "sans (ms)", "accéléré (ms)", "gain",
+                                             "spécialisées", "désoptim."))
+    for name, workload in sorted(WORKLOADS.items()):
+        text = workload(n)
+        plain, quick = timeit_interleaved([lambda: _load(text, False)[0].run(),
+                                           lambda: _load(text, True)[0].run()], repeat)
+        vm, quickener = _load(text, True)
+        vm.run()
+        stats = quickener.stats()
+        print("%-12s %12.2f %12.2f %7.2fx %12d %10d" % (name, plain * 1e3, quick * 1e3, plain / quick,
+                                                         stats["quickened"], stats["deoptimized"]))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
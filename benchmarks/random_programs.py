@@ -0,0 +1,334 @@
+"""
+Générateur de programmes Mini-ZAM aléatoires, bien formés et qui terminent.
+
+Le générateur tire un arbre d'expressions typées (entiers et booléens) puis le
+compile comme le ferait ocamlc : les variables locales sont sur la pile et
+adressées par ACC, les fonctions sont des fermetures sans environnement.
+Les seules boucles sont des appels récursifs dont le compteur décroît à partir
+d'une petite constante, ce qui garantit la terminaison.
+
+    python -m benchmarks.random_programs 42
+"""
+
+import random
+import sys
+
+# opérateurs des expressions entières et booléennes
+INT_OPS = ["+", "-", "*"]
+CMP_OPS = ["=", "<>", "<", "<=", ">", ">="]
+
+# taille d'un bloc de rattrapage posé par PUSHTRAP
+TRAP_SIZE = 4
+
+
+class ProgramGenerator:
+    """
+    Générateur d'un programme aléatoire, reproductible à partir de sa graine
+    """
+
+    def __init__(self, seed, size=4, functions=3):
+        """
+        :param seed: graine du générateur
+        :param size: profondeur maximale des expressions
+        :param functions: nombre de fonctions définies par le programme
+        """
+
+        self.random = random.Random(seed)
+        self.size = size
+        self.functions = functions
+        self.arities = []
+        self.lines = []
+        self.labels = 0
+        self.pending = None
+        self.aliases = {}
+
+    # émission du code
+
+    def new_label(self):
+        self.labels += 1
+        return self.labels
+
+    def place(self, label):
+        """
+        Pose label sur la prochaine instruction émise ; deux labels posés sur la
+        même instruction sont confondus
+        """
+
+        if self.pending is None:
+            self.pending = label
+        else:
+            self.aliases[label] = self.pending
+
+    def emit(self, command, *args):
+        self.lines.append((self.pending, command, args))
+        self.pending = None
+
+    def name(self, label):
+        return "L%d" % self.aliases.get(label, label)
+
+    def listing(self):
+        """
+        :return: le texte du programme, au format des fichiers de tests/
+        """
+
+        out = []
+        for label, command, args in self.lines:
+            text = "%s\t%s" % (self.name(label) + ":" if label is not None else "", command)
+            if args:
+                text += " " + ",".join(self.name(a) if isinstance(a, Label) else str(a) for a in args)
+            out.append(text)
+        return "\n".join(out) + "\n"
+
+    # génération des expressions
+
+    def chance(self, p):
+        return self.random.random() < p
+
+    def gen_int(self, scope, depth, in_try=False):
+        """
+        Tire une expression entière
+
+        :param scope: noms des variables entières visibles
+        :param depth: profondeur restante
+        :param in_try: vrai si un RAISE serait rattrapé par un gestionnaire
+        """
+
+        r = self.random
+        if depth <= 0 or self.chance(0.15):
+            if scope and self.chance(0.6):
+                return ("var", r.choice(scope))
+            return ("const", r.randint(-5, 20))
+
+        kinds = ["bin", "bin", "if", "let", "pair", "print"]
+        if self.arities:
+            kinds += ["call", "call", "partial", "loop"]
+        kinds.append("try")
+        if in_try:
+            kinds.append("raise")
+        kind = r.choice(kinds)
+
+        if kind == "bin":
+            return ("bin", r.choice(INT_OPS), self.gen_int(scope, depth - 1, in_try),
+                    self.gen_int(scope, depth - 1, in_try))
+        if kind == "if":
+            return ("if", self.gen_bool(scope, depth - 1, in_try), self.gen_int(scope, depth - 1, in_try),
+                    self.gen_int(scope, depth - 1, in_try))
+        if kind == "let":
+            name = "v%d" % self.new_label()
+            return ("let", name, self.gen_int(scope, depth - 1, in_try),
+                    self.gen_int(scope + [name], depth - 1, in_try))
+        if kind == "pair":
+            return ("field", r.randint(0, 1), self.gen_int(scope, depth - 1, in_try),
+                    self.gen_int(scope, depth - 1, in_try))
+        if kind == "print":
+            return ("print", r.choice([10] + list(range(ord("a"), ord("z") + 1))),
+                    self.gen_int(scope, depth - 1, in_try))
+        if kind == "try":
+            name = "e%d" % self.new_label()
+            return ("try", self.gen_int(scope, depth - 1, True), name,
+                    self.gen_int(scope + [name], depth - 1, in_try))
+        if kind == "raise":
+            return ("raise", self.gen_bool(scope, depth - 1, in_try), self.gen_int(scope, 0),
+                    self.gen_int(scope, depth - 1, in_try))
+
+        f = r.randrange(len(self.arities))
+        arity = self.arities[f]
+        args = [self.gen_int(scope, depth - 1, in_try) for _ in range(arity)]
+        if kind == "call" or (kind == "partial" and arity == 1):
+            return ("call", f, args)
+        if kind == "partial":
+            return ("partial", f, r.randint(1, arity - 1), args)
+        return ("loop", r.randint(0, 12), self.gen_int(scope, depth - 1, in_try))
+
+    def gen_bool(self, scope, depth, in_try=False):
+        """
+        Tire une expression booléenne : une comparaison d'entiers, éventuellement niée
+        """
+
+        cmp = ("cmp", self.random.choice(CMP_OPS), self.gen_int(scope, depth - 1, in_try),
+               self.gen_int(scope, depth - 1, in_try))
+        if self.chance(0.2):
+            return ("not", cmp)
+        return cmp
+
+    # compilation
+
+    def compile(self, expr, slots):
+        """
+        Émet le code qui calcule expr dans acc, la pile retrouvant sa hauteur
+
+        :param slots: noms des emplacements de la pile, le sommet en dernier
+        """
+
+        kind = expr[0]
+        if kind == "const":
+            self.emit("CONST", expr[1])
+        elif kind == "var":
+            self.emit("ACC", self.slot(slots, expr[1]))
+        elif kind in ("bin", "cmp"):
+            self.compile(expr[3], slots)
+            self.emit("PUSH")
+            self.compile(expr[2], slots + [None])
+            self.emit("PRIM", expr[1])
+        elif kind == "not":
+            self.compile(expr[1], slots)
+            self.emit("PRIM", "not")
+        elif kind == "if":
+            else_label, end_label = self.new_label(), self.new_label()
+            self.compile(expr[1], slots)
+            self.emit("BRANCHIFNOT", Label(else_label))
+            self.compile(expr[2], slots)
+            self.emit("BRANCH", Label(end_label))
+            self.place(else_label)
+            self.compile(expr[3], slots)
+            self.place(end_label)
+        elif kind == "let":
+            self.compile(expr[2], slots)
+            self.emit("PUSH")
+            self.compile(expr[3], slots + [expr[1]])
+            self.emit("POP")
+        elif kind == "field":
+            self.compile(expr[3], slots)
+            self.emit("PUSH")
+            self.compile(expr[2], slots + [None])
+            self.emit("MAKEBLOCK", 2)
+            self.emit("GETFIELD", expr[1])
+        elif kind == "print":
+            self.emit("CONST", expr[1])
+            self.emit("PRIM", "print")
+            self.compile(expr[2], slots)
+        elif kind == "try":
+            handler, end_label = self.new_label(), self.new_label()
+            self.emit("PUSHTRAP", Label(handler))
+            self.compile(expr[1], slots + [None] * TRAP_SIZE)
+            self.emit("POPTRAP")
+            self.emit("BRANCH", Label(end_label))
+            self.place(handler)
+            self.emit("PUSH")
+            self.compile(expr[3], slots + [expr[2]])
+            self.emit("POP")
+            self.place(end_label)
+        elif kind == "raise":
+            ok = self.new_label()
+            self.compile(expr[1], slots)
+            self.emit("BRANCHIFNOT", Label(ok))
+            self.compile(expr[2], slots)
+            self.emit("RAISE")
+            self.place(ok)
+            self.compile(expr[3], slots)
+        elif kind == "call":
+            self.compile_args(expr[2], slots)
+            self.emit("ACC", self.slot(slots + [None] * len(expr[2]), ("fun", expr[1])))
+            self.emit("APPLY", len(expr[2]))
+        elif kind == "partial":
+            # (f a0 .. a(m-1)) a(m) .. a(n-1)
+            f, m, args = expr[1], expr[2], expr[3]
+            self.compile_args(args, slots)
+            self.emit("ACC", self.slot(slots + [None] * len(args), ("fun", f)))
+            self.emit("APPLY", m)
+            self.emit("APPLY", len(args) - m)
+        elif kind == "loop":
+            self.compile_args([("const", expr[1]), expr[2]], slots)
+            self.emit("ACC", self.slot(slots + [None, None], ("fun", "loop")))
+            self.emit("APPLY", 2)
+        elif kind == "self":
+            # appel récursif de loop depuis son propre corps
+            self.compile_args([expr[1], expr[2]], slots)
+            self.emit("OFFSETCLOSURE", 0)
+            self.emit("APPLY", 2)
+        else:
+            raise ValueError(kind)
+
+    def compile_args(self, args, slots):
+        """
+        Empile les arguments, le premier au sommet de la pile
+        """
+
+        for i, arg in enumerate(reversed(args)):
+            self.compile(arg, slots + [None] * i)
+            self.emit("PUSH")
+
+    @staticmethod
+    def slot(slots, name):
+        return len(slots) - 1 - slots.index(name)
+
+    def compile_function(self, label, params, body):
+        """
+        Émet une fonction d'arité len(params) dont le résultat est body
+        """
+
+        if len(params) > 1:
+            # une fermeture partielle reprend au RESTART qui précède le GRAB
+            self.emit("RESTART")
+            self.place(label)
+            self.emit("GRAB", len(params) - 1)
+        else:
+            self.place(label)
+        self.compile(body, list(reversed(params)))
+        self.emit("RETURN", len(params))
+
+    def compile_loop(self, label):
+        """
+        Émet la fonction récursive loop n a = if n <= 0 then a else loop (n - 1) (step n a)
+        """
+
+        step = self.gen_int(["n", "a"], 2)
+        self.emit("RESTART")
+        self.place(label)
+        self.emit("GRAB", 1)
+        self.compile(("if", ("cmp", "<=", ("var", "n"), ("const", 0)), ("var", "a"),
+                      ("self", ("bin", "-", ("var", "n"), ("const", 1)), step)), ["a", "n"])
+        self.emit("RETURN", 2)
+
+    def generate(self):
+        """
+        :return: le texte d'un programme complet
+        """
+
+        r = self.random
+        main = self.new_label()
+        self.emit("BRANCH", Label(main))
+
+        # les fonctions n'appellent pas d'autres fonctions : arities est rempli après
+        labels, arities = [], []
+        for _ in range(self.functions):
+            arity = r.randint(1, 3)
+            params = ["p%d" % i for i in range(arity)]
+            labels.append(self.new_label())
+            self.compile_function(labels[-1], params, self.gen_int(params, self.size - 1))
+            arities.append(arity)
+        loop = self.new_label()
+        self.compile_loop(loop)
+        self.arities = arities
+
+        slots = []
+        self.place(main)
+        for f, label in enumerate(labels):
+            self.emit("CLOSURE", Label(label), 0)
+            self.emit("PUSH")
+            slots.append(("fun", f))
+        # CLOSUREREC empile la fermeture
+        self.emit("CLOSUREREC", Label(loop), 0)
+        slots.append(("fun", "loop"))
+
+        self.compile(self.gen_int([], self.size), slots)
+        self.emit("STOP")
+        return self.listing()
+
+
+class Label(int):
+    """
+    Opérande désignant un label, résolu à l'écriture du programme
+    """
+
+
+def generate(seed, size=4, functions=3):
+    """
+    :return: le texte du programme aléatoire de graine seed
+    """
+
+    return ProgramGenerator(seed, size, functions).generate()
+
+
+if __name__ == "__main__":
+    print(generate(int(sys.argv[1]) if len(sys.argv) > 1 else 0), end="")
@@ -0,0 +1,49 @@
+"""
+Coût du profil statistique (sampling.SamplingProfiler) sur les programmes synthétiques
+de benchmarks.workloads : temps d'exécution du programme optimisé, sans puis avec
+échantillonnage à hz échantillons par seconde, surcoût, nombre d'échantillons et pile
+la plus échantillonnée. array_sort, quadratique, est exécuté sur n / 10.
+
+    python -m benchmarks.sampling [n] [repeat] [hz]
+"""
+
+import sys
+
+from src.minizam.vm.sampling import SamplingProfiler
+from src.minizam.vm.vm import MiniZamVM
+from .common import timeit_interleaved
+from .workloads import WORKLOADS
+
+
+def _load(text):
+    vm = MiniZamVM()
+    vm.load_text(text)
+    vm.optimize()
+    return vm
+
+
+def _sampled(text, hz):
+    vm = _load(text)
+    with SamplingProfiler(vm, hz) as profiler:
+        vm.run()
+    return profiler
+
+
+def main(argv):
+    n = int(argv[0]) if argv else 3000
+    repeat = int(argv[1]) if len(argv) > 1 else 5
+    hz = int(argv[2]) if len(argv) > 2 else 1000
+    print("%-12s %12s %12s %9s %12s  %s" % ("programme", "sans (ms)", "profil (ms)", "surcoût",
+                                            "échantillons", "première pile"))
+    for name, workload in sorted(WORKLOADS.items()):
+        text = workload(n // 10 if name == "array_sort" else n)
+        plain, sampled = timeit_interleaved([lambda: _load(text).run(), lambda: _sampled(text, hz)], repeat)
+        stacks = _sampled(text, hz).collapsed()
+        top = max(stacks, key=stacks.get) if stacks else "-"
+        print("%-12s %12.2f %12.2f %8.1f%% %12d  %s" % (name, plain * 1e3, sampled * 1e3,
+                                                        (sampled / plain - 1) * 100, sum(stacks.values()),
+                                                        top[-40:]))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
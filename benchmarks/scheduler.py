@@ -0,0 +1,75 @@
+"""
+Benchmark de l'ordonnanceur asyncio : latence de bout en bout (soumission ->
+résultat) de programmes exécutés en même temps, pour plusieurs quanta.
+"""
+
+import asyncio
+import random
+import sys
+import time
+
+from src.minizam.vm.scheduler import Scheduler
+from src.minizam.vm.vm import MiniZamVM
+from .common import load_program, program_path, set_const
+
+# (programme, constante d'entrée d'origine, entrées possibles)
+PROGRAMS = [("rec_funs/fibo.txt", 8, range(2, 12)),
+            ("appterm/fun_appterm.txt", 234, range(10, 500)),
+            ("appterm/facto_tailrec.txt", 20, range(1, 100)),
+            ("n-ary_funs/grab3.txt", None, None)]
+
+QUANTA = [100, 1000, 10000]
+
+
+def _workload(count, seed=0):
+    rand = random.Random(seed)
+    progs = []
+    for _ in range(count):
+        path, old, inputs = rand.choice(PROGRAMS)
+        prog = load_program(program_path(path), optimized=True)
+        if old is not None:
+            set_const(prog, old, rand.choice(inputs))
+        progs.append(prog)
+    return progs
+
+
+def _percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+async def _measure(scheduler, progs):
+    start = time.perf_counter()
+    latencies = []
+
+    async def one(prog):
+        vm = MiniZamVM()
+        vm.prog = prog
+        await scheduler.run(vm)
+        latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*[one(prog) for prog in progs])
+    return sorted(latencies), time.perf_counter() - start
+
+
+def main(argv):
+    count = int(argv[0]) if argv else 1000
+    progs = _workload(count)
+
+    start = time.perf_counter()
+    for prog in progs:
+        vm = MiniZamVM()
+        vm.prog = prog
+        vm.run()
+    sequential = time.perf_counter() - start
+    print("%d programmes, exécution séquentielle : %.0f ms" % (count, sequential * 1e3))
+
+    for quantum in QUANTA:
+        scheduler = Scheduler(quantum=quantum)
+        latencies, total = asyncio.run(_measure(scheduler, progs))
+        print("quantum %-6d total %7.0f ms  p50 %7.1f ms  p95 %7.1f ms  p99 %7.1f ms  %7d tranches"
+              % (quantum, total * 1e3, _percentile(latencies, 50) * 1e3,
+                 _percentile(latencies, 95) * 1e3, _percentile(latencies, 99) * 1e3, scheduler.slices))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
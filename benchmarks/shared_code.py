@@ -0,0 +1,180 @@
+"""
+Mémoire de processus fils (fork) qui exécutent chacun les mêmes programmes, selon
+la façon dont ils obtiennent le code :
+
+    reparse    chaque fils relit et décode les textes des programmes
+    inherited  le père décode les programmes avant fork, les fils héritent des
+               LineInstruction (et dirtient leurs pages en touchant les compteurs
+               de références)
+    shared     le père range les programmes dans un CodeSegment en mémoire partagée,
+               les fils les lisent par ProgramView
+
+Chaque fils charge tous les programmes, exécute au plus quantum instructions de
+chacun, puis mesure sa mémoire dans /proc/self/smaps_rollup : RSS et mémoire
+privée (USS, les pages qui ne sont partagées avec aucun autre processus).
+Linux seulement.
+
+    python -m benchmarks.shared_code [--workers 32] [--programs 100]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from benchmarks.random_programs import generate
+from src.minizam.vm.codesegment import CodeSegment
+from src.minizam.vm.output import OutputChannel
+from src.minizam.vm.vm import MiniZamVM
+
+MODES = ["reparse", "inherited", "shared"]
+
+
+def memory():
+    """
+    :return: RSS et mémoire privée du processus, en kio
+    """
+
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {"rss_kib": fields["Rss"], "uss_kib": fields["Private_Clean"] + fields["Private_Dirty"]}
+
+
+def _machine():
+    return MiniZamVM(output=OutputChannel("memory"))
+
+
+def loader(mode, texts):
+    """
+    Prépare, dans le père, le chargement des programmes par les fils
+
+    :return: une fonction sans argument, appelée dans chaque fils, qui renvoie les machines
+        chargées, et une fonction de nettoyage
+    """
+
+    if mode == "reparse":
+        def load():
+            machines = []
+            for _, text in texts:
+                vm = _machine()
+                vm.load_text(text)
+                machines.append(vm)
+            return machines
+        return load, lambda: None
+
+    if mode == "inherited":
+        progs = []
+        for _, text in texts:
+            vm = _machine()
+            vm.load_text(text)
+            progs.append(vm.prog)
+
+        def load():
+            machines = []
+            for prog in progs:
+                vm = _machine()
+                vm.prog = prog
+                machines.append(vm)
+            return machines
+        return load, lambda: None
+
+    segment = CodeSegment.create(texts)
+
+    def load():
+        machines = []
+        for name in segment.names():
+            vm = _machine()
+            vm.load_shared(segment.program(name))
+            machines.append(vm)
+        return machines
+
+    def cleanup():
+        segment.close()
+        segment.unlink()
+    return load, cleanup
+
+
+def worker(load, quantum, out):
+    """
+    Corps d'un fils : charge et exécute les programmes puis écrit ses mesures dans out
+    """
+
+    start = time.perf_counter()
+    machines = load()
+    loaded = time.perf_counter()
+    for vm in machines:
+        try:
+            vm.run(quantum=quantum)
+        except Exception:
+            pass
+    report = memory()
+    report.update({"load_s": loaded - start, "run_s": time.perf_counter() - loaded})
+    os.write(out, json.dumps(report).encode("utf-8"))
+    os.close(out)
+
+
+def measure(mode, texts, workers, quantum):
+    """
+    :return: les mesures moyennes et totales des workers fils pour mode
+    """
+
+    load, cleanup = loader(mode, texts)
+    pipes = []
+    try:
+        for _ in range(workers):
+            read, write = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                os.close(read)
+                try:
+                    worker(load, quantum, write)
+                finally:
+                    os._exit(0)
+            os.close(write)
+            pipes.append((pid, read))
+        reports = []
+        for pid, read in pipes:
+            chunks = []
+            while True:
+                chunk = os.read(read, 65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+            os.close(read)
+            os.waitpid(pid, 0)
+            reports.append(json.loads(b"".join(chunks)))
+    finally:
+        cleanup()
+    result = {key: sum(r[key] for r in reports) / len(reports) for key in reports[0]}
+    result["total_uss_kib"] = sum(r["uss_kib"] for r in reports)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=32, help="nombre de processus fils")
+    parser.add_argument("--programs", type=int, default=100, help="nombre de programmes aléatoires")
+    parser.add_argument("--size", type=int, default=10, help="profondeur des programmes aléatoires")
+    parser.add_argument("--quantum", type=int, default=2000,
+                        help="nombre maximal d'instructions exécutées par programme")
+    parser.add_argument("--modes", default=",".join(MODES), help="modes mesurés, séparés par des virgules")
+    args = parser.parse_args(argv)
+
+    texts = [("random:%d" % i, generate(i, args.size)) for i in range(args.programs)]
+    print("%d programmes, %d instructions, %d fils"
+          % (len(texts), sum(text.count("\n") for _, text in texts), args.workers))
+    print("%-10s %10s %10s %14s %10s %10s" % ("mode", "RSS (Mio)", "USS (Mio)", "USS total (Mio)",
+                                              "chargt (s)", "exéc (s)"))
+    for mode in args.modes.split(","):
+        r = measure(mode, texts, args.workers, args.quantum)
+        print("%-10s %10.1f %10.1f %14.1f %10.3f %10.3f" % (mode, r["rss_kib"] / 1024, r["uss_kib"] / 1024,
+                                                         r["total_uss_kib"] / 1024, r["load_s"], r["run_s"]))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
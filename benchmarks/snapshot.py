@@ -0,0 +1,123 @@
+"""
+Benchmark des snapshots : taille et temps de restauration comparés à la
+ré-exécution de la phase d'initialisation.
+
+Le programme construit une liste de n entiers (phase d'initialisation), puis
+la somme au label WORK, où l'on prend le snapshot.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from src.minizam.vm import snapshot
+from src.minizam.vm.vm import MiniZamVM, LineInstruction
+
+BUILD_THEN_SUM = """\tBRANCH L5
+L1:\tGRAB 1
+\tACC 0
+\tPUSH
+\tCONST 0
+\tPRIM =
+\tBRANCHIFNOT L2
+\tACC 1
+\tRETURN 2
+L2:\tACC 1
+\tPUSH
+\tACC 1
+\tMAKEBLOCK 2
+\tPUSH
+\tACC 1
+\tPUSH
+\tCONST -1
+\tPRIM +
+\tPUSH
+\tOFFSETCLOSURE 0
+\tAPPLY 2
+\tRETURN 2
+L3:\tGRAB 1
+\tACC 0
+\tPUSH
+\tCONST 0
+\tPRIM =
+\tBRANCHIFNOT L4
+\tACC 1
+\tRETURN 2
+L4:\tACC 1
+\tPUSH
+\tACC 1
+\tGETFIELD 0
+\tPRIM +
+\tPUSH
+\tACC 1
+\tGETFIELD 1
+\tPUSH
+\tOFFSETCLOSURE 0
+\tAPPLY 2
+\tRETURN 2
+L5:\tCLOSUREREC L1,0
+\tCLOSUREREC L3,0
+\tCONST 0
+\tPUSH
+\tCONST %d
+\tPUSH
+\tACC 3
+\tAPPLY 2
+WORK:\tPUSH
+\tCONST 0
+\tPUSH
+\tACC 1
+\tPUSH
+\tACC 3
+\tAPPLY 2
+\tPOP
+\tPOP
+\tPOP
+\tSTOP
+"""
+
+
+def _new_vm(n):
+    vm = MiniZamVM()
+    vm.prog = list(map(LineInstruction.build, LineInstruction.parse(BUILD_THEN_SUM % n)))
+    vm.merge_tail_calls()
+    vm.fuse_branches()
+    return vm
+
+
+def bench(n, path):
+    start = time.perf_counter()
+    vm = _new_vm(n)
+    vm.run_until("WORK")
+    setup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    size = snapshot.save(vm, path)
+    save = time.perf_counter() - start
+
+    start = time.perf_counter()
+    restored = snapshot.load(path)
+    restore = time.perf_counter() - start
+
+    expected = vm.run().acc.value
+    assert restored.run().acc.value == expected == n * (n + 1) // 2
+
+    print("n=%-8d snapshot %9d octets (%5.1f o/élément)  init %8.1f ms  écriture %7.1f ms"
+          "  restauration %7.1f ms (x%.1f)"
+          % (n, size, size / n, setup * 1e3, save * 1e3, restore * 1e3, setup / restore))
+
+
+def main(argv):
+    sizes = [int(arg) for arg in argv] or [1000, 10000, 50000]
+    fd, path = tempfile.mkstemp(suffix=".mzsnap")
+    os.close(fd)
+    try:
+        for n in sizes:
+            bench(n, path)
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
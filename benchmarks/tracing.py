@@ -0,0 +1,46 @@
+"""
+Benchmark de la compilation des boucles terminales (MiniZamVM.enable_tracing) sur
+des boucles de n tours (1 million par défaut) :
+
+    python -m benchmarks.tracing [n]
+
+La version interprétée de chaque boucle est exécutée une fois, ce qui prend
+plusieurs dizaines de secondes pour n = 1000000.
+"""
+
+import sys
+import time
+
+from src.minizam.vm.vm import MiniZamVM
+from .common import program_path
+from .workloads import tail_loop
+
+
+def _programs(n):
+    with open(program_path("appterm/fun_appterm.txt")) as f:
+        countdown = f.read().replace("CONST 234", "CONST %d" % n)
+    return [("tail_loop (workloads)", tail_loop(n)), ("appterm/fun_appterm.txt", countdown)]
+
+
+def _run(text, tracing):
+    vm = MiniZamVM()
+    vm.load_text(text)
+    vm.optimize()
+    tracer = vm.enable_tracing() if tracing else None
+    start = time.perf_counter()
+    result = vm.run()
+    return time.perf_counter() - start, result.acc, tracer
+
+
+def main(argv):
+    n = int(argv[0]) if argv else 1000000
+    for name, program in _programs(n):
+        plain, plain_acc, _ = _run(program, False)
+        traced, traced_acc, tracer = _run(program, True)
+        assert plain_acc.value == traced_acc.value
+        print("%-26s %d tours  interprété %8.2f s  tracé %8.3f s  x%.0f  %s"
+              % (name, n, plain, traced, plain / traced, tracer.stats()))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
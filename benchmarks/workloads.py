@@ -0,0 +1,438 @@
+"""
+Générateur de programmes Mini-ZAM synthétiques dont la taille est paramétrée,
+pour tracer des courbes de passage à l'échelle de chaque sous-système.
+
+    python -m benchmarks.workloads recursion 10000 -o recursion.txt
+    python -m benchmarks.workloads --curve recursion 1000 2000 4000 8000
+
+Chaque programme s'arrête avec dans acc une valeur qui ne dépend que de n
+(voir expected).
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from benchmarks.engines import ENGINES, count_instructions
+
+
+def recursion(n):
+    """
+    Récursion non terminale de profondeur n : sum n = if n = 0 then 0 else n + sum (n - 1)
+    """
+
+    return """\tBRANCH L2
+L1:\tACC 0
+\tPUSH
+\tCONST 0
+\tPRIM =
+\tBRANCHIFNOT L3
+\tCONST 0
+\tRETURN 1
+L3:\tCONST 1
+\tPUSH
+\tACC 1
+\tPRIM -
+\tPUSH
+\tOFFSETCLOSURE 0
+\tAPPLY 1
+\tPUSH
+\tACC 1
+\tPRIM +
+\tRETURN 1
+L2:\tCLOSUREREC L1,0
+\tCONST %d
+\tPUSH
+\tACC 1
+\tAPPLY 1
+\tPOP
+\tSTOP
+""" % n
+
+
+def tail_loop(n):
+    """
+    Boucle de n tours par APPTERM : loop i s = if i = 0 then s else loop (i - 1) (s + i)
+    """
+
+    return """\tBRANCH L2
+\tRESTART
+L1:\tGRAB 1
+\tACC 0
+\tPUSH
+\tCONST 0
+\tPRIM =
+\tBRANCHIFNOT L3
+\tACC 1
+\tRETURN 2
+L3:\tACC 0
+\tPUSH
+\tACC 2
+\tPRIM +
+\tPUSH
+\tCONST 1
+\tPUSH
+\tACC 2
+\tPRIM -
+\tPUSH
+\tOFFSETCLOSURE 0
+\tAPPTERM 2,4
+L2:\tCLOSUREREC L1,0
+\tCONST 0
+\tPUSH
+\tCONST %d
+\tPUSH
+\tACC 2
+\tAPPLY 2
+\tPOP
+\tSTOP
+""" % n
+
+
+def array_values(n):
+    """
+    :return: les n entiers pseudo-aléatoires du tableau trié par array_sort
+    """
+
+    generator = random.Random(n)
+    return [generator.randint(0, 1000) for _ in range(n)]
+
+
+def array_sort(n):
+    """
+    Construction d'un tableau de n entiers par MAKEBLOCK puis tri par insertion en place
+    (GETVECTITEM / SETVECTITEM) ; le résultat est le plus grand élément
+    """
+
+    n = max(n, 2)
+    values = array_values(n)
+    build = []
+    for v in reversed(values[1:]):
+        build.append("\tCONST %d\n\tPUSH\n" % v)
+    build.append("\tCONST %d\n\tMAKEBLOCK %d\n" % (values[0], n))
+
+    # inner j a : fait descendre a.(j) tant que a.(j - 1) > a.(j)
+    # outer i a : insère a.(i) puis a.(i + 1) ...
+    return """\tBRANCH L6
+\tRESTART
+L1:\tGRAB 1
+\tACC 0
+\tPUSH
+\tCONST 0
+\tPRIM =
+\tBRANCHIFNOT L2
+\tCONST 0
+\tRETURN 2
+L2:\tACC 0
+\tPUSH
+\tACC 2
+\tGETVECTITEM
+\tPUSH
+\tCONST 1
+\tPUSH
+\tACC 2
+\tPRIM -
+\tPUSH
+\tACC 3
+\tGETVECTITEM
+\tPUSH
+\tACC 1
+\tPUSH
+\tACC 1
+\tPRIM >
+\tBRANCHIFNOT L3
+\tACC 1
+\tPUSH
+\tCONST 1
+\tPUSH
+\tACC 4
+\tPRIM -
+\tPUSH
+\tACC 5
+\tSETVECTITEM
+\tACC 0
+\tPUSH
+\tACC 3
+\tPUSH
+\tACC 5
+\tSETVECTITEM
+\tACC 3
+\tPUSH
+\tCONST 1
+\tPUSH
+\tACC 4
+\tPRIM -
+\tPUSH
+\tOFFSETCLOSURE 0
+\tAPPTERM 2,6
+L3:\tCONST 0
+\tRETURN 4
+\tRESTART
+L4:\tGRAB 1
+\tACC 1
+\tVECTLENGTH
+\tPUSH
+\tACC 1
+\tPRIM =
+\tBRANCHIFNOT L5
+\tACC 1
+\tRETURN 2
+L5:\tACC 1
+\tPUSH
+\tACC 1
+\tPUSH
+\tENVACC 1
+\tAPPLY 2
+\tACC 1
+\tPUSH
+\tCONST 1
+\tPUSH
+\tACC 2
+\tPRIM +
+\tPUSH
+\tOFFSETCLOSURE 0
+\tAPPTERM 2,4
+L6:\tCLOSUREREC L1,0
+\tACC 0
+\tCLOSUREREC L4,1
+%s\tPUSH
+\tCONST 1
+\tPUSH
+\tACC 2
+\tAPPLY 2
+\tPUSH
+\tCONST %d
+\tPUSH
+\tACC 1
+\tGETVECTITEM
+\tSTOP
+""" % ("".join(build), n - 1)
+
+
+def lists(n):
+    """
+    Construction d'une liste de n éléments par une boucle terminale, puis somme de ses
+    éléments par une seconde boucle terminale
+    """
+
+    return """\tBRANCH L5
+\tRESTART
+L1:\tGRAB 1
+\tACC 0
+\tPUSH
+\tCONST 0
+\tPRIM =
+\tBRANCHIFNOT L2
+\tACC 1
+\tRETURN 2
+L2:\tACC 1
+\tPUSH
+\tACC 1
+\tMAKEBLOCK 2
+\tPUSH
+\tCONST 1
+\tPUSH
+\tACC 2
+\tPRIM -
+\tPUSH
+\tOFFSETCLOSURE 0
+\tAPPTERM 2,4
+\tRESTART
+L3:\tGRAB 1
+\tACC 0
+\tBRANCHIFNOT L4
+\tACC 0
+\tGETFIELD 0
+\tPUSH
+\tACC 2
+\tPRIM +
+\tPUSH
+\tACC 1
+\tGETFIELD 1
+\tPUSH
+\tOFFSETCLOSURE 0
+\tAPPTERM 2,4
+L4:\tACC 1
+\tRETURN 2
+L5:\tCLOSUREREC L1,0
+\tCLOSUREREC L3,0
+\tCONST 0
+\tPUSH
+\tCONST 0
+\tPUSH
+\tCONST %d
+\tPUSH
+\tACC 4
+\tAPPLY 2
+\tPUSH
+\tACC 2
+\tAPPLY 2
+\tSTOP
+""" % n
+
+
+def exceptions(n):
+    """
+    n gestionnaires imbriqués :
+        f n = try (if n = 0 then raise 0 else f (n - 1)) with e -> raise (e + 1)
+    l'exception traverse les n gestionnaires avant d'être rattrapée au niveau principal
+    """
+
+    return """\tBRANCH L4
+L1:\tPUSHTRAP L2
+\tACC 4
+\tPUSH
+\tCONST 0
+\tPRIM =
+\tBRANCHIFNOT L3
+\tCONST 0
+\tRAISE
+L3:\tCONST 1
+\tPUSH
+\tACC 5
+\tPRIM -
+\tPUSH
+\tOFFSETCLOSURE 0
+\tAPPLY 1
+\tPOPTRAP
+\tRETURN 1
+L2:\tPUSH
+\tCONST 1
+\tPUSH
+\tACC 1
+\tPRIM +
+\tRAISE
+L4:\tCLOSUREREC L1,0
+\tPUSHTRAP L5
+\tCONST %d
+\tPUSH
+\tACC 5
+\tAPPLY 1
+\tPOPTRAP
+L5:\tSTOP
+""" % n
+
+
+def partial(n):
+    """
+    n tours d'une boucle qui applique add3 a b c = a + b + c un argument à la fois :
+        loop i s = if i = 0 then s else loop (i - 1) (((add3 i) s) 1)
+    """
+
+    return """\tBRANCH L4
+\tRESTART
+L1:\tGRAB 2
+\tACC 2
+\tPUSH
+\tACC 2
+\tPUSH
+\tACC 2
+\tPRIM +
+\tPRIM +
+\tRETURN 3
+\tRESTART
+L2:\tGRAB 1
+\tACC 0
+\tPUSH
+\tCONST 0
+\tPRIM =
+\tBRANCHIFNOT L3
+\tACC 1
+\tRETURN 2
+L3:\tCONST 1
+\tPUSH
+\tACC 2
+\tPUSH
+\tACC 2
+\tPUSH
+\tENVACC 1
+\tAPPLY 1
+\tAPPLY 1
+\tAPPLY 1
+\tPUSH
+\tCONST 1
+\tPUSH
+\tACC 2
+\tPRIM -
+\tPUSH
+\tOFFSETCLOSURE 0
+\tAPPTERM 2,4
+L4:\tCLOSURE L1,0
+\tPUSH
+\tACC 0
+\tCLOSUREREC L2,1
+\tCONST 0
+\tPUSH
+\tCONST %d
+\tPUSH
+\tACC 2
+\tAPPLY 2
+\tSTOP
+""" % n
+
+
+WORKLOADS = {"recursion": recursion, "tail_loop": tail_loop, "array_sort": array_sort,
+             "lists": lists, "exceptions": exceptions, "partial": partial}
+
+
+def expected(name, n):
+    """
+    :return: la valeur de acc attendue à la fin du programme name de taille n
+    """
+
+    if name in ("recursion", "tail_loop", "lists"):
+        return n * (n + 1) // 2
+    if name == "array_sort":
+        return max(array_values(max(n, 2)))
+    if name == "exceptions":
+        return n + 1
+    return n * (n + 1) // 2 + n
+
+
+def curve(name, sizes, engine):
+    """
+    Exécute le programme name pour chaque taille de sizes
+
+    :return: la liste des mesures (taille, instructions, secondes, ns par instruction)
+    """
+
+    points = []
+    for n in sizes:
+        text = WORKLOADS[name](n)
+        instructions = count_instructions(text)
+        vm = engine.load(text)
+        start = time.perf_counter()
+        result = engine.execute(vm)
+        elapsed = time.perf_counter() - start
+        if result.acc.value != expected(name, n):
+            raise AssertionError("%s(%d) : acc = %s" % (name, n, result.acc))
+        points.append((n, instructions, elapsed, elapsed * 1e9 / instructions))
+    return points
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("workload", choices=sorted(WORKLOADS))
+    parser.add_argument("sizes", type=int, nargs="+")
+    parser.add_argument("-o", "--output", help="fichier du programme généré (par défaut la sortie standard)")
+    parser.add_argument("--curve", action="store_true", help="mesure le temps d'exécution pour chaque taille")
+    parser.add_argument("--engine", default="plain", choices=sorted(ENGINES))
+    args = parser.parse_args(argv)
+
+    if args.curve:
+        print("%10s %14s %10s %12s" % ("n", "instructions", "s", "ns/instr"))
+        for n, instructions, elapsed, per in curve(args.workload, args.sizes, ENGINES[args.engine]):
+            print("%10d %14d %10.3f %12.1f" % (n, instructions, elapsed, per))
+        return
+
+    text = WORKLOADS[args.workload](args.sizes[0])
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+
+
+if __name__ == "__main__":
+    main()
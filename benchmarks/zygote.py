@@ -0,0 +1,100 @@
+"""
+Latence de bout en bout d'une exécution de programme : démarrage à froid d'un
+interpréteur Python contre requête au serveur zygote (src.minizam.vm.zygote).
+
+    ocamlzam   python -m src.ocamlzam programme (imports de click, de la machine...)
+    froid      python qui importe MiniZamVM puis exécute le programme, comme ocamlzam
+               sans click (qui n'est pas toujours installé)
+    client     python -m src.zamclient programme : démarrage d'un interpréteur minimal,
+               exécution dans un fils du serveur
+    requête    client.run depuis ce processus : la part du serveur (connexion, fork,
+               exécution) sans le démarrage du client
+
+    python -m benchmarks.zygote [--repeat 20]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from src.minizam.vm import client
+from .common import ROOT, program_path
+
+PROGRAMS = ["unary_funs/fun1.txt", "rec_funs/fibo.txt", "block_values/liste_iter.txt"]
+
+COLD = "import sys; from src.minizam.vm.vm import MiniZamVM; vm = MiniZamVM(); vm.load_file(sys.argv[1]); vm.run()"
+
+
+def latencies(fn, repeat):
+    """
+    :return: les durées en millisecondes de repeat appels à fn
+    """
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def command(args):
+    """
+    :return: une fonction qui lance la commande args depuis la racine du dépôt, et
+        lève CalledProcessError si elle échoue
+    """
+
+    def run():
+        subprocess.run(args, cwd=ROOT, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    return run
+
+
+def start_server(path):
+    """
+    :return: le processus du serveur zygote, prêt à recevoir des requêtes
+    """
+
+    server = subprocess.Popen([sys.executable, "-m", "src.minizam.vm.zygote", "--socket", path], cwd=ROOT,
+                              stdout=subprocess.PIPE, text=True)
+    server.stdout.readline()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=20, help="nombre d'exécutions par mode")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "zygote.sock")
+        server = start_server(path)
+        try:
+            with open(os.devnull, "w") as devnull:
+                print("%-28s %-9s %10s %10s" % ("programme", "mode", "médiane (ms)", "p90 (ms)"))
+                for name in PROGRAMS:
+                    program = program_path(name)
+                    modes = [("ocamlzam", command([sys.executable, "-m", "src.ocamlzam", program])),
+                             ("froid", command([sys.executable, "-c", COLD, program])),
+                             ("client", command([sys.executable, "-m", "src.zamclient", "--socket", path,
+                                                 program])),
+                             ("requête", lambda: client.run(program, (), path, (0, devnull.fileno(), 2)))]
+                    for mode, fn in modes:
+                        try:
+                            times = sorted(latencies(fn, args.repeat))
+                        except subprocess.CalledProcessError as e:
+                            error = e.stderr.decode("utf-8").strip().splitlines()
+                            print("%-28s %-9s indisponible : %s" % (name, mode, error[-1] if error else e))
+                            continue
+                        print("%-28s %-9s %10.2f %10.2f" % (name, mode, statistics.median(times),
+                                                             times[int(0.9 * (len(times) - 1))]))
+        finally:
+            client.stop(path)
+            server.wait()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,151 @@
+import time
+import weakref
+
+FRAME_WORDS = 3  # pc, env et extra_args de l'appelant
+WORD_BYTES = 8
+
+
+def _bytes(words):
+    """
+    :return: la taille en octets d'une allocation de words mots, en-tête compris
+    """
+
+    return (words + 1) * WORD_BYTES
+
+
+class AllocationSite:
+    """
+    Compteurs des allocations d'une instruction du programme
+    """
+
+    def __init__(self, pc, command):
+        self.pc = pc
+        self.command = command
+        self.allocations = 0
+        self.bytes = 0
+        self.live = 0  # None pour les blocs de retour, qui ne sont pas suivis
+        self.live_bytes = 0
+        self.freed = 0
+
+
+class AllocationProfiler:
+    """
+    Profil des allocations d'une machine par position dans le programme (voir
+    MiniZamVM.enable_allocation_profiling). Chaque bloc ou fermeture alloué est suivi
+    par une référence faible jusqu'à sa libération ; les blocs de retour des appels
+    sont comptés sans être suivis. Toutes les interval allocations, la série
+    temporelle reçoit le temps écoulé, le nombre d'allocations, les octets vivants et
+    la taille de la pile.
+    """
+
+    def __init__(self, prog, interval=1000):
+        """
+        :param prog: le programme profilé, pour nommer les positions par leur label
+        :param interval: nombre d'allocations entre deux points de la série
+        """
+
+        self.prog = prog
+        self.interval = interval
+        self.sites = {}  # position -> AllocationSite
+        # id de la référence faible -> (référence, site, octets) : les valeurs ne sont pas hachables
+        self.refs = {}
+        self.allocations = 0
+        self.live_bytes = 0
+        self.series = []  # (secondes, allocations, octets vivants, cases de la pile)
+        self.start = time.perf_counter()
+
+    def site(self, pc, command):
+        site = self.sites.get(pc)
+        if site is None:
+            site = self.sites[pc] = AllocationSite(pc, command)
+        return site
+
+    def record(self, vm, pc, command, value, words):
+        """
+        Attribue à la position pc l'allocation de value, de words mots
+        """
+
+        site = self.site(pc, command)
+        size = _bytes(words)
+        site.allocations += 1
+        site.bytes += size
+        site.live += 1
+        site.live_bytes += size
+        self.live_bytes += size
+        ref = weakref.ref(value, self.free)
+        self.refs[id(ref)] = (ref, site, size)
+        self.allocations += 1
+        if self.allocations % self.interval == 0:
+            self.sample(vm)
+
+    def frame(self, vm, pc, command):
+        """
+        Attribue à la position pc le bloc de retour empilé par un appel
+        """
+
+        site = self.site(pc, command)
+        site.live = None
+        site.allocations += 1
+        site.bytes += FRAME_WORDS * WORD_BYTES
+        self.allocations += 1
+        if self.allocations % self.interval == 0:
+            self.sample(vm)
+
+    def free(self, ref):
+        _, site, size = self.refs.pop(id(ref))
+        site.live -= 1
+        site.live_bytes -= size
+        site.freed += 1
+        self.live_bytes -= size
+
+    def sample(self, vm):
+        """
+        Ajoute un point à la série temporelle
+        """
+
+        self.series.append((time.perf_counter() - self.start, self.allocations, self.live_bytes,
+                            vm.stack.size()))
+
+    def name(self, pc):
+        """
+        :return: le nom de la position pc : le label qui la précède et le décalage
+        """
+
+        for i in range(pc, -1, -1):
+            label = self.prog[i].label
+            if label:
+                return label if i == pc else "%s+%d" % (label, pc - i)
+        return str(pc)
+
+    def top(self, n=10, key="bytes"):
+        """
+        :param key: "bytes" (octets alloués), "allocations" ou "live_bytes" (octets vivants)
+        :return: les n sites qui allouent le plus
+        """
+
+        return sorted(self.sites.values(), key=lambda site: getattr(site, key), reverse=True)[:n]
+
+    def report(self, n=10, key="bytes"):
+        """
+        :return: le texte du rapport des n sites qui allouent le plus
+        """
+
+        lines = ["%-16s %-12s %12s %14s %10s %14s %10s" % ("site", "commande", "allocations", "octets",
+                                                             "vivants", "octets vivants", "libérés")]
+        for site in self.top(n, key):
+            live = "-" if site.live is None else str(site.live)
+            lines.append("%-16s %-12s %12d %14d %10s %14d %10d" % (
+                "%s (%d)" % (self.name(site.pc), site.pc), site.command, site.allocations, site.bytes,
+                live, site.live_bytes, site.freed))
+        lines.append("total : %d allocations, %d octets vivants" % (self.allocations, self.live_bytes))
+        return "\n".join(lines) + "\n"
+
+    def write_series(self, path):
+        """
+        Écrit la série temporelle dans path au format CSV
+        """
+
+        with open(path, "w") as f:
+            f.write("seconds,allocations,live_bytes,stack\n")
+            for point in self.series:
+                f.write("%.6f,%d,%d,%d\n" % point)
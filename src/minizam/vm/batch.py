@@ -0,0 +1,543 @@
+"""
+Exécution par lots : un même programme sur de nombreuses entrées, en parallèle.
+
+L'entrée de chaque exécution est l'opérande des instructions CONST placeholder du
+programme (comme benchmarks.common.set_const). Les exécutions (voies) qui suivent le
+même chemin avancent ensemble dans une warp : un seul décodage par instruction, les
+valeurs qui diffèrent d'une voie à l'autre sont des tableaux NumPy d'entiers sur 64 bits
+et les primitives arithmétiques et de comparaison s'appliquent à toutes les voies d'un
+coup. Tout ce qui sert au contrôle (pointeurs de code, environnements, fermetures, blocs
+de retour) est commun aux voies d'une warp.
+
+Un branchement dont la condition diffère selon les voies partage la warp en deux,
+exécutées l'une après l'autre. Les voies qui sortent du cas vectorisé (débordement
+des entiers sur 64 bits, division par zéro, instruction non vectorisée comme
+MAKEBLOCK, PRIM print ou RAISE, fermeture qui capture une valeur différente selon les
+voies, erreur) sont rejouées une par une sur une MiniZamVM, du début : leur résultat
+est exactement celui d'une exécution séquentielle.
+
+NumPy est une dépendance optionnelle, requise seulement par ce module.
+"""
+
+from .instructions import GENERIC_COMMANDS, FUSED_BRANCHES, Prim
+from .mlvalue import MLValue
+from .output import OutputChannel
+from .vm import MiniZamVM, LineInstruction, RunResult
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_FLOAT_EXACT = 2.0 ** 53  # au-delà, la division flottante de NumPy n'est plus celle de _Div
+_MUL_LIMIT = 2.0 ** 62  # produit dont le signe ou la valeur ne tient peut-être plus sur 64 bits
+_INT64_MIN = -2 ** 63
+_INT64_MAX = 2 ** 63 - 1
+
+_COMPARISONS = {"=": "equal", "<>": "not_equal", "<": "less", "<=": "less_equal",
+                ">": "greater", ">=": "greater_equal"}
+
+# commandes qui s'exécutent comme une commande du lot quand la machine n'a ni table
+# de mémoïsation ni traceur
+_PLAIN_COMMANDS = {"MEMOAPPLY": "APPLY", "TRACEAPPTERM": "APPTERM"}
+
+
+class BatchError(Exception):
+    pass
+
+
+class _Unsupported(Exception):
+    """
+    Opération hors du cas vectorisé : les voies de la warp sont rejouées une par une
+    """
+
+
+class _Vector:
+    """
+    Valeur entière (ou booléenne) différente selon les voies d'une warp
+    """
+
+    __slots__ = ("values", "boolean")
+
+    def __init__(self, values, boolean=False):
+        """
+        :param values: tableau int64, une valeur par voie de la warp
+        :param boolean: les valeurs sont les booléens true (1) et false (0)
+        """
+
+        self.values = values
+        self.boolean = boolean
+
+    def select(self, mask):
+        return _Vector(self.values[mask], self.boolean)
+
+
+def _select(value, mask):
+    return value.select(mask) if isinstance(value, _Vector) else value
+
+
+class _Warp:
+    """
+    Voies qui exécutent la même instruction. La pile a son sommet en fin de liste
+    """
+
+    __slots__ = ("lanes", "pc", "acc", "stack", "env", "extra_args")
+
+    def __init__(self, lanes, pc=0, acc=None, stack=None, env=(), extra_args=0):
+        self.lanes = lanes
+        self.pc = pc
+        self.acc = MLValue.unit() if acc is None else acc
+        self.stack = [] if stack is None else stack
+        self.env = env
+        self.extra_args = extra_args
+
+    def select(self, mask):
+        """
+        :return: une nouvelle warp avec les voies de mask, dans le même état
+        """
+
+        return _Warp(self.lanes[mask], self.pc, _select(self.acc, mask),
+                     [_select(value, mask) for value in self.stack], self.env, self.extra_args)
+
+    def narrow(self, mask):
+        """
+        Ne garde que les voies de mask
+        """
+
+        self.lanes = self.lanes[mask]
+        self.acc = _select(self.acc, mask)
+        self.stack = [_select(value, mask) for value in self.stack]
+
+
+class BatchResult:
+    """
+    Résultats d'une exécution par lots, un RunResult par entrée. Les voies terminées
+    dans la warp ont un résultat entier ou booléen rangé dans un tableau ; result[i]
+    lève l'exception de l'entrée i si son exécution séquentielle a échoué.
+    """
+
+    def __init__(self, size):
+        self.values = np.zeros(size, dtype=np.int64)  # accumulateur final entier ou booléen
+        self.booleans = np.zeros(size, dtype=bool)  # l'accumulateur final est un booléen
+        self.vectorized = np.zeros(size, dtype=bool)  # values[i] est le résultat de l'entrée i
+        self.others = {}  # entrée -> RunResult, ou exception, des autres résultats
+        self.stats = {"warps": 1, "splits": 0, "instructions": 0, "ejected": 0}
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, i):
+        if self.vectorized[i]:
+            if self.booleans[i]:
+                acc = MLValue.true() if self.values[i] else MLValue.false()
+            else:
+                acc = MLValue.from_int(int(self.values[i]))
+            return RunResult(RunResult.STOPPED, acc, output="")
+        result = self.others[i]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def finish(self, lanes, acc):
+        """
+        Range l'accumulateur final des voies lanes
+        """
+
+        if isinstance(acc, _Vector):
+            self.values[lanes] = acc.values
+            self.booleans[lanes] = acc.boolean
+            self.vectorized[lanes] = True
+        elif acc is MLValue.true() or acc is MLValue.false():
+            self.values[lanes] = acc.value
+            self.booleans[lanes] = True
+            self.vectorized[lanes] = True
+        elif acc is not MLValue.unit() and type(acc.value) is int and _INT64_MIN <= acc.value <= _INT64_MAX:
+            self.values[lanes] = acc.value
+            self.vectorized[lanes] = True
+        else:
+            result = RunResult(RunResult.STOPPED, acc, output="")
+            for lane in lanes.tolist():
+                self.others[lane] = result
+
+
+class BatchRunner:
+    """
+    Exécute le programme d'une machine sur un lot d'entrées, voir run_batch
+    """
+
+    def __init__(self, vm, inputs, placeholder):
+        """
+        :param vm: la machine dont le programme est exécuté (elle n'est pas modifiée)
+        :param inputs: les entrées, des entiers sur 64 bits
+        :param placeholder: l'opérande des CONST remplacés par l'entrée de chaque voie
+        """
+
+        if np is None:
+            raise BatchError("batch execution requires numpy")
+        self.vm = vm
+        self.prog = vm.prog
+        self.inputs = np.asarray(inputs, dtype=np.int64)
+        self.placeholder = placeholder
+        if not any(self.command(inst) == "CONST" and inst.args == placeholder for inst in self.prog):
+            raise BatchError("no CONST %s in the program" % placeholder)
+        self.result = BatchResult(len(self.inputs))
+        self.ejected = []
+        self.handlers = {"CONST": self.const, "ACC": self.acc_, "PUSH": self.push, "POP": self.pop,
+                         "ENVACC": self.envacc, "PRIM": self.prim, "BRANCH": self.branch,
+                         "BRANCHIFNOT": self.branch_if_not, "CLOSURE": self.closure,
+                         "CLOSUREREC": self.closure_rec, "OFFSETCLOSURE": self.offset_closure,
+                         "APPLY": self.apply, "APPTERM": self.appterm, "RETURN": self.return_,
+                         "GRAB": self.grab, "RESTART": self.restart, "STOP": self.stop}
+        for op, (name, test) in FUSED_BRANCHES.items():
+            self.handlers[name] = self.compare_branch(test)
+            self.handlers[name + "I"] = self.compare_branch_immediate(test)
+
+    @staticmethod
+    def command(inst):
+        command = GENERIC_COMMANDS.get(inst.command, inst.command)
+        return _PLAIN_COMMANDS.get(command, command)
+
+    def run(self):
+        """
+        :return: le BatchResult des entrées
+        """
+
+        pending = [_Warp(np.arange(len(self.inputs)))] if len(self.inputs) else []
+        while pending:
+            warp = pending.pop()
+            try:
+                self.execute(warp, pending)
+            except Exception:
+                self.eject(warp)
+        self.replay()
+        return self.result
+
+    def execute(self, warp, pending):
+        """
+        Exécute warp jusqu'à STOP, ou jusqu'à ce que toutes ses voies soient rejetées
+        """
+
+        prog = self.prog
+        handlers = self.handlers
+        stats = self.result.stats
+        while len(warp.lanes):
+            inst = prog[warp.pc]
+            warp.pc += 1
+            stats["instructions"] += 1
+            handler = handlers.get(self.command(inst))
+            if handler is None:
+                raise _Unsupported(inst.command)
+            if handler(warp, inst.args, pending):
+                return
+
+    def eject(self, warp, mask=None):
+        """
+        Rejette les voies de warp (celles de mask seulement, si donné) vers l'exécution
+        séquentielle
+        """
+
+        if mask is None:
+            self.ejected.append(warp.lanes)
+            warp.lanes = warp.lanes[:0]
+        else:
+            self.ejected.append(warp.lanes[mask])
+            warp.narrow(~mask)
+
+    def replay(self):
+        """
+        Exécute séquentiellement les voies rejetées ; les entrées égales partagent leur résultat
+        """
+
+        if not self.ejected:
+            return
+        lanes = np.concatenate(self.ejected)
+        self.result.stats["ejected"] = len(lanes)
+        results = {}
+        for lane in lanes.tolist():
+            value = int(self.inputs[lane])
+            if value not in results:
+                results[value] = self.sequential(value)
+            self.result.others[lane] = results[value]
+
+    def sequential(self, value):
+        """
+        :return: le RunResult de l'exécution du programme sur l'entrée value, ou l'exception levée
+        """
+
+        prog = []
+        for inst in self.prog:
+            command = GENERIC_COMMANDS.get(inst.command, inst.command)
+            args = value if command == "CONST" and inst.args == self.placeholder else inst.args
+            prog.append(inst if command == inst.command and args is inst.args
+                        else LineInstruction(inst.label, command, args))
+        vm = MiniZamVM(output=OutputChannel("memory"))
+        vm.prog = prog
+        try:
+            return vm.run()
+        except Exception as e:
+            return e
+
+    def split(self, warp, jump, target, pending, acc_jump=None, acc_next=None):
+        """
+        Branchement conditionnel : les voies de jump vont à target, les autres continuent.
+        Si elles divergent, les voies qui sautent forment une nouvelle warp.
+
+        :param acc_jump: l'accumulateur des voies qui sautent, s'il change
+        :param acc_next: l'accumulateur des autres voies, s'il change
+        """
+
+        if jump.all():
+            warp.pc = target
+            if acc_jump is not None:
+                warp.acc = acc_jump
+        elif not jump.any():
+            if acc_next is not None:
+                warp.acc = acc_next
+        else:
+            other = warp.select(jump)
+            other.pc = target
+            if acc_jump is not None:
+                other.acc = acc_jump
+            pending.append(other)
+            warp.narrow(~jump)
+            if acc_next is not None:
+                warp.acc = acc_next
+            self.result.stats["warps"] += 1
+            self.result.stats["splits"] += 1
+
+    @staticmethod
+    def operand(value):
+        """
+        :return: les valeurs NumPy d'un opérande entier, commun ou différent selon les voies
+        """
+
+        if isinstance(value, _Vector):
+            return value.values
+        if isinstance(value, MLValue) and type(value.value) is int and _INT64_MIN <= value.value <= _INT64_MAX:
+            return np.int64(value.value)
+        raise _Unsupported(value)
+
+    @staticmethod
+    def is_boolean(value):
+        if isinstance(value, _Vector):
+            return value.boolean
+        return value is MLValue.true() or value is MLValue.false()
+
+    # instructions
+
+    def const(self, warp, n, pending):
+        warp.acc = _Vector(self.inputs[warp.lanes]) if n == self.placeholder else MLValue.from_int(n)
+
+    def acc_(self, warp, index, pending):
+        warp.acc = warp.stack[-1 - index]
+
+    def push(self, warp, args, pending):
+        warp.stack.append(warp.acc)
+
+    def pop(self, warp, args, pending):
+        if not warp.stack:
+            raise _Unsupported("POP")
+        warp.stack.pop()
+
+    def envacc(self, warp, index, pending):
+        warp.acc = warp.env[index]
+
+    def prim(self, warp, op, pending):
+        one = warp.acc
+        if op in Prim.unary_op:
+            if not isinstance(one, _Vector):
+                warp.acc = Prim.unary_op[op].execute(one)
+            elif one.boolean:
+                warp.acc = _Vector(1 - one.values, True)
+            else:
+                raise _Unsupported(op)
+            return
+        if op not in Prim.binary_op:
+            raise _Unsupported(op)
+
+        two = warp.stack.pop()
+        if not isinstance(one, _Vector) and not isinstance(two, _Vector):
+            warp.acc = Prim.binary_op[op].execute(one, two)
+            return
+
+        a, b = self.operand(one), self.operand(two)
+        if op in ("and", "or"):
+            if not (self.is_boolean(one) and self.is_boolean(two)):
+                raise _Unsupported(op)
+            warp.acc = _Vector(a & b if op == "and" else a | b, True)
+        elif op in _COMPARISONS:
+            warp.acc = _Vector(getattr(np, _COMPARISONS[op])(a, b).astype(np.int64), True)
+        else:
+            values, invalid = self.arithmetic(op, a, b)
+            if invalid.any():
+                self.eject(warp, invalid)
+                values = values[~invalid]
+            warp.acc = _Vector(values)
+
+    @staticmethod
+    def arithmetic(op, a, b):
+        """
+        :return: le résultat de a op b et le masque des voies dont le résultat n'est pas
+            celui de MLValue (débordement, division par zéro ou inexacte)
+        """
+
+        if op == "+":
+            values = a + b
+            return values, ((a ^ values) & (b ^ values)) < 0
+        if op == "-":
+            values = a - b
+            return values, ((a ^ b) & (a ^ values)) < 0
+        fa, fb = np.float64(a) if np.ndim(a) == 0 else a.astype(np.float64), \
+            np.float64(b) if np.ndim(b) == 0 else b.astype(np.float64)
+        if op == "*":
+            return a * b, np.abs(fa * fb) >= _MUL_LIMIT
+        invalid = (b == 0) | (np.abs(fa) >= _FLOAT_EXACT) | (np.abs(fb) >= _FLOAT_EXACT)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            quotient = np.trunc(fa / np.where(invalid, 1.0, fb))
+        return quotient.astype(np.int64), invalid
+
+    def branch(self, warp, label, pending):
+        warp.pc = self.vm.get_position(label)
+
+    def branch_if_not(self, warp, label, pending):
+        acc = warp.acc
+        if isinstance(acc, _Vector):
+            self.split(warp, acc.values == 0, self.vm.get_position(label), pending)
+        elif acc == MLValue.false():
+            warp.pc = self.vm.get_position(label)
+
+    def compare_branch(self, test):
+        """
+        :return: le branchement fusionné qui saute si test(acc, v), v dépilé (BEQ, BLT...)
+        """
+
+        def execute(warp, label, pending):
+            self.fused_branch(warp, test, warp.acc, warp.stack.pop(), label, pending)
+        return execute
+
+    def compare_branch_immediate(self, test):
+        """
+        :return: le branchement fusionné qui saute si test(n, acc) (BEQI, BLTI...)
+        """
+
+        def execute(warp, args, pending):
+            n, label = args
+            self.fused_branch(warp, test, MLValue.from_int(n), warp.acc, label, pending)
+        return execute
+
+    def fused_branch(self, warp, test, one, two, label, pending):
+        if not isinstance(one, _Vector) and not isinstance(two, _Vector):
+            if type(one.value) is not int or type(two.value) is not int:
+                raise _Unsupported(label)
+            if test(one.value, two.value):
+                warp.acc = MLValue.false()
+                warp.pc = self.vm.get_position(label)
+            else:
+                warp.acc = MLValue.true()
+            return
+        jump = np.asarray(test(self.operand(one), self.operand(two)))
+        if jump.ndim == 0:
+            jump = np.full(len(warp.lanes), bool(jump))
+        self.split(warp, jump, self.vm.get_position(label), pending, MLValue.false(), MLValue.true())
+
+    def capture(self, warp, n, prefix):
+        """
+        :return: prefix suivi des n valeurs dépilées, qui doivent être communes aux voies
+        """
+
+        if n > len(warp.stack):
+            raise _Unsupported("capture")
+        values = warp.stack[len(warp.stack) - n:][::-1] if n else []
+        env = prefix + tuple(values)
+        if any(isinstance(value, _Vector) for value in env):
+            raise _Unsupported("capture")
+        if n:
+            del warp.stack[-n:]
+        return env
+
+    def closure(self, warp, args, pending):
+        label, n = args
+        pc = self.vm.get_position(label)
+        env = self.capture(warp, n - 1, (warp.acc,)) if n > 0 else ()
+        warp.acc = MLValue.from_closure(pc, env, self.vm.get_entry_point(pc))
+
+    def closure_rec(self, warp, args, pending):
+        label, n = args
+        pc = self.vm.get_position(label)
+        env = self.capture(warp, n - 1, (pc, warp.acc)) if n > 0 else (pc,)
+        warp.acc = MLValue.from_closure(pc, env, self.vm.get_entry_point(pc))
+        warp.stack.append(warp.acc)
+
+    def offset_closure(self, warp, args, pending):
+        warp.acc = MLValue.from_closure(warp.env[0], warp.env)
+
+    def apply_closure(self, warp, nargs):
+        closure = warp.acc
+        if isinstance(closure, _Vector):
+            raise _Unsupported("apply")
+        pc, warp.env = closure.value
+        arity, body = closure.entry if closure.entry is not None else self.vm.get_entry_point(pc)
+        if nargs >= arity:
+            warp.pc = body
+            warp.extra_args = nargs - arity
+        else:
+            warp.pc = pc
+            warp.extra_args = nargs - 1
+
+    def apply(self, warp, n, pending):
+        stack = warp.stack
+        position = len(stack) - n
+        stack[position:position] = (warp.extra_args, warp.env, warp.pc)
+        self.apply_closure(warp, n)
+
+    def appterm(self, warp, args, pending):
+        n, m = args
+        stack = warp.stack
+        del stack[len(stack) - m:len(stack) - n]
+        self.apply_closure(warp, warp.extra_args + n)
+
+    def return_(self, warp, n, pending):
+        stack = warp.stack
+        if n:
+            del stack[-n:]
+        if warp.extra_args == 0:
+            warp.pc = stack.pop()
+            warp.env = stack.pop()
+            warp.extra_args = stack.pop()
+        else:
+            self.apply_closure(warp, warp.extra_args)
+
+    def grab(self, warp, n, pending):
+        if warp.extra_args >= n:
+            warp.extra_args -= n
+            return
+        env = self.capture(warp, warp.extra_args + 1, (warp.env,))
+        warp.acc = MLValue.from_closure(warp.pc - 2, env)
+        warp.pc = warp.stack.pop()
+        warp.env = warp.stack.pop()
+        warp.extra_args = warp.stack.pop()
+
+    def restart(self, warp, args, pending):
+        env = warp.env
+        warp.stack.extend(reversed(env[1:]))
+        warp.extra_args += len(env) - 1
+        warp.env = env[0]
+
+    def stop(self, warp, args, pending):
+        self.result.finish(warp.lanes, warp.acc)
+        return True
+
+
+def run_batch(vm, inputs, placeholder):
+    """
+    Exécute le programme de vm une fois par entrée, en parallèle : chaque exécution
+    voit son entrée à la place de l'opérande des CONST placeholder
+
+    :param vm: la machine chargée ; son programme doit contenir CONST placeholder
+        (les passes qui propagent les constantes peuvent le faire disparaître)
+    :param inputs: les entrées, des entiers sur 64 bits
+    :param placeholder: l'opérande des CONST qui reçoivent l'entrée
+    :return: le BatchResult, qui donne un RunResult par entrée
+    """
+
+    return BatchRunner(vm, inputs, placeholder).run()
@@ -0,0 +1,106 @@
+"""
+Client léger du serveur zygote (voir zygote.py) : il transmet au serveur le chemin du
+programme, les options de ocamlzam et ses descripteurs d'entrée, de sortie et d'erreur,
+puis attend le code de sortie de l'exécution. Ce module n'importe que os, socket et sys,
+pour que le client démarre vite : une requête est une suite de lignes (la commande run
+ou stop, puis le chemin du programme et les options), la réponse le code de sortie.
+
+    python -m src.zamclient [-o] [-m] [-t] [--socket chemin] programme.txt
+"""
+
+import os
+import socket
+import sys
+
+SOCKET_ENV = "MINIZAM_SOCKET"
+
+OPTIONS = ("-o", "-m", "-t")
+
+
+def default_socket():
+    """
+    :return: le chemin de la socket du serveur : $MINIZAM_SOCKET, sinon un chemin propre
+        à l'utilisateur dans le répertoire temporaire
+    """
+
+    return os.environ.get(SOCKET_ENV) or os.path.join("/tmp", "minizam-%d.sock" % os.getuid())
+
+
+def encode(command, *fields):
+    """
+    :return: le message d'une requête
+    """
+
+    return "\n".join((command,) + fields).encode("utf-8")
+
+
+def decode(message):
+    """
+    :return: la commande et les champs d'une requête
+    """
+
+    command, *fields = message.decode("utf-8").split("\n")
+    return command, fields
+
+
+def send(path, message, fds=(0, 1, 2)):
+    """
+    Envoie une requête au serveur et attend sa réponse
+
+    :param path: le chemin de la socket du serveur
+    :param message: la requête, construite par encode
+    :param fds: les descripteurs d'entrée, de sortie et d'erreur transmis à l'exécution
+    :return: le code de sortie renvoyé par le serveur
+    """
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        socket.send_fds(sock, [message], list(fds))
+        chunks = []
+        while True:
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    if not chunks:
+        raise ConnectionError("no reply from the zygote server")
+    return int(b"".join(chunks))
+
+
+def run(program, options=(), path=None, fds=(0, 1, 2)):
+    """
+    Exécute un programme sur le serveur, avec les options de ocamlzam
+
+    :return: le code de sortie de l'exécution
+    """
+
+    return send(path or default_socket(), encode("run", os.path.abspath(program), *options), fds)
+
+
+def stop(path=None):
+    """
+    Arrête le serveur
+    """
+
+    return send(path or default_socket(), encode("stop"), ())
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    path = None
+    if "--socket" in argv:
+        i = argv.index("--socket")
+        path = argv[i + 1]
+        argv = argv[:i] + argv[i + 2:]
+    if argv == ["--stop"]:
+        stop(path)
+        return 0
+    if not argv or any(option not in OPTIONS for option in argv[:-1]):
+        print("usage: zamclient [-o] [-m] [-t] [--socket path] program.txt | --stop", file=sys.stderr)
+        return 2
+    sys.stdout.flush()
+    try:
+        return run(argv[-1], argv[:-1], path)
+    except (ConnectionError, FileNotFoundError) as e:
+        print("zamclient: zygote server unavailable (%s)" % e, file=sys.stderr)
+        return 2
@@ -0,0 +1,214 @@
+"""
+Segment de code partagé : des programmes décodés une fois, rangés dans un tampon
+immuable (mémoire partagée ou fichier projeté en mémoire) que des processus
+fils lisent sans reconstruire une LineInstruction par instruction.
+
+Le format est binaire (petit-boutiste) :
+
+    en-tête       MAGIC, nombre d'instructions (I), longueur des tables (I)
+    tables        JSON en UTF-8 : les instructions distinctes (commande, label, arguments)
+                  et, pour chaque programme, son nom, sa première instruction, sa longueur
+                  et ses labels
+    instructions  un entier (i) par instruction, aligné sur 4 octets : l'indice de
+                  l'instruction dans la table des instructions distinctes
+
+Les instructions identiques (la plupart des PUSH, ACC n, CONST n...) sont partagées :
+chaque processus ne décode que la table des instructions distinctes, et le tableau des
+instructions n'est jamais écrit après la construction du segment, ses pages restent
+partagées entre les processus (pas de copie à l'écriture due aux compteurs de références).
+Les passes d'optimisation (optimize) s'appliquent donc avant, à la construction. Les
+enable_* réécrivent le programme en place et rangent leur état dans la machine : ils
+refusent un programme partagé (ValueError), qui se charge alors avec load_text.
+"""
+
+import json
+import mmap
+import struct
+from multiprocessing import shared_memory
+
+from .vm import MiniZamVM, LineInstruction
+
+MAGIC = b"MZCODE1\0"
+
+_HEADER = struct.Struct("<8sII")
+
+
+class CodeSegmentError(Exception):
+    pass
+
+
+def build(programs, optimize=False):
+    """
+    Décode des programmes dans le format du segment
+
+    :param programs: les couples (nom, texte du programme)
+    :param optimize: applique MiniZamVM.optimize à chaque programme
+    :return: les octets du segment
+    """
+
+    distinct = {}
+    table = []
+    code = []
+    for name, text in programs:
+        vm = MiniZamVM()
+        vm.load_text(text)
+        if optimize:
+            vm.optimize()
+        positions = {}
+        table.append([name, len(code), len(vm.prog), positions])
+        for i, inst in enumerate(vm.prog):
+            if inst.label:
+                positions[inst.label] = i
+            key = json.dumps([inst.command, inst.label, inst.args])
+            code.append(distinct.setdefault(key, len(distinct)))
+
+    tables = json.dumps({"instructions": [json.loads(key) for key in distinct],
+                         "programs": table}).encode("utf-8")
+    tables += b" " * (-len(tables) % 4)
+    return b"".join([_HEADER.pack(MAGIC, len(code), len(tables)), tables,
+                     struct.pack("<%di" % len(code), *code)])
+
+
+class CodeSegment:
+    """
+    Segment de code en lecture seule, construit sur un tampon (bytes, mémoire partagée
+    ou fichier projeté). Les instructions distinctes sont décodées à l'ouverture.
+    """
+
+    def __init__(self, buffer, owner=None):
+        """
+        :param buffer: un objet qui supporte le protocole buffer, au format de build
+        :param owner: l'objet qui possède le tampon (SharedMemory ou mmap), fermé par close
+        """
+
+        view = memoryview(buffer)
+        if len(view) < _HEADER.size:
+            raise CodeSegmentError("truncated code segment")
+        magic, count, length = _HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise CodeSegmentError("not a code segment")
+        tables = json.loads(bytes(view[_HEADER.size:_HEADER.size + length]).decode("utf-8"))
+        start = _HEADER.size + length
+        self.owner = owner
+        self.view = view
+        self.code = view[start:start + count * 4].cast("i")
+        self.instructions = [LineInstruction(label, command, args)
+                             for command, label, args in tables["instructions"]]
+        self.programs = {name: (first, size, positions) for name, first, size, positions in tables["programs"]}
+
+    @classmethod
+    def create(cls, programs, optimize=False):
+        """
+        Construit le segment dans un bloc de mémoire partagée, hérité par les processus
+        créés par fork ou rattaché par son nom (voir attach)
+
+        :param programs: les couples (nom, texte du programme)
+        """
+
+        data = build(programs, optimize)
+        shm = shared_memory.SharedMemory(create=True, size=len(data))
+        shm.buf[:len(data)] = data
+        return cls(shm.buf, shm)
+
+    @classmethod
+    def attach(cls, name):
+        """
+        Ouvre le segment créé par un autre processus
+
+        :param name: le nom du bloc de mémoire partagée (segment.name)
+        """
+
+        shm = shared_memory.SharedMemory(name=name)
+        return cls(shm.buf, shm)
+
+    @classmethod
+    def open(cls, path):
+        """
+        Projette en mémoire, en lecture seule, un segment écrit par save
+        """
+
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mapped, mapped)
+
+    @staticmethod
+    def save(programs, path, optimize=False):
+        """
+        Écrit dans le fichier path le segment des programmes
+
+        :return: la taille du segment en octets
+        """
+
+        data = build(programs, optimize)
+        with open(path, "wb") as f:
+            f.write(data)
+        return len(data)
+
+    @property
+    def name(self):
+        """
+        Le nom du bloc de mémoire partagée, None pour un autre tampon
+        """
+
+        return self.owner.name if isinstance(self.owner, shared_memory.SharedMemory) else None
+
+    def names(self):
+        """
+        :return: les noms des programmes du segment
+        """
+
+        return list(self.programs)
+
+    def program(self, name):
+        """
+        :return: le ProgramView du programme name
+        """
+
+        first, size, positions = self.programs[name]
+        return ProgramView(self, first, size, positions)
+
+    def close(self):
+        """
+        Libère les vues sur le tampon et le ferme
+        """
+
+        self.code.release()
+        self.view.release()
+        if self.owner is not None:
+            self.owner.close()
+
+    def unlink(self):
+        """
+        Détruit le bloc de mémoire partagée (à appeler par le processus qui l'a créé)
+        """
+
+        if isinstance(self.owner, shared_memory.SharedMemory):
+            self.owner.unlink()
+
+
+class ProgramView:
+    """
+    Programme d'un CodeSegment, utilisable comme prog d'une machine. Les LineInstruction
+    sont partagées entre toutes les positions qui portent la même instruction : elles
+    ne doivent pas être modifiées
+    """
+
+    def __init__(self, segment, first, size, positions):
+        self.segment = segment
+        self.instructions = segment.instructions
+        self.code = segment.code
+        self.first = first
+        self.size = size
+        self.positions = positions
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.size:
+            raise IndexError("program index out of range")
+        return self.instructions[self.code[self.first + i]]
+
+    def __iter__(self):
+        for i in range(self.size):
+            yield self[i]
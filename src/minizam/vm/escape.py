@@ -0,0 +1,340 @@
+from .instructions import Prim
+from .memo import CONDITIONAL_BRANCHES
+
+# instructions qui terminent un chemin d'exécution de la fonction
+EXITS = {"RETURN", "APPTERM", "STOP", "RAISE"}
+
+# instructions sans effet sur la pile
+NEUTRAL = {"CONST", "ACC", "ENVACC", "OFFSETCLOSURE", "GETFIELD", "VECTLENGTH", "BRANCH",
+           "BRANCHIFNOT"} | EXITS
+
+
+def _stack_effect(inst):
+    """
+    :return: le nombre de cases dépilées puis empilées par inst, None pour une instruction
+        que l'analyse ne suit pas (ASSIGN, rattrapage d'exceptions, GRAB, appels déjà remplacés...)
+    """
+
+    command, args = inst.command, inst.args
+    if command in NEUTRAL:
+        return 0, 0
+    if command == "PUSH":
+        return 0, 1
+    if command in ("POP", "GETVECTITEM", "SETFIELD"):
+        return 1, 0
+    if command == "SETVECTITEM":
+        return 2, 0
+    if command == "PRIM":
+        return (1, 0) if args in Prim.binary_op else (0, 0)
+    if command == "APPLY":
+        return args, 0
+    if command == "MAKEBLOCK":
+        return max(args - 1, 0), 0
+    if command == "CLOSURE":
+        return max(args[1] - 1, 0), 0
+    if command == "CLOSUREREC":
+        return max(args[1] - 1, 0), 1
+    return None
+
+
+def _successors(prog, i, position):
+    """
+    Renvoie les positions des instructions qui peuvent suivre prog[i] dans la même fonction
+    """
+
+    inst = prog[i]
+    if inst.command in EXITS:
+        return []
+    if inst.command == "BRANCH":
+        return [position[inst.args]]
+    if inst.command in CONDITIONAL_BRANCHES:
+        label = inst.args[-1] if isinstance(inst.args, list) else inst.args
+        return [i + 1, position[label]]
+    return [i + 1]
+
+
+def _reachable(prog, entry, position):
+    """
+    :return: les positions des instructions atteignables depuis entry dans la même fonction
+    """
+
+    seen = set()
+    pending = [entry]
+    while pending:
+        i = pending.pop()
+        if i not in seen and i < len(prog):
+            seen.add(i)
+            pending.extend(_successors(prog, i, position))
+    return seen
+
+
+class BlockUnboxer:
+    """
+    Analyse d'échappement des blocs au chargement : un bloc qui n'échappe pas n'est pas alloué.
+        MAKEBLOCK n; GETFIELD i  ->  (ACC i-1;) POP × (n-1)
+        MAKEBLOCK n; PUSH; c; APPLY 1        ->  PUSH; c; UNBOXAPPLY n,L
+        MAKEBLOCK n; PUSH; c; APPTERM 1,m    ->  PUSH; c; UNBOXAPPTERM n,m+n-1,L
+            si c charge une fonction f qui ne fait que déstructurer son argument :
+            OFFSETCLOSURE dans une fonction récursive, ou ACC k qui lit une fermeture
+            créée dans le même bloc de base
+    Le code en L est une copie de f qui reçoit les n champs dans la pile, le champ 0 au
+    sommet, à la place du bloc : chaque ACC k; GETFIELD i qui lit le paramètre devient
+    ACC k+i, les cases sous le paramètre sont décalées de n-1.
+
+    f déstructure son argument si elle est unaire (sans GRAB), si toutes ses lectures du
+    paramètre sont suivies d'un GETFIELD i < n et si la profondeur de sa pile est connue
+    en chaque instruction (ni ASSIGN, ni PUSHTRAP, ni RESTART). À appliquer avant
+    fuse_branches.
+    """
+
+    def __init__(self, prog, instruction):
+        """
+        :param instruction: constructeur des instructions, appelé avec (label, commande, arguments)
+        """
+
+        self.prog = prog
+        self.instruction = instruction
+        self.position = {}
+        self.labels = {inst.label for inst in prog if inst.label}
+        self.unboxed = {}  # (label de f, n) -> label de sa copie, None si f ne déstructure pas
+        self.copies = []  # (label de f, instructions de la copie) à ajouter au programme
+        self.stats = {"local": 0, "functions": 0, "calls": 0}
+
+    def run(self):
+        """
+        :return: le programme transformé
+        """
+
+        if not self.prog or self.prog[-1].command not in EXITS | {"BRANCH"}:
+            # les copies sont ajoutées à la fin : le programme ne doit pas y arriver
+            return self.prog
+        self.prog = self.local(self.prog)
+        self.position = {inst.label: i for i, inst in enumerate(self.prog) if inst.label}
+        out = self.calls(self.prog, self.functions())
+        while self.copies:
+            # les copies sont prises dans le programme d'origine, leurs appels sont remplacés ici
+            label, code = self.copies.pop(0)
+            out += self.calls(code, dict.fromkeys(range(len(code)), label))
+        self.prog = out
+        return self.prog
+
+    def local(self, prog):
+        """
+        Remplace les MAKEBLOCK suivis d'un GETFIELD
+        """
+
+        out = []
+        i = 0
+        while i < len(prog):
+            inst = prog[i]
+            if inst.command == "MAKEBLOCK" and inst.args > 1 and i + 1 < len(prog) \
+                    and prog[i + 1].command == "GETFIELD" and not prog[i + 1].label \
+                    and prog[i + 1].args < inst.args:
+                field = prog[i + 1].args
+                replacement = [self.instruction(None, "ACC", field - 1)] if field else []
+                replacement += [self.instruction(None, "POP", []) for _ in range(inst.args - 1)]
+                replacement[0].label = inst.label
+                out += replacement
+                self.stats["local"] += 1
+                i += 2
+            else:
+                out.append(inst)
+                i += 1
+        return out
+
+    def functions(self):
+        """
+        :return: position -> label de la fonction récursive qui contient seule cette
+            instruction, où OFFSETCLOSURE charge donc cette fonction
+        """
+
+        prog, position = self.prog, self.position
+        rec = {inst.args[0] for inst in prog if inst.command == "CLOSUREREC"}
+        plain = {inst.args[0] for inst in prog if inst.command == "CLOSURE"}
+        count = dict.fromkeys(_reachable(prog, 0, position), 1)
+        owners = {}
+        for label in rec | plain:
+            for i in _reachable(prog, position[label], position):
+                count[i] = count.get(i, 0) + 1
+                owners[i] = label
+        # une fonction créée par CLOSURE n'a pas son propre code en env[0]
+        return {i: label for i, label in owners.items() if count[i] == 1 and label not in plain}
+
+    def calls(self, prog, owners):
+        """
+        :param owners: position -> label de la fonction chargée par l'OFFSETCLOSURE en
+            cette position
+        :return: prog dont les appels de fonctions déstructurantes sont remplacés
+        """
+
+        replaced = {}
+        stack = []  # label des fermetures empilées depuis le début du bloc de base, ou None
+        acc = None
+        for i, inst in enumerate(prog):
+            if inst.label:
+                stack, acc = [], None
+            command, args = inst.command, inst.args
+            if command in ("APPLY", "APPTERM") and acc is not None and i >= 3:
+                call = self.call(prog[i - 3:i + 1], acc)
+                if call is not None:
+                    replaced[i - 3] = call
+            effect = _stack_effect(inst)
+            if command == "ACC":
+                acc = stack[-1 - args] if args < len(stack) else None
+            elif command == "OFFSETCLOSURE":
+                acc = owners.get(i)
+            elif command in ("CLOSURE", "CLOSUREREC"):
+                del stack[max(len(stack) - effect[0], 0):]
+                acc = args[0]
+                if command == "CLOSUREREC":
+                    stack.append(acc)
+            elif command == "PUSH":
+                stack.append(acc)
+            elif effect is None or command in ("APPLY", "BRANCH") or command in EXITS:
+                stack, acc = [], None
+            else:
+                del stack[max(len(stack) - effect[0], 0):]
+                acc = None
+
+        out = []
+        i = 0
+        while i < len(prog):
+            if i in replaced:
+                out += replaced[i]
+                i += 4
+            else:
+                out.append(prog[i])
+                i += 1
+        return out
+
+    def call(self, seq, closure):
+        """
+        :param seq: les instructions MAKEBLOCK n; PUSH; c; APPLY 1 (ou APPTERM 1,m) d'un appel
+        :param closure: le label de la fermeture chargée par c
+        :return: les instructions de l'appel sans bloc, None si seq n'en est pas un
+        """
+
+        make, push, load, apply = seq
+        if make.command != "MAKEBLOCK" or make.args < 1 or push.command != "PUSH" \
+                or load.command not in ("OFFSETCLOSURE", "ACC") or push.label or load.label or apply.label \
+                or (apply.args if apply.command == "APPLY" else apply.args[0]) != 1:
+            return None
+        n = make.args
+        label = self.unboxed_copy(closure, n)
+        if label is None:
+            return None
+        self.stats["calls"] += 1
+        if load.command == "ACC":
+            # les n - 1 autres champs restent dans la pile
+            load = self.instruction(None, "ACC", load.args + n - 1)
+        if apply.command == "APPLY":
+            apply = self.instruction(None, "UNBOXAPPLY", [n, label])
+        else:
+            apply = self.instruction(None, "UNBOXAPPTERM", [n, apply.args[1] + n - 1, label])
+        return [self.instruction(make.label, "PUSH", []), load, apply]
+
+    def unboxed_copy(self, label, n):
+        """
+        :return: le label de la copie de la fonction label qui reçoit les n champs de son
+            argument dans la pile, None si la fonction ne déstructure pas son argument
+        """
+
+        key = (label, n)
+        if key not in self.unboxed:
+            copy = self.copy(label, n)
+            self.unboxed[key] = None if copy is None else copy[0]
+            if copy is not None:
+                self.copies.append((label, copy[1]))
+                self.stats["functions"] += 1
+        return self.unboxed[key]
+
+    def depths(self, entry):
+        """
+        :return: position -> nombre de cases au-dessus du paramètre avant l'instruction,
+            None si une profondeur est inconnue ou si le paramètre peut être dépilé
+        """
+
+        prog, position = self.prog, self.position
+        depths = {entry: 0}
+        pending = [entry]
+        while pending:
+            i = pending.pop()
+            inst, depth = prog[i], depths[i]
+            effect = _stack_effect(inst)
+            if effect is None or effect[0] > depth:
+                return None
+            if inst.command == "RETURN" and inst.args <= depth \
+                    or inst.command == "APPTERM" and inst.args[1] <= depth:
+                return None
+            after = depth - effect[0] + effect[1]
+            for j in _successors(prog, i, position):
+                if j >= len(prog) or depths.get(j, after) != after:
+                    return None
+                if j not in depths:
+                    depths[j] = after
+                    pending.append(j)
+        return depths
+
+    def copy(self, label, n):
+        """
+        :return: le label d'entrée et les instructions de la copie, None si la fonction ne
+            déstructure pas son argument
+        """
+
+        prog = self.prog
+        entry = self.position.get(label)
+        if entry is None or prog[entry].command == "GRAB":
+            return None
+        depths = self.depths(entry)
+        if depths is None:
+            return None
+        body = sorted(depths)
+        rename = {prog[i].label: self.fresh(prog[i].label) for i in body if prog[i].label}
+        code = []
+        for i in body:
+            inst, depth = prog[i], depths[i]
+            command, args = inst.command, inst.args
+            if command == "GETFIELD" and prog[i - 1].command == "ACC" \
+                    and prog[i - 1].args == depths.get(i - 1) and not inst.label:
+                # GETFIELD déjà lu avec l'ACC qui le précède
+                continue
+            if command == "ACC" and args == depth:
+                field = prog[i + 1]
+                if field.command != "GETFIELD" or field.label or field.args >= n:
+                    return None
+                args = depth + field.args
+            elif command == "ACC" and args > depth:
+                args += n - 1
+            elif command == "RETURN":
+                args += n - 1
+            elif command == "APPTERM":
+                args = [args[0], args[1] + n - 1]
+            elif command in ("BRANCH", "BRANCHIFNOT"):
+                args = rename[args]
+            elif isinstance(args, list):
+                args = list(args)
+            code.append(self.instruction(rename.get(inst.label), command, args))
+        return rename[label], code
+
+    def fresh(self, label):
+        """
+        :return: un label nouveau dérivé de label
+        """
+
+        k = 0
+        while "%s_u%d" % (label, k) in self.labels:
+            k += 1
+        self.labels.add("%s_u%d" % (label, k))
+        return "%s_u%d" % (label, k)
+
+
+def unbox_blocks(prog, instruction):
+    """
+    Supprime l'allocation des blocs qui n'échappent pas, voir BlockUnboxer
+
+    :param instruction: constructeur des instructions, appelé avec (label, commande, arguments)
+    :return: le programme transformé et les compteurs des transformations
+    """
+
+    unboxer = BlockUnboxer(prog, instruction)
+    return unboxer.run(), unboxer.stats
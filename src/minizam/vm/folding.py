@@ -0,0 +1,199 @@
+from .instructions import Prim, _is_int
+from .mlvalue import MLValue
+
+# instructions qui écrasent acc sans le lire ni toucher la pile
+ACC_WRITERS = {"CONST", "ACC", "ENVACC", "OFFSETCLOSURE"}
+
+# comparaisons, dont le résultat (true ou false) ne peut pas être chargé par CONST
+COMPARISONS = {"=", "<>", "<", "<=", ">", ">="}
+
+UNKNOWN = None
+
+
+def _evaluate(op, one, two):
+    """
+    Applique la primitive op comme le ferait PRIM à l'exécution
+
+    :return: la valeur (int) du résultat, None si le calcul échoue (division par zéro...)
+    """
+
+    try:
+        result = Prim.binary_op[op].execute(MLValue.from_int(one), MLValue.from_int(two))
+    except Exception:
+        return None
+    return result.value if _is_int(result) else None
+
+
+class ConstantFolder:
+    """
+    Propagation et évaluation des constantes au chargement :
+        ACC n lisant une constante empilée dans le même bloc de base  ->  CONST v
+        CONST x; PUSH; CONST y; PRIM op                             ->  CONST (y op x)
+        CONST c; BRANCHIFNOT L                                      ->  CONST c [; BRANCH L]
+        CONST x; PUSH; CONST y; PRIM cmp; BRANCHIFNOT L             ->  BRANCH L ou rien
+            (si acc est réécrit avant d'être lu aux deux successeurs)
+        PUSH; CONST y; POP  ->  CONST y        PUSH; POP  ->  rien        CONST x; CONST y  ->  CONST y
+    Les erreurs d'exécution (division par zéro, types) ne sont pas évaluées : l'instruction
+    reste. Les instructions internes d'une séquence remplacée ne portent pas de label.
+    """
+
+    def __init__(self, prog, instruction):
+        """
+        :param instruction: constructeur des instructions, appelé avec (label, commande, arguments)
+        """
+
+        self.prog = prog
+        self.instruction = instruction
+        self.positions = {}
+        self.stats = {"propagated": 0, "folded": 0, "branches": 0, "removed": 0}
+
+    def run(self):
+        """
+        :return: le programme transformé
+        """
+
+        size = len(self.prog)
+        changed = True
+        while changed:
+            changed = self.propagate()
+            changed = self.peephole() or changed
+        self.stats["removed"] = size - len(self.prog)
+        return self.prog
+
+    def propagate(self):
+        """
+        Remplace les ACC qui lisent une constante connue, en suivant acc et les cases
+        empilées depuis le début du bloc de base
+
+        :return: vrai si le programme a changé
+        """
+
+        changed = False
+        stack = []  # constantes (ou UNKNOWN) empilées dans le bloc, le sommet en dernier
+        acc = UNKNOWN
+        for i, inst in enumerate(self.prog):
+            if inst.label:
+                stack, acc = [], UNKNOWN
+            command = inst.command
+            if command == "CONST":
+                acc = inst.args
+            elif command == "ACC":
+                acc = stack[-1 - inst.args] if inst.args < len(stack) else UNKNOWN
+                if acc is not UNKNOWN:
+                    self.prog[i] = self.const(inst.label, acc)
+                    self.stats["propagated"] += 1
+                    changed = True
+            elif command == "PUSH":
+                stack.append(acc)
+            elif command == "POP":
+                if stack:
+                    stack.pop()
+            elif command == "PRIM":
+                # les résultats connus sont évalués par peephole au tour suivant
+                if inst.args in Prim.binary_op and stack:
+                    stack.pop()
+                acc = UNKNOWN
+            else:
+                # appels, blocs, branchements, exceptions : fin du bloc de base
+                stack, acc = [], UNKNOWN
+        return changed
+
+    def peephole(self):
+        """
+        :return: vrai si le programme a changé
+        """
+
+        prog = self.prog
+        self.positions = {inst.label: i for i, inst in enumerate(prog) if inst.label}
+        out = []
+        i = 0
+        while i < len(prog):
+            replacement, length = self.match(i)
+            if replacement is None:
+                out.append(prog[i])
+                i += 1
+            else:
+                out.extend(replacement)
+                i += length
+        changed = len(out) != len(prog) or any(a is not b for a, b in zip(out, prog))
+        self.prog = out
+        return changed
+
+    def match(self, i):
+        """
+        :return: les instructions qui remplacent la séquence qui commence en i et sa longueur,
+            (None, 0) si aucune règle ne s'applique
+        """
+
+        prog = self.prog
+        seq = prog[i:i + 5]
+        commands = [inst.command for inst in seq]
+        inner_labels = any(inst.label for inst in seq[1:])
+        label = seq[0].label
+
+        if commands[:4] == ["CONST", "PUSH", "CONST", "PRIM"] and not any(inst.label for inst in seq[1:4]):
+            x, y, op = seq[0].args, seq[2].args, seq[3].args
+            if op in COMPARISONS:
+                if commands[4:] == ["BRANCHIFNOT"] and not inner_labels:
+                    return self.fold_compare(i, label, op, y, x, seq[4].args)
+            elif op in Prim.binary_op:
+                value = _evaluate(op, y, x)
+                if value is not None:
+                    self.stats["folded"] += 1
+                    return [self.const(label, value)], 4
+
+        if commands[:2] == ["CONST", "BRANCHIFNOT"] and not seq[1].label:
+            self.stats["branches"] += 1
+            if seq[0].args == 0:
+                return [seq[0], self.instruction(None, "BRANCH", seq[1].args)], 2
+            return [seq[0]], 2
+
+        if commands[:3] == ["PUSH", "CONST", "POP"] and not seq[1].label and not seq[2].label:
+            return [self.const(label, seq[1].args)], 3
+
+        if commands[:2] == ["PUSH", "POP"] and not label and not seq[1].label and i + 2 < len(prog):
+            return [], 2
+
+        if commands[:2] == ["CONST", "CONST"] and not seq[1].label:
+            return [self.const(label, seq[1].args)], 2
+
+        return None, 0
+
+    def fold_compare(self, i, label, op, one, two, target):
+        """
+        CONST two; PUSH; CONST one; PRIM op; BRANCHIFNOT target dont le résultat est connu
+        """
+
+        value = _evaluate(op, one, two)
+        if value is None or not self.acc_dead(i + 5) or not self.acc_dead(self.positions.get(target)):
+            return None, 0
+        self.stats["folded"] += 1
+        self.stats["branches"] += 1
+        if value == 0:
+            return [self.instruction(label, "BRANCH", target)], 5
+        if label:
+            # le label reste sur une instruction sans effet observable
+            return [self.const(label, two)], 5
+        return [], 5
+
+    def acc_dead(self, i):
+        """
+        Vérifie que l'instruction i écrase acc avant de le lire
+        """
+
+        return i is not None and i < len(self.prog) and self.prog[i].command in ACC_WRITERS
+
+    def const(self, label, value):
+        return self.instruction(label, "CONST", value)
+
+
+def fold_constants(prog, instruction):
+    """
+    Propage et évalue les constantes de prog
+
+    :param instruction: constructeur des instructions, appelé avec (label, commande, arguments)
+    :return: le programme transformé et les compteurs des transformations
+    """
+
+    folder = ConstantFolder(prog, instruction)
+    return folder.run(), folder.stats
@@ -0,0 +1,84 @@
+import time
+
+
+class ResourceLimits:
+    """
+    Limites de ressources d'une exécution, vérifiées toutes les check_interval instructions
+    """
+
+    def __init__(self, max_instructions=None, max_time=None, max_stack=None, max_heap=None,
+                 check_interval=1000):
+        """
+        :param max_instructions: nombre maximal d'instructions exécutées
+        :param max_time: durée maximale de l'exécution en secondes
+        :param max_stack: nombre maximal d'éléments dans la pile
+        :param max_heap: nombre maximal de mots alloués (blocs et fermetures)
+        :param check_interval: nombre d'instructions exécutées entre deux vérifications
+        """
+
+        if check_interval <= 0:
+            raise ValueError("check_interval must be positive.")
+        self.max_instructions = max_instructions
+        self.max_time = max_time
+        self.max_stack = max_stack
+        self.max_heap = max_heap
+        self.check_interval = check_interval
+
+
+class ResourceExhausted(Exception):
+    """
+    Levée lorsqu'une exécution dépasse l'une de ses limites
+    """
+
+    def __init__(self, resource, limit, used):
+        super().__init__("%s limit exceeded: %s > %s" % (resource, used, limit))
+        self.resource = resource
+        self.limit = limit
+        self.used = used
+
+
+class Governor:
+    """
+    Vérifie périodiquement les limites d'une machine pendant son exécution
+    """
+
+    def __init__(self, vm, limits):
+        self.vm = vm
+        self.limits = limits
+        self.instructions = 0
+        self.start = time.monotonic()
+        self.deadline = None if limits.max_time is None else self.start + limits.max_time
+
+    def next_slice(self):
+        """
+        Renvoie le nombre d'instructions à exécuter avant la prochaine vérification,
+        sans dépasser le budget d'instructions
+        """
+
+        limits = self.limits
+        if limits.max_instructions is None:
+            return limits.check_interval
+        return max(0, min(limits.check_interval, limits.max_instructions - self.instructions))
+
+    def check(self, executed):
+        """
+        Comptabilise executed instructions et vérifie les limites
+
+        :raise ResourceExhausted: si une limite est dépassée
+        """
+
+        self.instructions += executed
+        limits = self.limits
+        vm = self.vm
+        if not vm.running:
+            return
+        if limits.max_instructions is not None and self.instructions >= limits.max_instructions:
+            raise ResourceExhausted("instructions", limits.max_instructions, self.instructions)
+        if self.deadline is not None:
+            now = time.monotonic()
+            if now > self.deadline:
+                raise ResourceExhausted("time", limits.max_time, now - self.start)
+        if limits.max_stack is not None and vm.stack.size() > limits.max_stack:
+            raise ResourceExhausted("stack", limits.max_stack, vm.stack.size())
+        if limits.max_heap is not None and vm.heap_words > limits.max_heap:
+            raise ResourceExhausted("heap", limits.max_heap, vm.heap_words)
@@ -0,0 +1,78 @@
+import weakref
+
+from .instructions import GENERIC_COMMANDS
+from .mlvalue import MLValue
+
+# instructions qui modifient un bloc en place : un bloc partagé ne doit pas changer
+MUTATORS = {"SETFIELD", "SETVECTITEM"}
+
+
+def immutable_blocks(prog):
+    """
+    Vérifie qu'aucune instruction du programme ne modifie un bloc
+
+    :param prog: les instructions du programme
+    """
+
+    return all(GENERIC_COMMANDS.get(inst.command, inst.command) not in MUTATORS for inst in prog)
+
+
+class BlockTable:
+    """
+    Table de partage (hash-consing) des blocs d'un programme qui ne les modifie jamais :
+    MAKEBLOCK rend le bloc déjà construit avec les mêmes champs s'il existe encore.
+
+    Deux champs sont les mêmes s'ils sont des entiers égaux, ou le même objet pour les
+    autres valeurs (booléens, unité, fermetures et blocs, eux-mêmes partagés) : deux
+    blocs de même structure ont donc la même clé. La table ne garde les blocs que par
+    des références faibles, un bloc qui n'est plus atteignable en sort.
+    """
+
+    def __init__(self):
+        self.blocks = weakref.WeakValueDictionary()  # clé des champs -> bloc
+        self.created = 0
+        self.shared = 0
+
+    @staticmethod
+    def key(block):
+        """
+        :return: la clé des champs de block : le masque des champs entiers, puis la valeur
+            des entiers et l'identité des autres valeurs
+        """
+
+        mask = 0
+        fields = [0]
+        true, false, unit = MLValue.true(), MLValue.false(), MLValue.unit()
+        for i, field in enumerate(block):
+            if type(field) is MLValue and type(field.value) is int \
+                    and field is not true and field is not false and field is not unit:
+                mask |= 1 << i
+                fields.append(field.value)
+            else:
+                fields.append(id(field))
+        fields[0] = mask
+        return tuple(fields)
+
+    def intern(self, block):
+        """
+        :param block: la liste des champs d'un nouveau bloc
+        :return: le bloc partagé de mêmes champs, et True s'il vient d'être créé
+        """
+
+        key = self.key(block)
+        value = self.blocks.get(key)
+        if value is not None:
+            self.shared += 1
+            return value, False
+        value = MLValue.from_fields(block)
+        self.blocks[key] = value
+        self.created += 1
+        return value, True
+
+    def stats(self):
+        """
+        :return: les blocs créés, les MAKEBLOCK qui ont rendu un bloc existant et les
+            blocs vivants dans la table
+        """
+
+        return {"created": self.created, "shared": self.shared, "live": len(self.blocks)}
@@ -0,0 +1,183 @@
+import mmap
+import sys
+
+_WHITESPACE = frozenset(b" \t\r\n\v\f")
+
+
+class InputChannel:
+    """
+    Canal d'entrée bufferisé de la machine, lu par les primitives read_int, read_char,
+    read_line, read_ints et eof.
+
+    Les octets sont lus par blocs de buffer_size dans un flux (l'entrée standard ou un
+    fichier), ou directement dans un tampon en mémoire (bytes ou fichier projeté par mmap).
+    Les entiers sont écrits en décimal et séparés par des blancs.
+    """
+
+    def __init__(self, source=None, buffer_size=1 << 20):
+        """
+        :param source: None pour l'entrée standard courante (résolue à la première lecture),
+            des octets (bytes, bytearray, mmap) lus en mémoire ou un objet fichier binaire
+            (méthode read)
+        :param buffer_size: nombre d'octets lus à chaque remplissage du buffer
+        """
+
+        self.buffer_size = buffer_size
+        self.pos = 0
+        if source is None or hasattr(source, "read") and not isinstance(source, mmap.mmap):
+            self.data = b""
+            self.stream = source
+            self.streaming = True
+        else:
+            self.data = source
+            self.stream = None
+            self.streaming = False
+
+    @classmethod
+    def open(cls, path, mapped=False, buffer_size=1 << 20):
+        """
+        Ouvre un fichier en lecture
+
+        :param mapped: projette le fichier en mémoire au lieu de le lire par blocs
+        """
+
+        f = open(path, "rb")
+        if not mapped:
+            return cls(f, buffer_size)
+        with f:
+            if f.seek(0, 2) == 0:
+                return cls(b"", buffer_size)
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), buffer_size)
+
+    def fill(self):
+        """
+        Ajoute au buffer le bloc suivant du flux, en oubliant les octets déjà lus
+
+        :return: False si le flux est épuisé
+        """
+
+        if not self.streaming:
+            return False
+        if self.stream is None:
+            self.stream = sys.stdin.buffer
+        chunk = self.stream.read(self.buffer_size)
+        if not chunk:
+            self.streaming = False
+            return False
+        self.data = self.data[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def skip_space(self):
+        """
+        Avance jusqu'au prochain octet qui n'est pas un blanc
+
+        :return: False si l'entrée est épuisée
+        """
+
+        while True:
+            data, pos = self.data, self.pos
+            while pos < len(data) and data[pos] in _WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < len(data):
+                return True
+            if not self.fill():
+                return False
+
+    def token_end(self):
+        """
+        :return: la position de la fin du mot qui commence à pos, entièrement dans le buffer
+        """
+
+        end = self.pos
+        while True:
+            data = self.data
+            while end < len(data) and data[end] not in _WHITESPACE:
+                end += 1
+            if end < len(data):
+                return end
+            offset = end - self.pos
+            if not self.fill():
+                return end
+            end = self.pos + offset
+
+    def eof(self):
+        """
+        :return: True s'il ne reste que des blancs à lire
+        """
+
+        return not self.skip_space()
+
+    def read_int(self):
+        """
+        Lit un entier décimal, précédé de blancs
+        """
+
+        if not self.skip_space():
+            raise EOFError("end of input")
+        end = self.token_end()
+        value = int(self.data[self.pos:end])
+        self.pos = end
+        return value
+
+    def read_char(self):
+        """
+        :return: le code de l'octet suivant, -1 si l'entrée est épuisée
+        """
+
+        if self.pos >= len(self.data) and not self.fill():
+            return -1
+        self.pos += 1
+        return self.data[self.pos - 1]
+
+    def read_line(self):
+        """
+        :return: les octets de la ligne suivante, sans le saut de ligne
+        """
+
+        if self.pos >= len(self.data) and not self.fill():
+            raise EOFError("end of input")
+        start = 0
+        while True:
+            end = self.data.find(b"\n", self.pos + start)
+            if end >= 0:
+                line = self.data[self.pos:end]
+                self.pos = end + 1
+                return line
+            start = len(self.data) - self.pos
+            if not self.fill():
+                line = self.data[self.pos:]
+                self.pos = len(self.data)
+                return line
+
+    def read_ints(self, n):
+        """
+        Lit au plus n entiers, moins si l'entrée s'épuise avant
+
+        :return: la liste des entiers lus
+        """
+
+        values = []
+        while len(values) < n and self.skip_space():
+            # une fenêtre de mots complets, découpée en une fois
+            data, pos = self.data, self.pos
+            end = min(len(data), pos + self.buffer_size)
+            if end < len(data) or self.streaming:
+                # le dernier mot de la fenêtre peut continuer après elle
+                while end > pos and data[end - 1] not in _WHITESPACE:
+                    end -= 1
+            if end <= pos:
+                end = self.token_end()
+                data = self.data
+                pos = self.pos
+            words = data[pos:end].split(None, n - len(values))
+            if len(words) > n - len(values):
+                # le reste de la fenêtre n'est pas lu
+                end -= len(words.pop())
+            # pos s'arrête juste après le dernier mot lu
+            while data[end - 1] in _WHITESPACE:
+                end -= 1
+            values.extend(map(int, words))
+            self.pos = end
+        return values
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from .mlvalue import MLValue
+import operator
+from .mlvalue import MLValue, Pair
 
 
 class Instruction(ABC):
@@ -135,9 +136,93 @@ class _GtEq(_BinaryPrim):
         return one >= two
 
 
-class _Print(_UnaryPrim):
-    def execute(self, one):
-        print(chr(one.value))
+class _Print:
+    """
+    Écrit le caractère contenu dans acc sur le canal de sortie de la machine
+    """
+
+    def execute(self, vm, one):
+        vm.output.write(chr(one.value))
+        return MLValue.unit()
+
+
+class _PrintInt:
+    """
+    Écrit en décimal l'entier contenu dans acc
+    """
+
+    def execute(self, vm, one):
+        vm.output.write(str(one.value))
+        return MLValue.unit()
+
+
+class _PrintBlock:
+    """
+    Écrit d'un coup les caractères dont les codes sont les champs du bloc contenu dans acc
+    """
+
+    def execute(self, vm, one):
+        vm.output.write("".join([chr(field.value) for field in one.value]))
+        return MLValue.unit()
+
+
+class _PrintInts:
+    """
+    Écrit d'un coup les entiers du bloc contenu dans acc, un par ligne
+    """
+
+    def execute(self, vm, one):
+        vm.output.write("".join(["%d\n" % field.value for field in one.value]))
+        return MLValue.unit()
+
+
+class _ReadInt:
+    """
+    Lit un entier sur le canal d'entrée de la machine, EOFError si l'entrée est épuisée
+    """
+
+    def execute(self, vm, one):
+        return MLValue.from_int(vm.input.read_int())
+
+
+class _ReadChar:
+    """
+    Lit le code d'un caractère, -1 si l'entrée est épuisée
+    """
+
+    def execute(self, vm, one):
+        return MLValue.from_int(vm.input.read_char())
+
+
+class _ReadLine:
+    """
+    Lit une ligne dans un bloc de codes de caractères, EOFError si l'entrée est épuisée
+    """
+
+    def execute(self, vm, one):
+        line = vm.input.read_line()
+        vm.heap_words += len(line)
+        return MLValue.from_block(MLValue.from_ints(line))
+
+
+class _ReadInts:
+    """
+    Lit au plus acc entiers dans un bloc, plus court si l'entrée s'épuise avant
+    """
+
+    def execute(self, vm, one):
+        values = vm.input.read_ints(one.value)
+        vm.heap_words += len(values)
+        return MLValue.from_block(MLValue.from_ints(values))
+
+
+class _Eof:
+    """
+    Vrai s'il ne reste que des blancs sur le canal d'entrée
+    """
+
+    def execute(self, vm, one):
+        return MLValue.true() if vm.input.eof() else MLValue.false()
 
 
 ###########################################
@@ -158,12 +243,19 @@ class Prim(Instruction):
                  "or": _Or(), "and": _And(),
                  "<>": _NotEq(), "=": _Eq(), "<": _Lt(), "<=": _LtEq(), ">": _Gt(), ">=": _GtEq()}
 
-    unary_op = {"not": _Not(), "print": _Print()}
+    unary_op = {"not": _Not()}
+
+    # primitives d'entrées/sorties, qui ont accès à la machine
+    io_op = {"print": _Print(), "print_int": _PrintInt(), "print_block": _PrintBlock(),
+             "print_ints": _PrintInts(), "read_int": _ReadInt(), "read_char": _ReadChar(),
+             "read_line": _ReadLine(), "read_ints": _ReadInts(), "eof": _Eof()}
 
     def execute(self, vm, op):
 
         if op in Prim.unary_op:
             vm.acc = Prim.unary_op[op].execute(vm.acc)
+        elif op in Prim.io_op:
+            vm.acc = Prim.io_op[op].execute(vm, vm.acc)
         elif op in Prim.binary_op:
             vm.acc = Prim.binary_op[op].execute(vm.acc, vm.pop())
         else:
@@ -185,10 +277,94 @@ class BranchIfNot(Instruction):
 
     def execute(self, vm, label):
         acc = vm.acc
-        if acc == MLValue.false():
+        # une Pair (cellule de liste) n'est jamais fausse
+        if type(acc) is not Pair and acc == MLValue.false():
             vm.pc = vm.get_position(label)
 
 
+class BranchCmp(Instruction):
+    """
+    Comparaison fusionnée avec un branchement conditionnel.
+    Dépile v et saute au label si test(acc, v) est vrai ; remplace la séquence
+    PRIM op; BRANCHIFNOT label où test est la négation de op.
+    Les valeurs qui ne sont pas des entiers passent par PRIM et BRANCHIFNOT.
+    """
+
+    def __init__(self, name, op, test):
+        self.name = name
+        self.op = op
+        self.test = test
+        self.prim = Prim()
+        self.branch_if_not = BranchIfNot()
+
+    def parse_args(self, args):
+        return ArgsParser(args, self.name).parse([str])
+
+    def execute(self, vm, label):
+        one = vm.acc
+        two = vm.pop()
+        if _is_int(one) and _is_int(two):
+            self.branch(vm, self.test(one.value, two.value), label)
+        else:
+            vm.push(two)
+            self.compare_and_branch(vm, label)
+
+    def compare_and_branch(self, vm, label):
+        self.prim.execute(vm, self.op)
+        self.branch_if_not.execute(vm, label)
+
+    @staticmethod
+    def branch(vm, jump, label):
+        if jump:
+            vm.acc = MLValue.false()
+            vm.pc = vm.get_position(label)
+        else:
+            vm.acc = MLValue.true()
+
+
+class BranchCmpImmediate(BranchCmp):
+    """
+    Comparaison fusionnée avec une constante.
+    Saute au label si test(n, acc) est vrai ; remplace la séquence
+    PUSH; CONST n; PRIM op; BRANCHIFNOT label où test est la négation de op.
+    """
+
+    def parse_args(self, args):
+        return ArgsParser(args, self.name).parse([int, str])
+
+    def execute(self, vm, args):
+        n, label = args
+        if _is_int(vm.acc):
+            self.branch(vm, self.test(n, vm.acc.value), label)
+        else:
+            vm.push(vm.acc)
+            vm.acc = MLValue.from_int(n)
+            self.compare_and_branch(vm, label)
+
+
+def _is_int(value):
+    return isinstance(value, MLValue) and type(value.value) is int
+
+
+# opérateur de comparaison de PRIM -> branchement fusionné sur sa négation
+FUSED_BRANCHES = {"=": ("BNEQ", operator.ne), "<>": ("BEQ", operator.eq),
+                  "<": ("BGE", operator.ge), "<=": ("BGT", operator.gt),
+                  ">": ("BLE", operator.le), ">=": ("BLT", operator.lt)}
+
+
+def fused_branch_instructions():
+    """
+    Construit les instructions de branchement fusionné, avec opérande dans la pile
+    (BEQ, BNEQ, BLT, BLE, BGT, BGE) ou immédiat (BEQI, ..., BGEI)
+    """
+
+    instructions = {}
+    for op, (name, test) in FUSED_BRANCHES.items():
+        instructions[name] = BranchCmp(name, op, test)
+        instructions[name + "I"] = BranchCmpImmediate(name + "I", op, test)
+    return instructions
+
+
 class Push(Instruction):
     """
     Empilement d'une valeur dans la stack
@@ -243,10 +419,9 @@ class Closure(Instruction):
         (label, n) = args
 
         if n > 0:
-            vm.push(vm.acc)
-            vm.acc = MLValue.from_closure(vm.get_position(label), vm.pop(n))
+            vm.acc = vm.make_closure(vm.get_position(label), vm.pop_tuple(n - 1, (vm.acc,)))
         else:
-            vm.acc = MLValue.from_closure(vm.get_position(label), [])
+            vm.acc = vm.make_closure(vm.get_position(label), ())
 
 
 class ClosureRec(Instruction):
@@ -258,10 +433,9 @@ class ClosureRec(Instruction):
 
         pc = vm.get_position(label)
         if n > 0:
-            vm.push(vm.acc)
-            vm.acc = MLValue.from_closure(pc, [pc] + vm.pop(n))
+            vm.acc = vm.make_closure(pc, vm.pop_tuple(n - 1, (pc, vm.acc)))
         else:
-            vm.acc = MLValue.from_closure(pc, [pc])
+            vm.acc = vm.make_closure(pc, (pc,))
 
         vm.push(vm.acc)
 
@@ -276,15 +450,47 @@ class Apply(Instruction):
         return ArgsParser(args, "APPLY").parse([int])
 
     def execute(self, vm, n):
-        args = vm.pop(n)
+        # le bloc de retour est glissé sous les n arguments, qui restent en place
+        vm.stack.items[n:n] = (vm.pc, vm.env, vm.extra_args)
 
-        env = vm.env
-        pc = vm.pc
-        extra_args = vm.extra_args
-        vm.push(args + [pc, env, extra_args])
+        vm.apply_closure(n)
 
-        vm.change_context()
-        vm.extra_args = n - 1
+
+class MemoApply(Apply):
+    """
+    APPLY d'une machine qui mémoïse les fonctions pures (voir memo.py) : le résultat
+    d'une application déjà calculée est lu dans la table, sinon la fonction revient
+    sur MEMOSTORE qui range son résultat avant de revenir à l'appelant
+    """
+
+    def execute(self, vm, n):
+        memo = vm.memo
+        key = None if memo is None else memo.key(vm.acc, n, vm.stack.items)
+        if key is None:
+            Apply.execute(self, vm, n)
+            return
+
+        value = memo.lookup(key)
+        if value is not None:
+            vm.pop(n)
+            vm.acc = value
+            return
+
+        vm.stack.items[n:n] = (memo.store_pc, key, 0, vm.pc, vm.env, vm.extra_args)
+        vm.apply_closure(n)
+
+
+class MemoStore(Instruction):
+    """
+    Retour d'une fonction mémoïsée : la clé de l'appel est dans env
+    """
+
+    def execute(self, vm, args):
+        if vm.memo is not None:
+            vm.memo.store(vm.env, vm.acc)
+        vm.pc = vm.pop()
+        vm.env = vm.pop()
+        vm.extra_args = vm.pop()
 
 
 class Grab(Instruction):
@@ -302,12 +508,12 @@ class Grab(Instruction):
         if extra_args >= n:
             vm.extra_args = extra_args - n
         else:
-            # dépiler extra_args+1 éléments
-            ele_pop = vm.pop(extra_args + 1)
+            # dépiler extra_args+1 éléments derrière l'environnement courant
+            env = vm.pop_tuple(extra_args + 1, (vm.env,))
 
             # changer l'accumulateur
-            acc = MLValue.from_closure(vm.pc - 2, [vm.env] + ele_pop)
-            vm.acc = acc
+            vm.heap_words += len(env) + 1
+            vm.acc = MLValue.from_closure(vm.pc - 2, env)
             # changer les valeurs extra_args, pc, env
             vm.pc = vm.pop()
             vm.env = vm.pop()
@@ -320,7 +526,7 @@ class ReStart(Instruction):
         n = len(env)
 
         # déplacer les éléments de env de 1 à n-1 dans la pile
-        vm.push(env[1:n])
+        vm.stack.items[0:0] = env[1:n]
 
         # extra args est incrémenté de (n − 1).
         vm.extra_args = vm.extra_args + (n - 1)
@@ -340,7 +546,11 @@ class MakeBlock(Instruction):
         return ArgsParser(args, "MAKEBLOCK").parse([int])
 
     def execute(self, vm, n):
-        if n > 0:
+        items = vm.stack.items
+        if n == 2 and items:
+            vm.heap_words += 2
+            vm.acc = MLValue.pair(vm.acc, items.pop(0))
+        elif n > 0:
             acc = vm.acc
             block = [acc]
             if len(block) < n:
@@ -349,9 +559,28 @@ class MakeBlock(Instruction):
                     val_pop = [val_pop]
                 if len(val_pop) != 0:
                     block = block + val_pop
+            vm.heap_words += n
             vm.acc = MLValue.from_block(block)
 
 
+class HashConsMakeBlock(MakeBlock):
+    """
+    MAKEBLOCK d'une machine qui partage ses blocs (voir hashcons.py) : un bloc de mêmes
+    champs qu'un bloc existant n'est pas recréé
+    """
+
+    def execute(self, vm, n):
+        if vm.blocks is None or n <= 0:
+            MakeBlock.execute(self, vm, n)
+            return
+        items = vm.stack.items
+        block = [vm.acc] + items[:n - 1]
+        del items[:n - 1]
+        vm.acc, created = vm.blocks.intern(block)
+        if created:
+            vm.heap_words += n
+
+
 class GetField(Instruction):
     """
     Met dans l’accumulateur la n-ième valeur du bloc contenu dans accu.
@@ -361,7 +590,11 @@ class GetField(Instruction):
         return ArgsParser(args, "GETFIELD").parse([int])
 
     def execute(self, vm, n):
-        vm.acc = vm.acc.value[n]
+        acc = vm.acc
+        if type(acc) is Pair and 0 <= n <= 1:
+            vm.acc = acc.tail if n else acc.head
+        else:
+            vm.acc = acc.value[n]
 
 
 class VectLength(Instruction):
@@ -370,6 +603,9 @@ class VectLength(Instruction):
     """
 
     def execute(self, vm, args):
+        if type(vm.acc) is Pair:
+            vm.acc = MLValue.from_int(2)
+            return
         len_block = len(vm.acc.value)
         vm.acc = MLValue.from_int(len_block)
 
@@ -405,6 +641,14 @@ class SetField(Instruction):
         # dépiler une valeur dans la stack
         val_stack = vm.pop()
 
+        acc = vm.acc
+        if type(acc) is Pair and 0 <= n <= 1:
+            if n:
+                acc.tail = val_stack
+            else:
+                acc.head = val_stack
+            return
+
         # récupérer le bloc dans l'accumulateur sous forme de liste
         block = list(vm.acc.value)
         # mettre la valeur dépilée dans la n'ième valeur du bloc
@@ -457,14 +701,16 @@ class Return(Instruction):
         return ArgsParser(args, "RETURN").parse([int])
 
     def execute(self, vm, n):
-        vm.pop(n)
+        items = vm.stack.items
         if vm.extra_args == 0:
-            vm.pc = vm.pop()
-            vm.env = vm.pop()
-            vm.pop()
+            # la fenêtre des n valeurs et le bloc de retour sont retirés d'un coup ;
+            # extra_args est rétabli, comme par GRAB et MEMOSTORE : l'appelant peut
+            # avoir encore des arguments à appliquer à son résultat
+            vm.pc, vm.env, vm.extra_args = items[n], items[n + 1], items[n + 2]
+            del items[:n + 3]
         else:
-            vm.extra_args = vm.extra_args - 1
-            vm.change_context()
+            del items[:n]
+            vm.apply_closure(vm.extra_args)
 
 
 class AppTerm(Instruction):
@@ -474,16 +720,97 @@ class AppTerm(Instruction):
 
     def execute(self, vm, args):
         n, m = args
-        args = vm.pop(n)
-        vm.pop(m - n)
-        vm.push(args)
-        vm.change_context()
-        vm.extra_args = vm.extra_args + (n - 1)
+        # les n arguments glissent sur les m - n valeurs de l'appelant
+        del vm.stack.items[n:m]
+        vm.apply_closure(vm.extra_args + n)
+
+
+class TraceAppTerm(AppTerm):
+    """
+    APPTERM d'une machine qui compile ses boucles (voir tracing.py) : les appels
+    terminaux d'une fonction à elle-même sont comptés puis exécutés par une trace
+    """
+
+    def execute(self, vm, args):
+        closure = vm.acc
+        recursive = isinstance(closure.value, tuple) and closure.value[1] is vm.env
+        AppTerm.execute(self, vm, args)
+        if recursive and vm.tracer is not None and vm.extra_args == 0:
+            vm.tracer.loop(vm, args[0])
+
+
+class UnboxApply(Instruction):
+    """
+    APPLY 1 d'une fonction dont l'argument est un bloc qu'elle ne fait que déstructurer
+    (voir escape.py) : les n champs du bloc sont dans la pile et le code en L est la
+    copie de la fonction qui les y lit. La fermeture dans acc fournit l'environnement.
+    """
+
+    def parse_args(self, args):
+        return ArgsParser(args, "UNBOXAPPLY").parse([int, str])
+
+    def execute(self, vm, args):
+        n, label = args
+        vm.stack.items[n:n] = (vm.pc, vm.env, vm.extra_args)
+        vm.env = vm.acc.value[1]
+        vm.extra_args = 0
+        vm.pc = vm.get_position(label)
+
+
+class UnboxAppTerm(Instruction):
+    """
+    APPTERM 1,m d'une fonction dont l'argument est un bloc qu'elle ne fait que déstructurer,
+    voir UnboxApply
+    """
+
+    def parse_args(self, args):
+        return ArgsParser(args, "UNBOXAPPTERM").parse([int, int, str])
+
+    def execute(self, vm, args):
+        n, m, label = args
+        del vm.stack.items[n:m]
+        vm.env = vm.acc.value[1]
+        vm.pc = vm.get_position(label)
+
+
+class ProfiledAllocation(Instruction):
+    """
+    Instruction qui alloue, exécutée par une machine qui profile ses allocations (voir
+    allocprof.py) : le bloc ou la fermeture créé, ou le bloc de retour empilé par un
+    appel, est attribué à la position de l'instruction
+    """
+
+    def __init__(self, command, generic):
+        """
+        :param command: la commande d'origine, qui nomme les sites du profil
+        :param generic: l'instruction d'origine, exécutée
+        """
+
+        self.command = command
+        self.generic = generic
+        self.call = command in ("APPLY", "MEMOAPPLY", "UNBOXAPPLY")
+
+    def parse_args(self, args):
+        return self.generic.parse_args(args)
+
+    def execute(self, vm, args):
+        profiler = vm.allocations
+        if profiler is None:
+            self.generic.execute(vm, args)
+            return
+        pc = vm.pc - 1
+        words = vm.heap_words
+        self.generic.execute(vm, args)
+        if vm.heap_words != words:
+            profiler.record(vm, pc, self.command, vm.acc, vm.heap_words - words)
+        elif self.call and vm.pc != pc + 1:
+            # une application mémoïsée déjà calculée n'empile rien
+            profiler.frame(vm, pc, self.command)
 
 
 class Stop(Instruction):
     def execute(self, vm, args):
-        vm.shutdown()
+        vm.halt()
 
 
 class PushTrap(Instruction):
@@ -506,12 +833,284 @@ class Raise(Instruction):
 
     def execute(self, vm, args):
         if vm.trap_sp is None:
-            vm.shutdown()
+            vm.halt("uncaught")
         else:
             index = vm.stack.items.index(vm.trap_sp)
-            vm.pop(index)
+            # pop(0) retirerait un élément : rien à retirer si le bloc est au sommet
+            if index:
+                vm.pop(index)
             vm.pc = vm.pop()
             vm.trap_sp = vm.pop()
             vm.env = vm.pop()
             vm.extra_args = vm.pop()
             # del vm.stack.items[index:index + 4]
+
+
+class CountedCall(Instruction):
+    """
+    Appel d'une machine qui mesure son exécution (voir metrics.py) : compte l'appel et
+    relève la profondeur de la pile, qui ne croît que par les appels et leurs arguments
+    """
+
+    def __init__(self, generic):
+        self.generic = generic
+
+    def parse_args(self, args):
+        return self.generic.parse_args(args)
+
+    def execute(self, vm, args):
+        metrics = vm.metrics
+        metrics.pending_calls += 1
+        depth = len(vm.stack.items)
+        if depth > metrics.depth:
+            metrics.depth = depth
+        self.generic.execute(vm, args)
+
+
+class CountedRaise(Raise):
+    """
+    RAISE d'une machine qui mesure son exécution
+    """
+
+    def execute(self, vm, args):
+        vm.metrics.pending_raises += 1
+        Raise.execute(self, vm, args)
+
+
+###########################################
+# accélération (quickening) : voir quickening.py
+
+def _deoptimize(vm, generic, args):
+    """
+    Remet dans le programme la commande générique de l'instruction en cours, dont la
+    variante spécialisée ne s'applique pas à ses opérandes, et l'exécute
+    """
+
+    vm.prog[vm.pc - 1].command = generic
+    if vm.quickener is not None:
+        vm.quickener.deoptimized += 1
+    vm.instructions[generic].execute(vm, args)
+
+
+class QuickArithmetic(Prim):
+    """
+    PRIM arithmétique spécialisée sur deux entiers, revient à PRIM sinon
+    """
+
+    def __init__(self, name, function):
+        self.name = name
+        self.function = function
+
+    def execute(self, vm, op):
+        one = vm.acc
+        items = vm.stack.items
+        if items and _is_int(one) and _is_int(items[0]):
+            vm.acc = MLValue.from_int(self.function(one.value, items.pop(0).value))
+        else:
+            _deoptimize(vm, "PRIM", op)
+
+
+class QuickDivision(QuickArithmetic):
+    """
+    Division entière spécialisée, qui laisse PRIM lever la division par zéro
+    """
+
+    def execute(self, vm, op):
+        one = vm.acc
+        items = vm.stack.items
+        if items and _is_int(one) and _is_int(items[0]) and items[0].value != 0:
+            vm.acc = MLValue.from_int(int(one.value / items.pop(0).value))
+        else:
+            _deoptimize(vm, "PRIM", op)
+
+
+class QuickComparison(QuickArithmetic):
+    """
+    PRIM de comparaison spécialisée sur deux entiers, revient à PRIM sinon
+    """
+
+    def execute(self, vm, op):
+        one = vm.acc
+        items = vm.stack.items
+        if items and _is_int(one) and _is_int(items[0]):
+            vm.acc = MLValue.true() if self.function(one.value, items.pop(0).value) else MLValue.false()
+        else:
+            _deoptimize(vm, "PRIM", op)
+
+
+class QuickNot(Prim):
+    """
+    PRIM not sur un booléen, revient à PRIM sinon
+    """
+
+    def execute(self, vm, op):
+        acc = vm.acc
+        if acc is MLValue.true():
+            vm.acc = MLValue.false()
+        elif acc is MLValue.false():
+            vm.acc = MLValue.true()
+        else:
+            _deoptimize(vm, "PRIM", op)
+
+
+class AccZero(Acc):
+    def execute(self, vm, index):
+        vm.acc = vm.stack.items[0]
+
+
+class AccN(Acc):
+    def execute(self, vm, index):
+        vm.acc = vm.stack.items[index]
+
+
+class ConstSmall(Const):
+    """
+    CONST d'un entier du cache de MLValue.from_int, revient à CONST hors du cache
+    """
+
+    def execute(self, vm, n):
+        index = n - MLValue._SMALL_INT_MIN
+        if 0 <= index < len(MLValue._SMALL_INTS):
+            vm.acc = MLValue._SMALL_INTS[index]
+        else:
+            _deoptimize(vm, "CONST", n)
+
+
+class EnvAccN(EnvAcc):
+    def execute(self, vm, index):
+        vm.acc = vm.env[index]
+
+
+# opérateur de PRIM -> (variante spécialisée sur les entiers, classe, opération)
+QUICK_PRIMS = {"+": ("PRIM_ADD_INT", QuickArithmetic, operator.add),
+               "-": ("PRIM_SUB_INT", QuickArithmetic, operator.sub),
+               "*": ("PRIM_MUL_INT", QuickArithmetic, operator.mul),
+               "/": ("PRIM_DIV_INT", QuickDivision, None),
+               "=": ("PRIM_EQ_INT", QuickComparison, operator.eq),
+               "<>": ("PRIM_NE_INT", QuickComparison, operator.ne),
+               "<": ("PRIM_LT_INT", QuickComparison, operator.lt),
+               "<=": ("PRIM_LE_INT", QuickComparison, operator.le),
+               ">": ("PRIM_GT_INT", QuickComparison, operator.gt),
+               ">=": ("PRIM_GE_INT", QuickComparison, operator.ge)}
+
+
+class Quicken(Instruction):
+    """
+    Première exécution d'une instruction accélérable : sa commande est remplacée dans
+    le programme par une variante spécialisée selon ses opérandes (ou par la commande
+    générique), qui est exécutée
+    """
+
+    def __init__(self, generic):
+        self.generic = generic
+
+    def parse_args(self, args):
+        return self.generic.parse_args(args)
+
+    def execute(self, vm, args):
+        command = self.select(vm, args)
+        vm.prog[vm.pc - 1].command = command
+        if vm.quickener is not None:
+            vm.quickener.record(command)
+        vm.instructions[command].execute(vm, args)
+
+    @abstractmethod
+    def select(self, vm, args):
+        pass
+
+
+class QuickenPrim(Quicken):
+    def __init__(self):
+        super().__init__(Prim())
+
+    def select(self, vm, op):
+        items = vm.stack.items
+        if op in QUICK_PRIMS:
+            if items and _is_int(vm.acc) and _is_int(items[0]) and (op != "/" or items[0].value != 0):
+                return QUICK_PRIMS[op][0]
+        elif op == "not" and (vm.acc is MLValue.true() or vm.acc is MLValue.false()):
+            return "PRIM_NOT_BOOL"
+        return "PRIM"
+
+
+class QuickenAcc(Quicken):
+    def __init__(self):
+        super().__init__(Acc())
+
+    def select(self, vm, index):
+        return "ACC0" if index == 0 else "ACCN"
+
+
+class QuickenConst(Quicken):
+    def __init__(self):
+        super().__init__(Const())
+
+    def select(self, vm, n):
+        return "CONST_SMALL" if 0 <= n - MLValue._SMALL_INT_MIN < len(MLValue._SMALL_INTS) else "CONST"
+
+
+class QuickenEnvAcc(Quicken):
+    def __init__(self):
+        super().__init__(EnvAcc())
+
+    def select(self, vm, index):
+        return "ENVACCN"
+
+
+# commande générique -> commande de première exécution
+QUICKENED = {"PRIM": "QPRIM", "ACC": "QACC", "CONST": "QCONST", "ENVACC": "QENVACC"}
+
+
+def quick_instructions():
+    """
+    Construit les instructions de l'accélération : premières exécutions (QPRIM, QACC,
+    QCONST, QENVACC) et variantes spécialisées
+    """
+
+    instructions = {"QPRIM": QuickenPrim(), "QACC": QuickenAcc(), "QCONST": QuickenConst(),
+                    "QENVACC": QuickenEnvAcc(), "PRIM_NOT_BOOL": QuickNot(), "ACC0": AccZero(),
+                    "ACCN": AccN(), "CONST_SMALL": ConstSmall(), "ENVACCN": EnvAccN()}
+    for name, kind, function in QUICK_PRIMS.values():
+        instructions[name] = kind(name, function)
+    return instructions
+
+
+# commande accélérée -> commande générique, pour les analyses du programme
+GENERIC_COMMANDS = {name: generic for generic, name in QUICKENED.items()}
+GENERIC_COMMANDS.update({name: "PRIM" for name, _, _ in QUICK_PRIMS.values()})
+GENERIC_COMMANDS.update({"PRIM_NOT_BOOL": "PRIM", "ACC0": "ACC", "ACCN": "ACC", "CONST_SMALL": "CONST",
+                         "ENVACCN": "ENVACC"})
+
+
+# commande qui alloue -> commande de la machine qui profile ses allocations
+PROFILED = {command: "PROF" + command for command in ("MAKEBLOCK", "HCMAKEBLOCK", "CLOSURE", "CLOSUREREC",
+                                                      "GRAB", "APPLY", "MEMOAPPLY", "UNBOXAPPLY")}
+
+
+def profiled_instructions():
+    """
+    Construit les instructions du profil des allocations (PROFMAKEBLOCK, PROFCLOSURE...)
+    """
+
+    generic = {"MAKEBLOCK": MakeBlock(), "HCMAKEBLOCK": HashConsMakeBlock(), "CLOSURE": Closure(),
+               "CLOSUREREC": ClosureRec(), "GRAB": Grab(), "APPLY": Apply(), "MEMOAPPLY": MemoApply(),
+               "UNBOXAPPLY": UnboxApply()}
+    return {name: ProfiledAllocation(command, generic[command]) for command, name in PROFILED.items()}
+
+
+# appels comptés par la mesure de l'exécution
+COUNTED_CALLS = {"APPLY", "APPTERM", "MEMOAPPLY", "TRACEAPPTERM", "UNBOXAPPLY", "UNBOXAPPTERM",
+                 PROFILED["APPLY"], PROFILED["MEMOAPPLY"], PROFILED["UNBOXAPPLY"]}
+
+
+def counted_instructions(instructions):
+    """
+    :param instructions: la table commande -> instruction d'une machine
+    :return: une copie de la table dont les appels et les RAISE sont comptés
+    """
+
+    counted = dict(instructions)
+    for command in COUNTED_CALLS:
+        counted[command] = CountedCall(instructions[command])
+    counted["RAISE"] = CountedRaise()
+    return counted
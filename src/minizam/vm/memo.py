@@ -0,0 +1,190 @@
+from collections import OrderedDict
+
+from .instructions import FUSED_BRANCHES, GENERIC_COMMANDS, PROFILED, Prim, _is_int
+from .mlvalue import MLValue
+
+# instructions qui rendent une fonction impure : effets de bord, sortie, exceptions, arrêt
+IMPURE = {"SETFIELD", "SETVECTITEM", "ASSIGN", "RAISE", "STOP"}
+
+# branchements conditionnels, dont le label est le dernier argument
+CONDITIONAL_BRANCHES = {"BRANCHIFNOT", "PUSHTRAP"} \
+    | {name for name, _ in FUSED_BRANCHES.values()} \
+    | {name + "I" for name, _ in FUSED_BRANCHES.values()}
+
+# commande réécrite (accélération, traces, profil des allocations) -> commande générique,
+# pour analyser un programme quel que soit l'ordre des enable_*
+ANALYZED_COMMANDS = dict(GENERIC_COMMANDS, TRACEAPPTERM="APPTERM", MEMOAPPLY="APPLY")
+ANALYZED_COMMANDS.update({name: command for command, name in PROFILED.items()})
+
+
+def _command(inst):
+    return ANALYZED_COMMANDS.get(inst.command, inst.command)
+
+
+def _is_memoizable(value):
+    """
+    Vérifie que value est un entier, et non l'un des singletons TRUE, FALSE et UNIT
+    qui ont la même valeur que 1 et 0
+    """
+
+    return _is_int(value) and value is not MLValue.true() and value is not MLValue.false() \
+        and value is not MLValue.unit()
+
+
+def _successors(prog, i, position):
+    """
+    Renvoie les positions des instructions qui peuvent suivre prog[i] dans la même fonction
+    """
+
+    inst = prog[i]
+    command = _command(inst)
+    if command in ("RETURN", "APPTERM", "UNBOXAPPTERM", "STOP", "RAISE"):
+        return []
+    if command == "BRANCH":
+        return [position(inst.args)]
+    if command in CONDITIONAL_BRANCHES:
+        label = inst.args[-1] if isinstance(inst.args, list) else inst.args
+        return [i + 1, position(label)]
+    return [i + 1]
+
+
+def _is_pure(prog, entry, position, recursive):
+    """
+    Vérifie que le code atteignable depuis entry (jusqu'aux RETURN et APPTERM) n'a pas
+    d'effet de bord, ne lit pas son environnement et n'appelle que la fonction elle-même
+
+    :param entry: position de la première instruction de la fonction
+    :param recursive: si toutes les fermetures de entry sont créées par CLOSUREREC, dont
+        env[0] est la position de la fonction ; sinon env[0] est une valeur capturée, qui
+        n'est pas dans la clé de la table
+    """
+
+    seen = set()
+    pending = [entry]
+    while pending:
+        i = pending.pop()
+        if i in seen:
+            continue
+        seen.add(i)
+        inst = prog[i]
+        command = _command(inst)
+        if command in IMPURE:
+            return False
+        if command == "PRIM" and inst.args in Prim.io_op:
+            return False
+        if command == "ENVACC" and (inst.args != 0 or not recursive):
+            return False
+        if command == "OFFSETCLOSURE" and not recursive:
+            return False
+        # OFFSETCLOSURE (qui ne lit que env[0]) charge la fonction elle-même
+        if command in ("APPLY", "APPTERM", "UNBOXAPPLY", "UNBOXAPPTERM") \
+                and (i == 0 or prog[i - 1].command != "OFFSETCLOSURE"):
+            return False
+        pending.extend(_successors(prog, i, position))
+    return True
+
+
+def pure_closures(prog, position):
+    """
+    Recherche les fonctions pures du programme
+
+    :param prog: les instructions du programme
+    :param position: fonction qui renvoie la position d'un label
+    :return: un dictionnaire position d'entrée de la fonction -> arité
+    """
+
+    # position d'entrée -> toutes ses fermetures sont créées par CLOSUREREC
+    recursive = {}
+    for inst in prog:
+        command = _command(inst)
+        if command in ("CLOSURE", "CLOSUREREC"):
+            entry = position(inst.args[0])
+            recursive[entry] = recursive.get(entry, True) and command == "CLOSUREREC"
+
+    pure = {}
+    for entry, only_rec in recursive.items():
+        arity = prog[entry].args + 1 if _command(prog[entry]) == "GRAB" else 1
+        if _is_pure(prog, entry, position, only_rec):
+            pure[entry] = arity
+    return pure
+
+
+class MemoTable:
+    """
+    Table LRU des résultats des fonctions pures, indexée par
+    (position d'entrée, arguments entiers)
+    """
+
+    def __init__(self, pure, store_pc, max_entries=4096):
+        """
+        :param pure: les fonctions mémoïsables, position d'entrée -> arité
+        :param store_pc: position de l'instruction MEMOSTORE du programme
+        :param max_entries: nombre maximal de résultats conservés
+        """
+
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive.")
+        self.pure = pure
+        self.store_pc = store_pc
+        self.max_entries = max_entries
+        self.table = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, closure, n, args):
+        """
+        Renvoie la clé de l'application de closure à ses n premiers arguments,
+        None si cette application n'est pas mémoïsable
+
+        :param args: la pile, le premier argument au sommet
+        """
+
+        if not isinstance(closure.value, tuple):
+            return None
+        pc = closure.value[0]
+        if self.pure.get(pc) != n:
+            return None
+        key = [pc]
+        for i in range(n):
+            value = args[i]
+            if not _is_memoizable(value):
+                return None
+            key.append(value.value)
+        return tuple(key)
+
+    def lookup(self, key):
+        """
+        Renvoie le résultat rangé sous key, None s'il n'y en a pas
+        """
+
+        value = self.table.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.table.move_to_end(key)
+        return value
+
+    def store(self, key, value):
+        """
+        Range le résultat value, s'il est entier, en évinçant le plus ancien au besoin
+        """
+
+        if not _is_memoizable(value):
+            return
+        self.table[key] = value
+        self.table.move_to_end(key)
+        if len(self.table) > self.max_entries:
+            self.table.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        """
+        :return: les statistiques de la table
+        """
+
+        calls = self.hits + self.misses
+        return {"functions": len(self.pure), "entries": len(self.table), "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": self.hits / calls if calls else 0.0}
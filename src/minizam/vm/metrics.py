@@ -0,0 +1,298 @@
+"""
+Métriques des exécutions au format texte de Prometheus : un MetricsRegistry regroupe des
+compteurs, des jauges et des histogrammes, partagés par toutes les machines qui y
+écrivent (voir MiniZamVM.enable_metrics). Le registre s'écrit dans un fichier (pour le
+textfile collector de node_exporter) ou se sert en HTTP sur /metrics.
+
+Une machine ne touche pas le registre à chaque instruction : les appels, les
+exceptions et la profondeur de la pile à chaque appel sont relevés dans son
+MetricsCollector, qui les reporte dans le registre avec les instructions exécutées et
+les mots alloués entre deux tranches d'exécution.
+"""
+
+import os
+import time
+
+# bornes par défaut des histogrammes de durées, en secondes (celles des clients Prometheus)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+               for value in values)
+    return "{%s}" % ",".join("%s=\"%s\"" % pair for pair in zip(names, escaped))
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """
+    Métrique nommée, dont chaque valeur est repérée par les valeurs de ses labels
+    """
+
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        """
+        :param labels: les noms des labels, dans l'ordre des valeurs passées à labels=
+        """
+
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}  # valeurs des labels -> valeur
+
+    def samples(self):
+        """
+        :return: les lignes (suffixe du nom, noms des labels, valeurs des labels, valeur)
+        """
+
+        return [("", self.labels, key, value) for key, value in sorted(self.values.items())]
+
+    def render(self):
+        lines = ["# HELP %s %s" % (self.name, self.help.replace("\\", "\\\\").replace("\n", "\\n")),
+                 "# TYPE %s %s" % (self.name, self.kind)]
+        for suffix, names, values, value in self.samples():
+            lines.append("%s%s%s %s" % (self.name, suffix, _format_labels(names, values), _format_value(value)))
+        return "\n".join(lines) + "\n"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, labels=()):
+        """
+        :param labels: les valeurs des labels, dans l'ordre de leurs noms
+        """
+
+        if amount < 0:
+            raise ValueError("counters can only increase.")
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def get(self, labels=()):
+        return self.values.get(labels, 0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, labels=()):
+        self.values[labels] = value
+
+    def set_max(self, value, labels=()):
+        """
+        Garde le maximum de la valeur courante et de value
+        """
+
+        if value > self.values.get(labels, value - 1):
+            self.values[labels] = value
+
+    def get(self, labels=()):
+        return self.values.get(labels, 0)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, labels=()):
+        # valeurs : effectifs par borne (non cumulés), somme et nombre d'observations
+        entry = self.values.get(labels)
+        if entry is None:
+            entry = self.values[labels] = [[0] * len(self.buckets), 0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                entry[0][i] += 1
+                break
+        entry[1] += value
+        entry[2] += 1
+
+    def get(self, labels=()):
+        """
+        :return: le nombre d'observations et leur somme
+        """
+
+        entry = self.values.get(labels)
+        return (0, 0) if entry is None else (entry[2], entry[1])
+
+    def samples(self):
+        samples = []
+        names = self.labels + ("le",)
+        for key, (counts, total, count) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                samples.append(("_bucket", names, key + (_format_value(bound),), cumulative))
+            samples.append(("_sum", self.labels, key, total))
+            samples.append(("_count", self.labels, key, count))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    Ensemble de métriques, rendues dans l'ordre de leur création
+    """
+
+    def __init__(self):
+        self.metrics = {}  # nom -> métrique
+        self.server = None
+
+    def _get(self, kind, name, help, **kwargs):
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics[name] = kind(name, help, **kwargs)
+        elif type(metric) is not kind:
+            raise ValueError("metric %s is already registered as a %s." % (name, metric.kind))
+        return metric
+
+    def counter(self, name, help, labels=()):
+        """
+        :return: le compteur name, créé s'il n'existe pas
+        """
+
+        return self._get(Counter, name, help, labels=labels)
+
+    def gauge(self, name, help, labels=()):
+        """
+        :return: la jauge name, créée si elle n'existe pas
+        """
+
+        return self._get(Gauge, name, help, labels=labels)
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        """
+        :return: l'histogramme name, créé s'il n'existe pas
+        """
+
+        return self._get(Histogram, name, help, labels=labels, buckets=buckets)
+
+    def render(self):
+        """
+        :return: le texte de toutes les métriques au format d'exposition de Prometheus
+        """
+
+        return "".join(metric.render() for metric in self.metrics.values())
+
+    def write(self, path):
+        """
+        Écrit les métriques dans path, remplacé d'un coup : un lecteur ne voit jamais
+        un fichier à moitié écrit
+        """
+
+        tmp = "%s.%d.tmp" % (path, os.getpid())
+        with open(tmp, "w") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+    def serve(self, port=0, host="127.0.0.1"):
+        """
+        Sert les métriques en HTTP sur /metrics, dans un thread
+
+        :param port: le port, 0 pour un port libre
+        :return: le port du serveur
+        """
+
+        # importés à la demande : vm.py importe ce module à chaque démarrage
+        import http.server
+        import threading
+
+        registry = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.server.server_address[1]
+
+    def close(self):
+        """
+        Arrête le serveur HTTP
+        """
+
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+class MetricsCollector:
+    """
+    Mesures d'une machine, reportées dans le registre entre deux tranches d'exécution
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.instructions = registry.counter("minizam_instructions_total", "Instructions executed.")
+        self.calls = registry.counter("minizam_calls_total", "Function applications (APPLY and APPTERM).")
+        self.raises = registry.counter("minizam_raises_total", "Exceptions raised.")
+        self.allocated = registry.counter("minizam_allocated_words_total",
+                                          "Words allocated for blocks and closures.")
+        self.stack_depth = registry.gauge("minizam_stack_depth_max",
+                                          "Deepest stack seen at a call or between two execution slices.")
+        self.runs = registry.counter("minizam_runs_total", "Finished runs by status.", labels=("status",))
+        self.duration = registry.histogram("minizam_run_duration_seconds", "Duration of finished runs.")
+        # comptés par les instructions (voir CountedCall), reportés par update
+        self.pending_calls = 0
+        self.pending_raises = 0
+        self.depth = 0
+        self.heap_words = 0
+        self.started = None
+
+    def start(self, vm):
+        """
+        Début d'une exécution
+        """
+
+        self.heap_words = vm.heap_words
+        self.started = time.perf_counter()
+
+    def update(self, vm, executed):
+        """
+        Reporte dans le registre les mesures de la tranche qui vient d'exécuter executed
+        instructions
+        """
+
+        self.instructions.inc(executed)
+        words = vm.heap_words
+        if words > self.heap_words:
+            self.allocated.inc(words - self.heap_words)
+        self.heap_words = words
+        self.stack_depth.set_max(max(self.depth, vm.stack.size()))
+        if self.pending_calls:
+            self.calls.inc(self.pending_calls)
+            self.pending_calls = 0
+        if self.pending_raises:
+            self.raises.inc(self.pending_raises)
+            self.pending_raises = 0
+
+    def finish(self, vm):
+        """
+        Fin d'une exécution, de statut vm.status
+        """
+
+        if self.started is not None:
+            self.runs.inc(labels=(vm.status,))
+            self.duration.observe(time.perf_counter() - self.started)
+            self.started = None
@@ -1,11 +1,21 @@
 class MLValue:
+    # pas de __dict__ par valeur, ce qui donne aussi effet aux __slots__ de Pair.
+    # entry : (arité, début du corps) pour les fermetures, None si inconnu ;
+    # __weakref__ : les tables de hashcons et allocprof tiennent les blocs par référence faible
+    __slots__ = ("value", "entry", "__weakref__")
+
     _TRUE = None
     _FALSE = None
     _UNIT = None
 
+    # entiers préalloués : _SMALL_INTS[i] vaut _SMALL_INT_MIN + i
+    _SMALL_INT_MIN = 0
+    _SMALL_INTS = []
+
     def __init__(self):
         super().__init__()
         self.value = None
+        self.entry = None
 
     @staticmethod
     def from_block(block):
@@ -14,9 +24,32 @@ class MLValue:
         return value
 
     @staticmethod
-    def from_closure(pc, env):
+    def from_fields(fields):
+        """
+        Renvoie un bloc des champs de la liste fields : une Pair s'il y en a deux, sinon
+        un bloc qui garde la liste
+        """
+
+        if len(fields) == 2:
+            return MLValue.pair(fields[0], fields[1])
+        return MLValue.from_block(fields)
+
+    @staticmethod
+    def pair(head, tail):
+        """
+        Renvoie le bloc de deux champs head et tail (voir Pair)
+        """
+
+        value = Pair.__new__(Pair)
+        value.head = head
+        value.tail = tail
+        return value
+
+    @staticmethod
+    def from_closure(pc, env, entry=None):
         value = MLValue()
         value.value = (pc, env)
+        value.entry = entry
         return value
 
     @staticmethod
@@ -24,29 +57,59 @@ class MLValue:
         if not isinstance(integer, int):
             raise TypeError(str(integer) + "is not an instance of int.")
 
+        index = integer - MLValue._SMALL_INT_MIN
+        if 0 <= index < len(MLValue._SMALL_INTS):
+            return MLValue._SMALL_INTS[index]
+        return MLValue._new_int(integer)
+
+    @staticmethod
+    def from_ints(integers):
+        """
+        Renvoie la liste des MLValue des entiers, pour un bloc construit d'un coup
+        (sans passer par from_int pour chaque entier)
+        """
+
+        low = MLValue._SMALL_INT_MIN
+        cache = MLValue._SMALL_INTS
+        high = low + len(cache)
+        new = MLValue.__new__
+        values = []
+        append = values.append
+        for integer in integers:
+            if low <= integer < high:
+                append(cache[integer - low])
+            else:
+                value = new(MLValue)
+                value.value = integer
+                append(value)
+        return values
+
+    @staticmethod
+    def configure_int_cache(low, high):
+        """
+        Préalloue les entiers de low à high inclus, partagés par from_int.
+        Un intervalle vide (high < low) désactive le cache.
+        """
+
+        MLValue._SMALL_INT_MIN = low
+        MLValue._SMALL_INTS = [MLValue._new_int(i) for i in range(low, high + 1)]
+
+    @staticmethod
+    def _new_int(integer):
         value = MLValue()
         value.value = integer
         return value
 
     @staticmethod
     def true():
-        if MLValue._TRUE is None:
-            MLValue._TRUE = MLValue()
-            MLValue._TRUE.value = 1
         return MLValue._TRUE
 
     @staticmethod
     def false():
-        if MLValue._FALSE is None:
-            MLValue._FALSE = MLValue()
-            MLValue._FALSE.value = 0
         return MLValue._FALSE
 
     @staticmethod
     def unit():
-        if MLValue._UNIT is None:
-            MLValue._UNIT = MLValue()
-            MLValue._UNIT.value = 0
         return MLValue._UNIT
 
     def _check_int(self, other):
@@ -141,3 +204,39 @@ class MLValue:
             return True
 
         raise TypeError(str(self) + " is not an instance of bool.")
+
+
+class Pair(MLValue):
+    """
+    Bloc de deux champs (paire, cellule de liste) : les champs sont rangés dans deux
+    attributs, sans liste Python. GETFIELD, SETFIELD et VECTLENGTH les lisent
+    directement ; value rend une copie des champs sous forme de liste pour le reste
+    du code, et les remplace quand on lui affecte une liste.
+    """
+
+    __slots__ = ("head", "tail")
+
+    @property
+    def value(self):
+        return [self.head, self.tail]
+
+    @value.setter
+    def value(self, block):
+        self.head, self.tail = block
+
+    def __eq__(self, other):
+        if type(other) is Pair:
+            # comme l'égalité des listes : identité, puis égalité des champs
+            for one, two in ((self.head, other.head), (self.tail, other.tail)):
+                if one is not two and not one == two:
+                    return MLValue.false()
+            return MLValue.true()
+        if isinstance(other, MLValue) and type(other.value) is int:
+            return MLValue.false()
+        return MLValue.__eq__(self, other)
+
+
+MLValue._TRUE = MLValue._new_int(1)
+MLValue._FALSE = MLValue._new_int(0)
+MLValue._UNIT = MLValue._new_int(0)
+MLValue.configure_int_cache(-128, 1023)
@@ -0,0 +1,68 @@
+import sys
+
+
+class OutputChannel:
+    """
+    Canal de sortie bufferisé de la machine, utilisé par PRIM print.
+
+    Le texte est accumulé puis transmis au puits par blocs de buffer_size caractères,
+    ou lors d'un flush (arrêt de la machine, exception).
+    """
+
+    def __init__(self, sink=None, buffer_size=8192):
+        """
+        :param sink: None pour la sortie standard courante, "memory" pour garder le texte
+            en mémoire (voir getvalue), un objet fichier (méthode write) ou une fonction
+            appelée avec chaque bloc de texte
+        :param buffer_size: nombre de caractères accumulés avant d'écrire dans le puits
+        """
+
+        self.buffer = []
+        self.buffered = 0
+        self.buffer_size = buffer_size
+        self.captured = [] if sink == "memory" else None
+        self.sink = sink
+        self.at_line_start = True
+
+    def write(self, text):
+        """
+        Ajoute text au buffer, qui est vidé s'il dépasse buffer_size caractères
+        """
+
+        self.buffer.append(text)
+        self.buffered += len(text)
+        if self.buffered >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Transmet le contenu du buffer au puits
+        """
+
+        if not self.buffer:
+            return
+        text = "".join(self.buffer)
+        self.buffer = []
+        self.buffered = 0
+        self.at_line_start = text.endswith("\n")
+
+        sink = self.sink
+        if self.captured is not None:
+            self.captured.append(text)
+        elif sink is None:
+            sys.stdout.write(text)
+            sys.stdout.flush()
+        elif hasattr(sink, "write"):
+            sink.write(text)
+        else:
+            sink(text)
+
+    def getvalue(self):
+        """
+        Renvoie le texte écrit dans un canal en mémoire, None pour les autres puits
+        """
+
+        if self.captured is None:
+            return None
+        self.flush()
+        return "".join(self.captured)
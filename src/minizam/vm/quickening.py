@@ -0,0 +1,34 @@
+from .instructions import GENERIC_COMMANDS
+
+
+class Quickener:
+    """
+    Statistiques de l'accélération (quickening) d'un programme : à sa première exécution,
+    chaque PRIM, ACC, CONST et ENVACC est remplacé dans le programme par une variante
+    spécialisée selon ses opérandes (PRIM_ADD_INT, PRIM_LT_INT, ACC0, CONST_SMALL...),
+    qui revient à la commande générique si une exécution suivante ne vérifie plus
+    ses conditions (désoptimisation)
+    """
+
+    def __init__(self):
+        self.variants = {}  # variante spécialisée -> nombre d'instructions remplacées
+        self.generic = 0  # instructions restées génériques à leur première exécution
+        self.deoptimized = 0
+
+    def record(self, command):
+        """
+        Compte la première exécution d'une instruction, remplacée par command
+        """
+
+        if command in GENERIC_COMMANDS:
+            self.variants[command] = self.variants.get(command, 0) + 1
+        else:
+            self.generic += 1
+
+    def stats(self):
+        """
+        :return: les statistiques de l'accélération
+        """
+
+        return {"quickened": sum(self.variants.values()), "generic": self.generic,
+                "deoptimized": self.deoptimized, "variants": dict(self.variants)}
@@ -0,0 +1,175 @@
+import signal
+from collections import Counter
+
+from .instructions import PROFILED
+from .memo import CONDITIONAL_BRANCHES
+
+# instructions qui terminent un chemin d'exécution de la fonction
+EXITS = {"RETURN", "APPTERM", "TRACEAPPTERM", "UNBOXAPPTERM", "STOP", "RAISE"}
+
+# appels qui empilent un bloc de retour (pc, env, extra_args), pc suivant l'appel
+CALLS = {"APPLY", "MEMOAPPLY", "UNBOXAPPLY"}
+
+# commande profilée -> commande d'origine
+_UNPROFILED = {name: command for command, name in PROFILED.items()}
+
+
+def _command(inst):
+    return _UNPROFILED.get(inst.command, inst.command)
+
+
+def function_owners(prog):
+    """
+    :return: position -> nom de la fonction qui contient l'instruction : le label de son
+        point d'entrée (CLOSURE, CLOSUREREC ou copie de UNBOXAPPLY), "main" pour le
+        programme principal. Une instruction partagée appartient à la première fonction.
+    """
+
+    position = {inst.label: i for i, inst in enumerate(prog) if inst.label}
+    entries = [(0, "main")]
+    for inst in prog:
+        command = _command(inst)
+        if command in ("CLOSURE", "CLOSUREREC", "UNBOXAPPLY", "UNBOXAPPTERM"):
+            label = inst.args[0] if command.startswith("CLOSURE") else inst.args[-1]
+            entries.append((position[label], label))
+
+    owners = {}
+    for entry, name in entries:
+        pending = [entry]
+        while pending:
+            i = pending.pop()
+            if i >= len(prog) or i in owners:
+                continue
+            owners[i] = name
+            inst = prog[i]
+            if inst.command == "BRANCH":
+                pending.append(position[inst.args])
+            elif inst.command in CONDITIONAL_BRANCHES:
+                label = inst.args[-1] if isinstance(inst.args, list) else inst.args
+                pending += [i + 1, position[label]]
+            elif inst.command not in EXITS:
+                pending.append(i + 1)
+    return owners
+
+
+class SamplingProfiler:
+    """
+    Profil statistique d'une machine : à chaque tick d'un minuteur de temps processeur
+    (ITIMER_PROF, Unix), le gestionnaire de SIGPROF relève pc et la pile d'appels Mini-ZAM,
+    reconstruite depuis les blocs de retour (pc, env, extra_args) empilés par les appels.
+    Seuls les max_depth appels les plus récents sont relevés, le reste de la pile est
+    résumé par "...". À utiliser autour de l'exécution, dans le thread principal :
+
+        with SamplingProfiler(vm) as profiler:
+            vm.run()
+        profiler.write_collapsed(path)
+    """
+
+    def __init__(self, vm, hz=1000, max_depth=64):
+        """
+        :param hz: nombre d'échantillons par seconde de temps processeur
+        :param max_depth: nombre maximal d'appels relevés par échantillon
+        """
+
+        self.vm = vm
+        self.interval = 1 / hz
+        self.max_depth = max_depth
+        self.samples = Counter()  # (positions de retour..., pc) -> nombre d'échantillons
+        self.truncated = Counter()  # mêmes clés, échantillons dont la pile est tronquée
+        self.previous = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        """
+        Démarre le minuteur
+        """
+
+        self.previous = signal.signal(signal.SIGPROF, self.handle)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        """
+        Arrête le minuteur et rétablit le gestionnaire précédent de SIGPROF
+        """
+
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, self.previous or signal.SIG_DFL)
+
+    def handle(self, signum, frame):
+        self.sample()
+
+    def sample(self):
+        """
+        Relève la position courante et les positions de retour des appels en cours
+        """
+
+        vm = self.vm
+        items = vm.stack.items
+        prog = vm.prog
+        store = None if vm.memo is None else vm.memo.store_pc
+        returns = []
+        end = len(items) - 1
+        i = 1
+        while i < end:
+            pc = items[i - 1]
+            # un bloc de retour : l'environnement entre deux entiers, pc suit un appel
+            if type(items[i]) is tuple and type(pc) is int and type(items[i + 1]) is int \
+                    and pc != store and 0 < pc <= len(prog) and _command(prog[pc - 1]) in CALLS:
+                returns.append(pc)
+                if len(returns) == self.max_depth:
+                    break
+                i += 3
+            else:
+                i += 1
+        returns.reverse()
+        key = tuple(returns) + (vm.pc,)
+        self.samples[key] += 1
+        if len(returns) == self.max_depth and i < end:
+            self.truncated[key] += 1
+
+    def collapsed(self):
+        """
+        :return: le nombre d'échantillons par pile de fonctions "main;f;g", la plus
+            ancienne en tête (format des piles repliées des flame graphs)
+        """
+
+        owners = function_owners(self.vm.prog)
+        stacks = Counter()
+        for key, count in self.samples.items():
+            # un appel appartient à la fonction de l'instruction qui le précède
+            names = [owners.get(pc - 1, "?") for pc in key[:-1]] + [owners.get(key[-1], "?")]
+            truncated = self.truncated[key]
+            if truncated:
+                stacks[";".join(["..."] + names)] += truncated
+            if count > truncated:
+                stacks[";".join(names)] += count - truncated
+        return stacks
+
+    def functions(self):
+        """
+        :return: nom de fonction -> (échantillons où elle s'exécute, échantillons où elle
+            est dans la pile)
+        """
+
+        own, total = Counter(), Counter()
+        for stack, count in self.collapsed().items():
+            names = stack.split(";")
+            own[names[-1]] += count
+            for name in set(names):
+                total[name] += count
+        return {name: (own[name], total[name]) for name in total if name != "..."}
+
+    def write_collapsed(self, path):
+        """
+        Écrit dans path une ligne "main;f;g n" par pile, lisible par flamegraph.pl
+        """
+
+        with open(path, "w") as f:
+            for stack, count in sorted(self.collapsed().items()):
+                f.write("%s %d\n" % (stack, count))
@@ -0,0 +1,77 @@
+import asyncio
+
+from .vm import MiniZamVM, RunResult
+
+
+class Scheduler:
+    """
+    Ordonnanceur coopératif qui entrelace l'exécution de nombreuses machines
+    dans une boucle asyncio : chaque machine exécute un quantum d'instructions
+    puis rend la main, et les machines prêtes reprennent dans l'ordre FIFO.
+    """
+
+    def __init__(self, quantum=1000, limits=None, max_running=None, metrics=None):
+        """
+        :param quantum: nombre d'instructions exécutées par une machine avant de rendre la main
+        :param limits: ResourceLimits appliquées par défaut à chaque programme
+        :param max_running: nombre maximal de programmes exécutés en même temps, None pour aucun
+        :param metrics: MetricsRegistry où chaque machine mesure son exécution (voir
+            MiniZamVM.enable_metrics), None pour aucune mesure
+        """
+
+        if quantum <= 0:
+            raise ValueError("quantum must be positive.")
+        self.quantum = quantum
+        self.limits = limits
+        self.slots = None if max_running is None else asyncio.Semaphore(max_running)
+        self.metrics = metrics
+        self.completed = 0
+        self.slices = 0
+
+    async def run(self, vm, limits=None):
+        """
+        Exécute la machine vm jusqu'au bout en rendant la main après chaque quantum
+
+        :param vm: une machine dont le programme est chargé
+        :param limits: ResourceLimits de ce programme, à défaut celles de l'ordonnanceur
+        :return: le RunResult de l'exécution
+        """
+
+        if self.slots is None:
+            return await self._run(vm, limits)
+        async with self.slots:
+            return await self._run(vm, limits)
+
+    async def _run(self, vm, limits):
+        if self.metrics is not None:
+            vm.enable_metrics(self.metrics)
+        vm.start(limits if limits is not None else self.limits)
+        while True:
+            result = vm.resume(self.quantum)
+            self.slices += 1
+            if result.status != RunResult.RUNNING:
+                self.completed += 1
+                return result
+            await asyncio.sleep(0)
+
+    def submit(self, prog, limits=None, vm_class=MiniZamVM):
+        """
+        Crée une machine pour le programme prog et planifie son exécution.
+        Doit être appelée depuis une boucle asyncio en cours d'exécution.
+
+        :param prog: une liste de LineInstruction, partageable entre plusieurs machines
+        :return: une tâche asyncio dont le résultat est le RunResult
+        """
+
+        vm = vm_class()
+        vm.prog = prog
+        return asyncio.ensure_future(self.run(vm, limits))
+
+    async def run_all(self, progs, limits=None):
+        """
+        Exécute tous les programmes de progs de façon entrelacée
+
+        :return: la liste des RunResult, dans l'ordre de progs
+        """
+
+        return await asyncio.gather(*[self.submit(prog, limits) for prog in progs])
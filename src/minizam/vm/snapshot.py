@@ -0,0 +1,308 @@
+"""
+Sauvegarde et restauration de l'état complet d'une machine Mini-ZAM.
+
+Le format est binaire (petit-boutiste) :
+
+    en-tête   MAGIC, nombre de noeuds (I)
+    programme longueur (I) puis le listing en UTF-8
+    noeuds    un par valeur atteignable, dans un ordre où chaque tuple suit ses éléments
+    racines   pc, extra_args, heap_words (q) puis les références de stack, env, acc, trap_sp
+
+Chaque noeud commence par un tag (B). Les références sont des indices de noeuds (I),
+ce qui préserve le partage (et les cycles) entre blocs, fermetures et environnements.
+"""
+
+import mmap
+import struct
+
+from .mlvalue import MLValue
+from .vm import MiniZamVM, LineInstruction
+
+MAGIC = b"MZSNAP1\0"
+
+_NONE, _BOOL, _INT, _BIGINT, _ML_INT, _ML_BIGINT, _ML_TRUE, _ML_FALSE, _ML_UNIT, \
+    _ML_BLOCK, _ML_CLOSURE, _TUPLE, _LIST = range(13)
+
+_SINGLETONS = {_ML_TRUE: MLValue.true, _ML_FALSE: MLValue.false, _ML_UNIT: MLValue.unit}
+
+_INT64_MIN = -2 ** 63
+_INT64_MAX = 2 ** 63 - 1
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def _children(obj):
+    """
+    Renvoie les valeurs référencées par obj
+    """
+
+    if isinstance(obj, MLValue):
+        value = obj.value
+        if isinstance(value, (list, tuple)):
+            return value
+        return ()
+    if isinstance(obj, (tuple, list)):
+        return obj
+    return ()
+
+
+def _key(obj):
+    """
+    Clé de partage : identité pour les objets, valeur pour les scalaires Python
+    """
+
+    if obj is None or type(obj) in (bool, int):
+        return (type(obj), obj)
+    return id(obj)
+
+
+def _number(roots):
+    """
+    Numérote les valeurs atteignables depuis roots. Les tuples, immuables, sont
+    numérotés après leurs éléments ; les valeurs mutables (blocs, fermetures, listes)
+    sont remplies au chargement et peuvent donc former des cycles.
+
+    :return: la liste des objets et le dictionnaire clé -> indice
+    """
+
+    order = []
+    index = {}
+    pending = list(roots)
+    while pending:
+        root = pending.pop()
+        if _key(root) in index:
+            continue
+        todo = [(root, _tuple_children(root, pending))]
+        on_stack = {_key(root)}
+        while todo:
+            obj, children = todo[-1]
+            for child in children:
+                key = _key(child)
+                if key not in index and key not in on_stack:
+                    on_stack.add(key)
+                    todo.append((child, _tuple_children(child, pending)))
+                    break
+            else:
+                todo.pop()
+                index[_key(obj)] = len(order)
+                order.append(obj)
+    return order, index
+
+
+def _tuple_children(obj, pending):
+    """
+    Renvoie un itérateur sur les éléments de obj si c'est un tuple, sinon
+    ajoute les valeurs référencées par obj à pending
+    """
+
+    if isinstance(obj, tuple):
+        return iter(obj)
+    pending.extend(_children(obj))
+    return iter(())
+
+
+def _write_int(out, tag_small, tag_big, value):
+    if _INT64_MIN <= value <= _INT64_MAX:
+        out.append(struct.pack("<Bq", tag_small, value))
+    else:
+        data = value.to_bytes((value.bit_length() + 8) // 8, "little", signed=True)
+        out.append(struct.pack("<BI", tag_big, len(data)))
+        out.append(data)
+
+
+def _write_refs(out, tag, refs, index):
+    out.append(struct.pack("<BI", tag, len(refs)))
+    out.append(struct.pack("<%dI" % len(refs), *[index[_key(ref)] for ref in refs]))
+
+
+def _write_node(out, obj, index):
+    if obj is None:
+        out.append(struct.pack("<B", _NONE))
+    elif type(obj) is bool:
+        out.append(struct.pack("<BB", _BOOL, obj))
+    elif type(obj) is int:
+        _write_int(out, _INT, _BIGINT, obj)
+    elif obj is MLValue.true():
+        out.append(struct.pack("<B", _ML_TRUE))
+    elif obj is MLValue.false():
+        out.append(struct.pack("<B", _ML_FALSE))
+    elif obj is MLValue.unit():
+        out.append(struct.pack("<B", _ML_UNIT))
+    elif isinstance(obj, MLValue):
+        value = obj.value
+        if isinstance(value, int):
+            _write_int(out, _ML_INT, _ML_BIGINT, value)
+        elif isinstance(value, list):
+            _write_refs(out, _ML_BLOCK, value, index)
+        elif isinstance(value, tuple):
+            pc, env = value
+            arity, body = obj.entry if obj.entry is not None else (-1, -1)
+            out.append(struct.pack("<BIIii", _ML_CLOSURE, index[_key(pc)], index[_key(env)], arity, body))
+        else:
+            raise SnapshotError("cannot snapshot MLValue(%r)" % (value,))
+    elif isinstance(obj, tuple):
+        _write_refs(out, _TUPLE, obj, index)
+    elif isinstance(obj, list):
+        _write_refs(out, _LIST, obj, index)
+    else:
+        raise SnapshotError("cannot snapshot %r" % (obj,))
+
+
+def program_listing(prog):
+    """
+    Renvoie le listing texte d'un programme chargé, relisible par load_file
+    """
+
+    lines = []
+    for inst in prog:
+        args = inst.args
+        if isinstance(args, list):
+            args = ",".join(map(str, args))
+        line = "%s\t%s" % (inst.label + ":" if inst.label else "", inst.command)
+        lines.append(line + " " + str(args) if args != "" else line)
+    return "\n".join(lines) + "\n"
+
+
+def dumps(vm):
+    """
+    Sérialise l'état de vm
+
+    :return: les octets du snapshot
+    """
+
+    # le texte en attente appartient à la partie déjà exécutée
+    vm.output.flush()
+    stack = vm.stack.items
+    roots = [stack, vm.env, vm.acc, vm.trap_sp]
+    order, index = _number(roots)
+
+    listing = program_listing(vm.prog).encode("utf-8")
+    out = [MAGIC, struct.pack("<II", len(order), len(listing)), listing]
+    for obj in order:
+        _write_node(out, obj, index)
+    out.append(struct.pack("<qqq", vm.pc, vm.extra_args, vm.heap_words))
+    out.append(struct.pack("<4I", *[index[_key(root)] for root in roots]))
+    return b"".join(out)
+
+
+def save(vm, path):
+    """
+    Écrit le snapshot de vm dans le fichier path
+
+    :return: la taille du snapshot en octets
+    """
+
+    data = dumps(vm)
+    with open(path, "wb") as f:
+        f.write(data)
+    return len(data)
+
+
+class _Reader:
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.offset = 0
+
+    def read(self, fmt):
+        values = struct.unpack_from(fmt, self.buffer, self.offset)
+        self.offset += struct.calcsize(fmt)
+        return values
+
+    def read_bytes(self, n):
+        data = self.buffer[self.offset:self.offset + n]
+        self.offset += n
+        return data
+
+
+def _read_int(reader, big):
+    if big:
+        (length,) = reader.read("<I")
+        return int.from_bytes(reader.read_bytes(length), "little", signed=True)
+    return reader.read("<q")[0]
+
+
+def loads(buffer, vm_class=MiniZamVM):
+    """
+    Reconstruit une machine à partir d'un snapshot (bytes, mmap ou memoryview)
+
+    :return: la machine, prête à reprendre son exécution avec run()
+    """
+
+    if bytes(buffer[:len(MAGIC)]) != MAGIC:
+        raise SnapshotError("not a Mini-ZAM snapshot")
+    reader = _Reader(buffer)
+    reader.offset = len(MAGIC)
+    count, listing_length = reader.read("<II")
+    listing = bytes(reader.read_bytes(listing_length)).decode("utf-8")
+
+    nodes = [None] * count
+    # blocs, fermetures et listes sont créés vides puis remplis, pour supporter les cycles
+    tuples = []
+    pending = []
+    for i in range(count):
+        (tag,) = reader.read("<B")
+        if tag == _NONE:
+            pass
+        elif tag == _BOOL:
+            nodes[i] = bool(reader.read("<B")[0])
+        elif tag in (_INT, _BIGINT):
+            nodes[i] = _read_int(reader, tag == _BIGINT)
+        elif tag in (_ML_INT, _ML_BIGINT):
+            nodes[i] = MLValue.from_int(_read_int(reader, tag == _ML_BIGINT))
+        elif tag in _SINGLETONS:
+            nodes[i] = _SINGLETONS[tag]()
+        elif tag == _ML_CLOSURE:
+            pc, env, arity, body = reader.read("<IIii")
+            value = MLValue()
+            if arity >= 0:
+                value.entry = (arity, body)
+            nodes[i] = value
+            pending.append((tag, value, (pc, env)))
+        elif tag in (_ML_BLOCK, _TUPLE, _LIST):
+            (length,) = reader.read("<I")
+            refs = reader.read("<%dI" % length)
+            if tag == _TUPLE:
+                tuples.append((i, refs))
+            else:
+                nodes[i] = MLValue.from_fields([None] * length) if tag == _ML_BLOCK else []
+                pending.append((tag, nodes[i], refs))
+        else:
+            raise SnapshotError("unknown tag %d" % tag)
+
+    # les tuples sont numérotés après les tuples qu'ils contiennent
+    for i, refs in tuples:
+        nodes[i] = tuple([nodes[ref] for ref in refs])
+
+    for tag, obj, refs in pending:
+        if tag == _ML_CLOSURE:
+            obj.value = (nodes[refs[0]], nodes[refs[1]])
+        elif tag == _ML_BLOCK:
+            obj.value = [nodes[ref] for ref in refs]
+        else:
+            obj.extend([nodes[ref] for ref in refs])
+
+    pc, extra_args, heap_words = reader.read("<qqq")
+    stack, env, acc, trap_sp = reader.read("<4I")
+
+    vm = vm_class()
+    vm.prog = list(map(LineInstruction.build, LineInstruction.parse(listing)))
+    vm.stack.items = nodes[stack]
+    vm.env = nodes[env]
+    vm.acc = nodes[acc]
+    vm.trap_sp = nodes[trap_sp]
+    vm.pc = pc
+    vm.extra_args = extra_args
+    vm.heap_words = heap_words
+    return vm
+
+
+def load(path, vm_class=MiniZamVM):
+    """
+    Restaure une machine depuis un fichier de snapshot projeté en mémoire
+    """
+
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return loads(buffer, vm_class)
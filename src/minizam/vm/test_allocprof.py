@@ -0,0 +1,114 @@
+import gc
+import os
+import tempfile
+import unittest
+from .vm import MiniZamVM
+
+# build k acc = if k = 0 then acc else build (k - 1) (k :: acc) in build 10 []
+BUILD = """\tBRANCH M
+B:\tGRAB 1
+\tACC 0
+\tBRANCHIFNOT Z
+\tACC 1
+\tPUSH
+\tACC 1
+\tMAKEBLOCK 2
+\tPUSH
+\tCONST 1
+\tPUSH
+\tACC 2
+\tPRIM -
+\tPUSH
+\tOFFSETCLOSURE
+\tAPPTERM 2,4
+Z:\tACC 1
+\tRETURN 2
+M:\tCLOSUREREC B,0
+\tCONST 0
+\tPUSH
+\tCONST 10
+\tPUSH
+\tACC 2
+\tAPPLY 2
+\tSTOP
+"""
+
+# let f x y = x + y in let g = f 1 in g 2 : GRAB crée une fermeture partielle
+PARTIAL = """\tBRANCH L2
+R:\tRESTART
+L1:\tGRAB 1
+\tACC 1
+\tPUSH
+\tACC 1
+\tPRIM +
+\tRETURN 2
+L2:\tCLOSURE L1,0
+\tPUSH
+\tCONST 1
+\tPUSH
+\tACC 1
+\tAPPLY 1
+\tPUSH
+\tCONST 2
+\tPUSH
+\tACC 1
+\tAPPLY 1
+\tSTOP
+"""
+
+
+def run(text, interval=1000):
+    vm = MiniZamVM()
+    vm.load_text(text)
+    profiler = vm.enable_allocation_profiling(interval)
+    return vm, profiler, vm.run().acc
+
+
+class AllocationProfilerTest(unittest.TestCase):
+    def test_sites(self):
+        vm, profiler, acc = run(BUILD)
+        sites = {site.command: site for site in profiler.sites.values()}
+        self.assertEqual({"MAKEBLOCK", "CLOSUREREC", "APPLY"}, set(sites))
+        # les dix cellules de la liste, de deux champs et un en-tête
+        block = sites["MAKEBLOCK"]
+        self.assertEqual("B+6", profiler.name(block.pc))
+        self.assertEqual((10, 10 * 24, 10, 0), (block.allocations, block.bytes, block.live, block.freed))
+        # le bloc de retour de l'appel n'est pas suivi
+        self.assertEqual((1, 24, None), (sites["APPLY"].allocations, sites["APPLY"].bytes, sites["APPLY"].live))
+        self.assertEqual(12, profiler.allocations)
+        self.assertEqual("MAKEBLOCK", profiler.top(1)[0].command)
+        self.assertIn("B+6 (7)", profiler.report(3))
+
+        # la liste et la fermeture sont libérées avec la machine
+        del vm, acc
+        gc.collect()
+        self.assertEqual((0, 10, 0), (block.live, block.freed, profiler.live_bytes))
+
+    def test_partial(self):
+        vm, profiler, acc = run(PARTIAL)
+        self.assertEqual(3, acc.value)
+        commands = sorted(site.command for site in profiler.sites.values())
+        self.assertEqual(["APPLY", "APPLY", "CLOSURE", "GRAB"], commands)
+
+    def test_unchanged(self):
+        for text in (BUILD, PARTIAL):
+            vm = MiniZamVM()
+            vm.load_text(text)
+            acc = vm.run().acc
+            profiled, _, profiled_acc = run(text)
+            self.assertEqual(repr(acc), repr(profiled_acc))
+            self.assertEqual(vm.heap_words, profiled.heap_words)
+
+    def test_series(self):
+        vm, profiler, acc = run(BUILD, interval=4)
+        self.assertEqual([4, 8, 12], [point[1] for point in profiler.series])
+        path = os.path.join(tempfile.mkdtemp(), "series.csv")
+        profiler.write_series(path)
+        with open(path) as f:
+            lines = f.read().splitlines()
+        self.assertEqual("seconds,allocations,live_bytes,stack", lines[0])
+        self.assertEqual(4, len(lines))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import math
+import unittest
+from .batch import np, run_batch, BatchRunner, BatchError
+from .testing import load, load_text
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class BatchTest(unittest.TestCase):
+    def check(self, vm, inputs, placeholder):
+        result = run_batch(vm, inputs, placeholder)
+        runner = BatchRunner(vm, inputs, placeholder)
+        for i, value in enumerate(inputs):
+            expected = runner.sequential(value)
+            self.assertEqual((expected.status, str(expected.acc), expected.output),
+                             (result[i].status, str(result[i].acc), result[i].output))
+        return result
+
+    def test_facto(self):
+        # facto(21) et au-delà débordent des entiers sur 64 bits
+        result = self.check(load("rec_funs/facto.txt"), list(range(25)), 5)
+        self.assertEqual(2432902008176640000, result.values[20])
+        self.assertEqual(4, result.stats["ejected"])
+        self.assertEqual(math.factorial(24), result[24].acc.value)
+
+    def test_divergent_branches(self):
+        result = self.check(load("rec_funs/fibo.txt"), [3, 0, 7, 1, 7, 12], 8)
+        self.assertEqual(0, result.stats["ejected"])
+        self.assertGreater(result.stats["splits"], 0)
+        self.assertEqual(144, result[5].acc.value)
+
+    def test_fused_branches(self):
+        vm = load("appterm/facto_tailrec.txt")
+        vm.optimize()
+        placeholder = [inst.args for inst in vm.prog if inst.command == "CONST"][-1]
+        self.check(vm, list(range(15)), placeholder)
+
+    def test_division(self):
+        vm = load_text("\tCONST 7\n\tPUSH\n\tCONST 100\n\tPRIM /\n\tSTOP\n")
+        result = run_batch(vm, [3, 0, -7, 200], 7)
+        self.assertEqual([33, -14, 0], [result[i].acc.value for i in (0, 2, 3)])
+        self.assertEqual(False, result.booleans[0])
+        self.assertEqual(1, result.stats["ejected"])
+        self.assertRaises(ZeroDivisionError, result.__getitem__, 1)
+        # la comparaison rend un booléen : 0 < entrée
+        vm = load_text("\tCONST 7\n\tPUSH\n\tCONST 0\n\tPRIM <\n\tSTOP\n")
+        result = run_batch(vm, [3, -1], 7)
+        self.assertEqual(["True", "False"], [str(result[0].acc), str(result[1].acc)])
+
+    def test_unsupported(self):
+        # PRIM print n'est pas vectorisé : la sortie vient de l'exécution séquentielle
+        vm = load_text("\tCONST 7\n\tPUSH\n\tCONST 48\n\tPRIM +\n\tPRIM print\n\tCONST 7\n\tSTOP\n")
+        result = self.check(vm, [1, 2], 7)
+        self.assertEqual("2", result[1].output)
+        self.assertEqual(2, result.stats["ejected"])
+
+    def test_placeholder(self):
+        with self.assertRaises(BatchError):
+            run_batch(load("rec_funs/facto.txt"), [1, 2], 42)
+
+
+if __name__ == '__main__':
+    unittest.main()
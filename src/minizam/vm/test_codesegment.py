@@ -0,0 +1,92 @@
+import glob
+import os
+import tempfile
+import unittest
+from .vm import MiniZamVM
+from .output import OutputChannel
+from .codesegment import CodeSegment, CodeSegmentError, build
+from .testing import TESTS
+
+
+def programs():
+    result = []
+    for path in sorted(glob.glob(os.path.join(TESTS, "*", "*.txt"))):
+        with open(path) as f:
+            result.append((os.path.relpath(path, TESTS), f.read()))
+    return result
+
+
+def outcome(vm):
+    try:
+        result = vm.run()
+    except Exception as e:
+        return type(e).__name__
+    return result.status, str(result.acc), result.output
+
+
+class CodeSegmentTest(unittest.TestCase):
+    def setUp(self):
+        self.programs = programs()
+
+    def check(self, segment, optimize=False):
+        self.assertEqual([name for name, _ in self.programs], segment.names())
+        for name, text in self.programs:
+            expected = MiniZamVM(output=OutputChannel("memory"))
+            expected.load_text(text)
+            if optimize:
+                expected.optimize()
+            vm = MiniZamVM(output=OutputChannel("memory"))
+            vm.load_shared(segment.program(name))
+            self.assertEqual(len(expected.prog), len(vm.prog), name)
+            self.assertEqual(outcome(expected), outcome(vm), name)
+
+    def test_shared_memory(self):
+        segment = CodeSegment.create(self.programs)
+        try:
+            self.check(segment)
+            attached = CodeSegment.attach(segment.name)
+            self.assertEqual(segment.names(), attached.names())
+            attached.close()
+        finally:
+            segment.close()
+            segment.unlink()
+
+    def test_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "programs.seg")
+            CodeSegment.save(self.programs, path, optimize=True)
+            segment = CodeSegment.open(path)
+            try:
+                self.assertIsNone(segment.name)
+                self.check(segment, optimize=True)
+            finally:
+                segment.close()
+
+    def test_read_only(self):
+        segment = CodeSegment(build(self.programs))
+        try:
+            for enable in ("enable_memoization", "enable_tracing", "enable_quickening", "enable_hash_consing",
+                           "enable_allocation_profiling"):
+                vm = MiniZamVM()
+                vm.load_shared(segment.program(self.programs[0][0]))
+                with self.assertRaises(ValueError):
+                    getattr(vm, enable)()
+        finally:
+            segment.close()
+
+    def test_view(self):
+        segment = CodeSegment(build([("p", "\tCONST 1\nL:\tPUSH\n\tAPPTERM 1,2\n")]))
+        prog = segment.program("p")
+        self.assertEqual({"L": 1}, prog.positions)
+        self.assertEqual([(None, "CONST", 1), ("L", "PUSH", []), (None, "APPTERM", [1, 2])],
+                         [(inst.label, inst.command, inst.args) for inst in prog])
+        with self.assertRaises(IndexError):
+            prog[3]
+
+    def test_invalid(self):
+        with self.assertRaises(CodeSegmentError):
+            CodeSegment(b"MZSNAP1\0" + bytes(8))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import unittest
+from .vm import MiniZamVM
+
+# let rec h (x, y) = if x < 0 then y else h (x - 1, y + 1) in h (100, 0)
+TAIL = """\tBRANCH L2
+L1:\tACC 0
+\tGETFIELD 1
+\tPUSH
+\tACC 1
+\tGETFIELD 0
+\tPUSH
+\tCONST 0
+\tPUSH
+\tACC 1
+\tPRIM <
+\tBRANCHIFNOT L3
+\tACC 1
+\tRETURN 3
+L3:\tCONST 1
+\tPUSH
+\tACC 2
+\tPRIM +
+\tPUSH
+\tCONST 1
+\tPUSH
+\tACC 2
+\tPRIM -
+\tMAKEBLOCK 2
+\tPUSH
+\tOFFSETCLOSURE 0
+\tAPPTERM 1,4
+L2:\tCLOSUREREC L1,0
+\tCONST 0
+\tPUSH
+\tCONST 100
+\tMAKEBLOCK 2
+\tPUSH
+\tACC 1
+\tAPPLY 1
+\tSTOP
+"""
+
+# let rec s (x, y) = if x = 0 then y else 1 + s (x - 1, y) in s (50, 7)
+NON_TAIL = """\tBRANCH L2
+L1:\tACC 0
+\tGETFIELD 0
+\tBRANCHIFNOT L3
+\tACC 0
+\tGETFIELD 1
+\tPUSH
+\tCONST 1
+\tPUSH
+\tACC 2
+\tGETFIELD 0
+\tPRIM -
+\tMAKEBLOCK 2
+\tPUSH
+\tOFFSETCLOSURE 0
+\tAPPLY 1
+\tPUSH
+\tCONST 1
+\tPRIM +
+\tRETURN 1
+L3:\tACC 0
+\tGETFIELD 1
+\tRETURN 1
+L2:\tCLOSUREREC L1,0
+\tCONST 7
+\tPUSH
+\tCONST 50
+\tMAKEBLOCK 2
+\tPUSH
+\tACC 1
+\tAPPLY 1
+\tSTOP
+"""
+
+# let f p = p in f (1, 2) : le bloc échappe
+ESCAPING = """\tBRANCH L2
+L1:\tACC 0
+\tRETURN 1
+L2:\tCLOSURE L1,0
+\tPUSH
+\tCONST 2
+\tPUSH
+\tCONST 1
+\tMAKEBLOCK 2
+\tPUSH
+\tACC 1
+\tAPPLY 1
+\tSTOP
+"""
+
+
+def run(text, unbox):
+    vm = MiniZamVM()
+    vm.load_text(text)
+    stats = vm.unbox_blocks() if unbox else None
+    result = vm.run()
+    return result.acc, vm.heap_words, stats
+
+
+class UnboxBlocksTest(unittest.TestCase):
+    def test_calls(self):
+        for text, value in ((TAIL, 101), (NON_TAIL, 57)):
+            acc, words, _ = run(text, False)
+            unboxed, unboxed_words, stats = run(text, True)
+            self.assertEqual(value, acc.value)
+            self.assertEqual(acc, unboxed)
+            # l'appel principal, celui de la fonction et celui de sa copie
+            self.assertEqual({"local": 0, "functions": 1, "calls": 3}, stats)
+            # seule la fermeture est encore allouée
+            self.assertEqual(2, unboxed_words)
+            self.assertLess(unboxed_words, words)
+
+    def test_escaping(self):
+        acc, words, stats = run(ESCAPING, True)
+        self.assertEqual({"local": 0, "functions": 0, "calls": 0}, stats)
+        self.assertEqual([1, 2], [field.value for field in acc.value])
+
+    def test_local(self):
+        for field, value in ((0, 3), (1, 4), (2, 5)):
+            text = "\tCONST 5\n\tPUSH\n\tCONST 4\n\tPUSH\n\tCONST 3\n\tMAKEBLOCK 3\n\tGETFIELD %d\n\tSTOP\n" % field
+            acc, words, stats = run(text, True)
+            self.assertEqual(value, acc.value)
+            self.assertEqual((0, 1), (words, stats["local"]))
+
+    def test_optimize(self):
+        # optimize enchaîne la copie avec la fusion des branchements
+        vm = MiniZamVM()
+        vm.load_text(TAIL)
+        vm.optimize()
+        self.assertIn("UNBOXAPPTERM", [inst.command for inst in vm.prog])
+        self.assertEqual(101, vm.run().acc.value)
+
+
+if __name__ == '__main__':
+    unittest.main()
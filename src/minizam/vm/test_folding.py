@@ -0,0 +1,78 @@
+import unittest
+from .vm import MiniZamVM, LineInstruction
+from .mlvalue import MLValue
+
+
+def load(lines):
+    vm = MiniZamVM()
+    vm.prog = list(map(LineInstruction.build, lines))
+    vm.invalidate_caches()
+    return vm
+
+
+def commands(vm):
+    return [(inst.label, inst.command, inst.args) for inst in vm.prog]
+
+
+class FoldConstantsTest(unittest.TestCase):
+    def test_arithmetic(self):
+        # (3 * 2) + 4
+        vm = load([("", "CONST", "3"), ("", "PUSH", ""), ("", "CONST", "2"), ("", "PRIM", "*"),
+                   ("", "PUSH", ""), ("", "CONST", "4"), ("", "PRIM", "+"), ("", "STOP", "")])
+        stats = vm.fold_constants()
+        self.assertEqual([(None, "CONST", 10), (None, "STOP", [])], commands(vm))
+        self.assertEqual(2, stats["folded"])
+        self.assertEqual(6, stats["removed"])
+
+    def test_propagation(self):
+        # let x = 3 in let y = 2 in x - y
+        vm = load([("", "CONST", "3"), ("", "PUSH", ""), ("", "CONST", "2"), ("", "PUSH", ""),
+                   ("", "ACC", "0"), ("", "PUSH", ""), ("", "ACC", "2"), ("", "PRIM", "-"),
+                   ("", "POP", ""), ("", "POP", ""), ("", "STOP", "")])
+        stats = vm.fold_constants()
+        self.assertEqual([(None, "CONST", 1), (None, "STOP", [])], commands(vm))
+        self.assertEqual(2, stats["propagated"])
+        self.assertEqual(MLValue.from_int(1), vm.run().acc)
+
+    def test_division_by_zero(self):
+        vm = load([("", "CONST", "0"), ("", "PUSH", ""), ("", "CONST", "7"), ("", "PRIM", "/"),
+                   ("", "STOP", "")])
+        self.assertEqual(0, vm.fold_constants()["folded"])
+        self.assertEqual(5, len(vm.prog))
+        with self.assertRaises(ZeroDivisionError):
+            vm.run()
+
+    def test_label_stops_propagation(self):
+        vm = load([("", "CONST", "1"), ("", "PUSH", ""), ("L", "ACC", "0"), ("", "STOP", "")])
+        self.assertEqual(0, vm.fold_constants()["propagated"])
+        self.assertEqual("ACC", vm.prog[2].command)
+
+    def test_branch(self):
+        for condition, expected in (("0", 2), ("1", 1)):
+            vm = load([("", "CONST", condition), ("", "BRANCHIFNOT", "L"), ("", "CONST", "1"),
+                       ("", "STOP", ""), ("L", "CONST", "2"), ("", "STOP", "")])
+            self.assertEqual(1, vm.fold_constants()["branches"])
+            self.assertNotIn("BRANCHIFNOT", [inst.command for inst in vm.prog])
+            self.assertEqual(MLValue.from_int(expected), vm.run().acc)
+
+    def test_comparison_branch(self):
+        # if 3 < 2 then 1 else 2 : acc est réécrit aux deux successeurs
+        vm = load([("", "CONST", "2"), ("", "PUSH", ""), ("", "CONST", "3"), ("", "PRIM", "<"),
+                   ("", "BRANCHIFNOT", "L"), ("", "CONST", "1"), ("", "STOP", ""),
+                   ("L", "CONST", "2"), ("", "STOP", "")])
+        stats = vm.fold_constants()
+        self.assertEqual(1, stats["branches"])
+        self.assertEqual((None, "BRANCH", "L"), commands(vm)[0])
+        self.assertEqual(MLValue.from_int(2), vm.run().acc)
+
+    def test_comparison_kept(self):
+        # le booléen n'est pas représentable par CONST : la comparaison est conservée
+        vm = load([("", "CONST", "2"), ("", "PUSH", ""), ("", "CONST", "3"), ("", "PRIM", "<"),
+                   ("", "PRIM", "not"), ("", "STOP", "")])
+        vm.fold_constants()
+        self.assertEqual(6, len(vm.prog))
+        self.assertIs(MLValue.true(), vm.run().acc)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+from .vm import MiniZamVM, LineInstruction, RunResult
+from .governor import ResourceLimits
+from .mlvalue import MLValue
+
+
+def build_vm(lines):
+    vm = MiniZamVM()
+    vm.prog = list(map(LineInstruction.build, lines))
+    return vm
+
+
+class GovernorTest(unittest.TestCase):
+    def test_stop_within_limits(self):
+        vm = build_vm([("", "CONST", "42"), ("", "STOP", "")])
+        result = vm.run(ResourceLimits(max_instructions=10, max_time=1, max_stack=10, max_heap=10))
+        self.assertEqual(RunResult.STOPPED, result.status)
+        self.assertEqual(MLValue.from_int(42), result.acc)
+        self.assertEqual(2, result.instructions)
+
+    def test_instruction_budget(self):
+        vm = build_vm([("L", "BRANCH", "L")])
+        result = vm.run(ResourceLimits(max_instructions=2500, check_interval=1000))
+        self.assertEqual(RunResult.EXHAUSTED, result.status)
+        self.assertEqual("instructions", result.exhausted.resource)
+        self.assertEqual(2500, result.instructions)
+        self.assertFalse(vm.running)
+
+    def test_deadline(self):
+        vm = build_vm([("L", "BRANCH", "L")])
+        result = vm.run(ResourceLimits(max_time=0.01))
+        self.assertEqual("time", result.exhausted.resource)
+
+    def test_stack_limit(self):
+        vm = build_vm([("L", "PUSH", ""), ("", "BRANCH", "L")])
+        result = vm.run(ResourceLimits(max_stack=100, check_interval=10))
+        self.assertEqual("stack", result.exhausted.resource)
+        self.assertLessEqual(vm.stack.size(), 105)
+
+    def test_heap_limit(self):
+        vm = build_vm([("L", "MAKEBLOCK", "1"), ("", "BRANCH", "L")])
+        result = vm.run(ResourceLimits(max_heap=50, check_interval=10))
+        self.assertEqual("heap", result.exhausted.resource)
+
+    def test_uncaught_exception(self):
+        vm = build_vm([("", "CONST", "3"), ("", "RAISE", "")])
+        self.assertEqual(RunResult.UNCAUGHT, vm.run().status)
@@ -0,0 +1,47 @@
+import gc
+import unittest
+from .vm import MiniZamVM
+from .mlvalue import MLValue
+from .hashcons import BlockTable
+from .testing import load_optimized as load
+
+
+class HashConsTest(unittest.TestCase):
+    def test_programs(self):
+        for name in ("block_values/liste.txt", "block_values/couple.txt", "block_values/insertion_sort.txt"):
+            vm = load(name)
+            self.assertIsNotNone(vm.enable_hash_consing())
+            self.assertEqual(load(name).run().acc, vm.run().acc)
+
+    def test_shared(self):
+        # deux fois la liste [1; 2] : le second MAKEBLOCK rend les blocs du premier
+        vm = MiniZamVM()
+        vm.load_text("\tCONST 0\n\tPUSH\n\tCONST 2\n\tMAKEBLOCK 2\n\tPUSH\n\tCONST 1\n\tMAKEBLOCK 2\n\tPUSH\n"
+                     "\tCONST 0\n\tPUSH\n\tCONST 2\n\tMAKEBLOCK 2\n\tPUSH\n\tCONST 1\n\tMAKEBLOCK 2\n\tSTOP\n")
+        blocks = vm.enable_hash_consing()
+        acc = vm.run().acc
+        self.assertIs(vm.stack.items[0], acc)
+        self.assertEqual({"created": 2, "shared": 2, "live": 2}, blocks.stats())
+        self.assertEqual(4, vm.heap_words)
+
+    def test_mutable(self):
+        vm = load("block_values/array_set.txt")
+        self.assertIsNone(vm.enable_hash_consing())
+        self.assertNotIn("HCMAKEBLOCK", [inst.command for inst in vm.prog])
+
+    def test_key(self):
+        table = BlockTable()
+        one, true = MLValue.from_int(1), MLValue.true()
+        self.assertNotEqual(table.key([one]), table.key([true]))
+        self.assertEqual(table.key([MLValue.from_int(10 ** 20)]), table.key([MLValue.from_int(10 ** 20)]))
+        block, created = table.intern([one, true])
+        self.assertTrue(created)
+        self.assertIs(block, table.intern([MLValue.from_int(1), true])[0])
+        # la table ne garde pas les blocs en vie
+        del block
+        gc.collect()
+        self.assertEqual(0, table.stats()["live"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import io
+import os
+import tempfile
+import unittest
+from .vm import MiniZamVM
+from .input import InputChannel
+from .output import OutputChannel
+from .memo import pure_closures
+
+
+def run(text, data):
+    vm = MiniZamVM(output=OutputChannel("memory"), input=InputChannel(data))
+    vm.load_text(text)
+    return vm.run()
+
+
+class InputChannelTest(unittest.TestCase):
+    DATA = b"12 -7\n  300\nline two\n\n42"
+
+    def channels(self):
+        yield InputChannel(self.DATA)
+        # un buffer de 3 octets coupe les mots et les lignes entre deux remplissages
+        yield InputChannel(io.BytesIO(self.DATA), buffer_size=3)
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(self.DATA)
+        try:
+            yield InputChannel.open(f.name, mapped=True)
+            yield InputChannel.open(f.name, buffer_size=4)
+        finally:
+            os.unlink(f.name)
+
+    def test_read(self):
+        for channel in self.channels():
+            self.assertEqual(12, channel.read_int())
+            self.assertEqual([-7, 300], channel.read_ints(2))
+            self.assertEqual(ord("\n"), channel.read_char())
+            self.assertEqual(b"line two", channel.read_line())
+            self.assertEqual(b"", channel.read_line())
+            self.assertFalse(channel.eof())
+            self.assertEqual(b"42", channel.read_line())
+            self.assertTrue(channel.eof())
+            self.assertEqual(-1, channel.read_char())
+            self.assertRaises(EOFError, channel.read_line)
+            self.assertRaises(EOFError, channel.read_int)
+
+    def test_read_ints(self):
+        data = " ".join(str(i * 1000003) for i in range(-500, 500)).encode("ascii") + b"\n"
+        for buffer_size in (1, 7, 64, 1 << 20):
+            channel = InputChannel(io.BytesIO(data), buffer_size)
+            values = []
+            while not channel.eof():
+                values += channel.read_ints(37)
+            self.assertEqual([i * 1000003 for i in range(-500, 500)], values)
+        self.assertEqual([1, 2], InputChannel(b"1 2").read_ints(5))
+        self.assertEqual([], InputChannel(b"  ").read_ints(5))
+        self.assertRaises(ValueError, InputChannel(b"1 x").read_ints, 2)
+
+    def test_empty_file(self):
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            pass
+        try:
+            self.assertTrue(InputChannel.open(f.name, mapped=True).eof())
+        finally:
+            os.unlink(f.name)
+
+
+class InputPrimTest(unittest.TestCase):
+    def test_prims(self):
+        result = run("\tPRIM read_int\n\tPUSH\n\tPRIM read_int\n\tPRIM +\n\tPRIM print_int\n\tSTOP\n", b"40 2")
+        self.assertEqual("42", result.output)
+
+        result = run("\tPRIM read_line\n\tPRIM print_block\n\tCONST 3\n\tPRIM read_ints\n\tPRIM print_ints\n"
+                     "\tPRIM eof\n\tSTOP\n", b"hello\n1 2\n3\n")
+        self.assertEqual("hello1\n2\n3\n", result.output)
+        self.assertEqual(True, bool(result.acc))
+
+        result = run("\tPRIM read_char\n\tPUSH\n\tPRIM read_char\n\tSTOP\n", b"A")
+        self.assertEqual(-1, result.acc.value)
+
+    def test_impure(self):
+        # une fonction qui lit son entrée n'est pas mémoïsée
+        vm = MiniZamVM()
+        vm.load_text("\tBRANCH M\nF:\tPRIM read_int\n\tRETURN 1\nM:\tCLOSURE F,0\n\tSTOP\n")
+        self.assertEqual({}, pure_closures(vm.prog, vm.get_position))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 from .instructions import *
 from .vm import MiniZamVM, LineInstruction
+from .output import OutputChannel
 import copy
 
 
@@ -22,6 +23,23 @@ class ConstTest(unittest.TestCase):
             MiniZamVM.instructions["CONST"].execute(self.vm, [1, "d"])
 
 
+class IntCacheTest(unittest.TestCase):
+    def tearDown(self):
+        MLValue.configure_int_cache(-128, 1023)
+
+    def test_small_ints_are_shared(self):
+        MLValue.configure_int_cache(-1, 10)
+        self.assertIs(MLValue.from_int(3), MLValue.from_int(3))
+        self.assertIs(MLValue.from_int(2) + MLValue.from_int(1), MLValue.from_int(3))
+        self.assertIsNot(MLValue.from_int(11), MLValue.from_int(11))
+        self.assertIsNot(MLValue.from_int(1), MLValue.true())
+        self.assertEqual("MLValue(Value: 0)", str(MLValue.from_int(0)))
+
+    def test_disabled_cache(self):
+        MLValue.configure_int_cache(0, -1)
+        self.assertIsNot(MLValue.from_int(3), MLValue.from_int(3))
+
+
 def check_stack(test, size, last):
     test.assertEqual(test.vm.stack.size(), size)
     test.assertEqual(test.vm.peek(), MLValue.from_int(last))
@@ -196,6 +214,25 @@ class PrimTestComparison(unittest.TestCase):
         self.execute(">=", MLValue.true())
 
 
+class PrimPrintTest(unittest.TestCase):
+    def setUp(self):
+        self.vm = MiniZamVM(OutputChannel("memory", buffer_size=2))
+
+    def test_execute(self):
+        for c in "abc":
+            self.vm.acc = MLValue.from_int(ord(c))
+            MiniZamVM.instructions["PRIM"].execute(self.vm, "print")
+            self.assertIs(MLValue.unit(), self.vm.acc)
+        self.assertEqual(["ab"], self.vm.output.captured)
+        self.assertEqual("abc", self.vm.output.getvalue())
+
+    def test_run_result(self):
+        lines = [("", "CONST", "72"), ("", "PRIM", "print"), ("", "CONST", "105"), ("", "PRIM", "print"),
+                 ("", "STOP", "")]
+        self.vm.prog = list(map(LineInstruction.build, lines))
+        self.assertEqual("Hi", self.vm.run().output)
+
+
 class BranchTest(unittest.TestCase):
     def setUp(self):
         self.vm = MiniZamVM()
@@ -227,6 +264,38 @@ class BranchIfNotTest(unittest.TestCase):
         self.assertEqual(2, self.vm.pc)
 
 
+class BranchCmpTest(unittest.TestCase):
+    def setUp(self):
+        self.vm = MiniZamVM()
+        lines = [("", "ACC", "0"), ("", "PUSH", ""), ("", "CONST", "0"), ("", "PRIM", "="),
+                 ("", "BRANCHIFNOT", "L"), ("", "PUSH", ""), ("L", "CONST", "2"), ("", "PRIM", "<"),
+                 ("", "BRANCHIFNOT", "L"), ("", "STOP", "")]
+        self.vm.prog = list(map(LineInstruction.build, lines))
+
+    def test_fuse_branches(self):
+        self.assertEqual(2, self.vm.fuse_branches())
+        self.assertEqual(["ACC", "BNEQI", "PUSH", "CONST", "BGE", "STOP"],
+                         [inst.command for inst in self.vm.prog])
+        self.assertEqual([0, "L"], self.vm.prog[1].args)
+        self.assertEqual("L", self.vm.prog[3].label)
+
+    def test_execute(self):
+        self.vm.fuse_branches()
+        self.vm.pc = 2
+        self.vm.acc = MLValue.from_int(3)
+        MiniZamVM.instructions["BNEQI"].execute(self.vm, [0, "L"])
+        self.assertEqual(3, self.vm.pc)
+        self.assertIs(MLValue.false(), self.vm.acc)
+
+        self.vm.pc = 5
+        self.vm.push(MLValue.from_int(5))
+        self.vm.acc = MLValue.from_int(2)
+        MiniZamVM.instructions["BGE"].execute(self.vm, "L")
+        self.assertEqual(5, self.vm.pc)
+        self.assertIs(MLValue.true(), self.vm.acc)
+        self.assertTrue(self.vm.is_empty())
+
+
 class PushTest(unittest.TestCase):
     def setUp(self):
         self.vm = MiniZamVM()
@@ -302,12 +371,12 @@ class ClosureTest(unittest.TestCase):
 
     def test_execute(self):
         MiniZamVM.instructions["CLOSURE"].execute(self.vm, ["L", 0])
-        self.assertEqual(MLValue.from_closure(3, []), self.vm.acc)
+        self.assertEqual(MLValue.from_closure(3, ()), self.vm.acc)
         self.assertEqual(3, self.vm.stack.size())
 
         self.vm.acc = MLValue.false()
         MiniZamVM.instructions["CLOSURE"].execute(self.vm, ["L", 2])
-        self.assertEqual(MLValue.from_closure(3, [MLValue.false(), MLValue.from_int(1)]), self.vm.acc)
+        self.assertEqual(MLValue.from_closure(3, (MLValue.false(), MLValue.from_int(1))), self.vm.acc)
         self.assertEqual(2, self.vm.stack.size())
 
 
@@ -322,7 +391,7 @@ class ClosureRecTest(unittest.TestCase):
 
     def test_execute(self):
         MiniZamVM.instructions["CLOSUREREC"].execute(self.vm, ["L", 0])
-        self.assertEqual(MLValue.from_closure(3, [3]), self.vm.acc)
+        self.assertEqual(MLValue.from_closure(3, (3,)), self.vm.acc)
         self.assertEqual(4, self.vm.stack.size())
 
         # undo last push by CLOSUREREC
@@ -332,7 +401,7 @@ class ClosureRecTest(unittest.TestCase):
         self.vm.acc = MLValue.false()
         # test with n > 0
         MiniZamVM.instructions["CLOSUREREC"].execute(self.vm, ["L", 2])
-        self.assertEqual(MLValue.from_closure(3, [3, MLValue.false(), MLValue.from_int(1)]),
+        self.assertEqual(MLValue.from_closure(3, (3, MLValue.false(), MLValue.from_int(1))),
                          self.vm.acc)
         self.assertEqual(3, self.vm.stack.size())
 
@@ -370,6 +439,40 @@ class ApplyTest(unittest.TestCase):
         self.assertEqual(1, self.vm.extra_args)
 
 
+class ApplyEntryPointTest(unittest.TestCase):
+    def setUp(self):
+        self.vm = MiniZamVM()
+        lines = [("", "CONST", "1"), ("R", "RESTART", ""), ("L", "GRAB", "1"), ("", "ACC", "0")]
+        self.vm.prog = list(map(LineInstruction.build, lines))
+        self.vm.push(list(map(MLValue.from_int, [1, 2, 5])))
+        self.vm.pc = 1
+
+    def test_exact_arity_skips_grab(self):
+        self.vm.acc = self.vm.make_closure(2, [])
+        self.assertEqual((2, 3), self.vm.acc.entry)
+        MiniZamVM.instructions["APPLY"].execute(self.vm, 2)
+        self.assertEqual(3, self.vm.pc)
+        self.assertEqual(0, self.vm.extra_args)
+
+    def test_partial_application_enters_grab(self):
+        self.vm.acc = self.vm.make_closure(2, [])
+        MiniZamVM.instructions["APPLY"].execute(self.vm, 1)
+        self.assertEqual(2, self.vm.pc)
+        self.assertEqual(0, self.vm.extra_args)
+
+
+class MergeTailCallsTest(unittest.TestCase):
+    def test_merge(self):
+        vm = MiniZamVM()
+        lines = [("", "BRANCHIFNOT", "L"), ("", "APPLY", "1"), ("", "RETURN", "2"),
+                 ("L", "APPLY", "2"), ("M", "RETURN", "1")]
+        vm.prog = list(map(LineInstruction.build, lines))
+        vm.merge_tail_calls()
+        self.assertEqual(["BRANCHIFNOT", "APPTERM", "APPTERM", "RETURN"], [inst.command for inst in vm.prog])
+        self.assertEqual([[1, 3], [2, 3]], [vm.prog[1].args, vm.prog[2].args])
+        self.assertEqual(3, vm.get_position("M"))
+
+
 class ReturnTest(unittest.TestCase):
     stack_init = None
 
@@ -408,6 +511,17 @@ class ReturnTest(unittest.TestCase):
                          self.stack_init[self.n + 3:])
         self.assertEqual(vm.pc, self.stack_init[self.n])
         self.assertEqual(vm.env, self.stack_init[self.n + 1])
+        self.assertEqual(vm.extra_args, self.stack_init[self.n + 2])
+
+    def test_over_application(self):
+        # let g x = x in let f x = ignore (g x); fun y -> x + y in f 1 2 : l'appel de g
+        # dans f ne fait pas oublier à f l'argument qui reste à appliquer
+        vm = MiniZamVM()
+        vm.load_text("\tBRANCH M\nG:\tACC 0\n\tRETURN 1\nF:\tACC 0\n\tPUSH\n\tENVACC 0\n\tAPPLY 1\n"
+                     "\tACC 0\n\tCLOSURE H,1\n\tRETURN 1\nH:\tACC 0\n\tPUSH\n\tENVACC 0\n\tPRIM +\n"
+                     "\tRETURN 1\nM:\tCLOSURE G,0\n\tCLOSURE F,1\n\tPUSH\n\tCONST 2\n\tPUSH\n\tCONST 1\n"
+                     "\tPUSH\n\tACC 2\n\tAPPLY 2\n\tSTOP\n")
+        self.assertEqual(MLValue.from_int(3), vm.run().acc)
 
     def test_extra_args_not_equal_0(self):
         vm = copy.copy(self.vm)
@@ -492,7 +606,7 @@ class GrabTest(unittest.TestCase):
         self.assertEqual(self.vm.env, self.stack_init[self.m + 2])
         self.assertEqual(self.vm.extra_args, self.stack_init[self.m + 3])
         self.assertEqual(self.vm.acc,
-                         MLValue.from_closure(self.c - 2, [self.e] + self.stack_init[0:self.m + 1]))
+                         MLValue.from_closure(self.c - 2, (self.e,) + tuple(self.stack_init[0:self.m + 1])))
 
 
 class MakeBlockTest(unittest.TestCase):
@@ -514,6 +628,41 @@ class MakeBlockTest(unittest.TestCase):
         self.assertEqual(self.vm.acc.value, self.block)
 
 
+class PairTest(unittest.TestCase):
+    def test_execute(self):
+        # MAKEBLOCK 2 construit une Pair, lue et modifiée sans passer par une liste
+        vm = MiniZamVM()
+        vm.push(MLValue.from_int(2))
+        vm.acc = MLValue.from_int(1)
+        MiniZamVM.instructions["MAKEBLOCK"].execute(vm, 2)
+        pair = vm.acc
+        self.assertIs(Pair, type(pair))
+        self.assertEqual([MLValue.from_int(1), MLValue.from_int(2)], pair.value)
+        self.assertEqual("MLValue(Value: [MLValue(Value: 1), MLValue(Value: 2)])", str(pair))
+
+        vm.push(MLValue.from_int(5))
+        MiniZamVM.instructions["SETFIELD"].execute(vm, 1)
+        MiniZamVM.instructions["GETFIELD"].execute(vm, 1)
+        self.assertEqual(5, vm.acc.value)
+        vm.acc = pair
+        MiniZamVM.instructions["VECTLENGTH"].execute(vm, None)
+        self.assertEqual(2, vm.acc.value)
+
+    def test_eq(self):
+        one, two = MLValue.from_int(1), MLValue.from_int(2)
+        pair = MLValue.pair(one, MLValue.pair(two, MLValue.from_int(0)))
+        self.assertIs(MLValue.true(), pair == MLValue.pair(one, MLValue.pair(two, MLValue.from_int(0))))
+        self.assertIs(MLValue.true(), pair == MLValue.from_block([one, MLValue.from_block([two, MLValue.from_int(0)])]))
+        self.assertIs(MLValue.false(), pair == MLValue.pair(one, two))
+        self.assertIs(MLValue.false(), pair == MLValue.false())
+
+    def test_slots(self):
+        # les champs sont dans les slots de Pair, sans dictionnaire d'attributs
+        pair = MLValue.pair(MLValue.from_int(1), MLValue.from_int(2))
+        self.assertFalse(hasattr(pair, "__dict__"))
+        self.assertFalse(hasattr(MLValue.from_int(1), "__dict__"))
+
+
 class GetFieldTest(unittest.TestCase):
     def setUp(self):
         self.vm = MiniZamVM()
@@ -594,6 +743,31 @@ class SetVectItemTest(unittest.TestCase):
         self.assertEqual(self.vm.stack.items, stack_res)
 
 
+class RaiseTest(unittest.TestCase):
+    def setUp(self):
+        self.vm = MiniZamVM()
+        lines = [("", "PUSHTRAP", "L"), ("", "CONST", "1"), ("", "RAISE", ""), ("L", "STOP", "")]
+        self.vm.prog = list(map(LineInstruction.build, lines))
+        self.vm.push(MLValue.from_int(7))
+        self.vm.start()
+
+    def test_execute(self):
+        self.vm.extra_args = 2
+        self.vm.step(3)
+        self.assertEqual(3, self.vm.pc)
+        self.assertEqual(MLValue.from_int(1), self.vm.acc)
+        self.assertIsNone(self.vm.trap_sp)
+        self.assertEqual(2, self.vm.extra_args)
+        self.assertEqual([MLValue.from_int(7)], self.vm.stack.items)
+
+    def test_execute_above_trap(self):
+        self.vm.prog.insert(1, LineInstruction.build(("", "PUSH", "")))
+        self.vm.invalidate_caches()
+        self.vm.step(4)
+        self.assertEqual(4, self.vm.pc)
+        self.assertEqual([MLValue.from_int(7)], self.vm.stack.items)
+
+
 class AssignTest(unittest.TestCase):
     def setUp(self):
         self.vm = MiniZamVM()
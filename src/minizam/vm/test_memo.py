@@ -0,0 +1,148 @@
+import unittest
+from .vm import MiniZamVM, LineInstruction
+from .mlvalue import MLValue
+from .memo import pure_closures
+from .testing import load, load_optimized, load_text, replace_const
+
+# let f x y = x in (f (1 = 1) 3, f 1 3) : true et 1 ne partagent pas une entrée de la table
+MIXED = """\tBRANCH M
+\tRESTART
+F:\tGRAB 1
+\tACC 0
+\tRETURN 2
+M:\tCLOSURE F,0
+\tPUSH
+\tCONST 3
+\tPUSH
+\tCONST 1
+\tPUSH
+\tACC 2
+\tAPPLY 2
+\tPUSH
+\tCONST 3
+\tPUSH
+\tCONST 1
+\tPUSH
+\tCONST 1
+\tPRIM =
+\tPUSH
+\tACC 3
+\tAPPLY 2
+\tMAKEBLOCK 2
+\tSTOP
+"""
+
+# let f y x = x + y in (f 1 5, f 2 5) : deux fermetures du même code, qui capturent 1 et 2
+CAPTURED = """\tBRANCH M
+L1:\tENVACC 0
+\tPUSH
+\tACC 1
+\tPRIM +
+\tRETURN 1
+M:\tCONST 2
+\tCLOSURE L1,1
+\tPUSH
+\tCONST 1
+\tCLOSURE L1,1
+\tPUSH
+\tCONST 5
+\tPUSH
+\tACC 2
+\tAPPLY 1
+\tPUSH
+\tCONST 5
+\tPUSH
+\tACC 2
+\tAPPLY 1
+\tMAKEBLOCK 2
+\tSTOP
+"""
+
+FIBO = "rec_funs/fibo.txt"
+
+
+def fibo(n, max_entries=4096):
+    vm = load_optimized(FIBO)
+    replace_const(vm, 8, n)
+    memo = vm.enable_memoization(max_entries)
+    return vm.run(), memo
+
+
+class PureClosuresTest(unittest.TestCase):
+    def build(self, body):
+        lines = [("", "BRANCH", "M"), ("", "RESTART", ""), ("F", "GRAB", "1")] + body + \
+                [("", "RETURN", "2"), ("M", "CLOSURE", "F,0"), ("", "STOP", "")]
+        return list(map(LineInstruction.build, lines))
+
+    def test_pure(self):
+        prog = self.build([("", "ACC", "1"), ("", "PUSH", ""), ("", "ACC", "1"), ("", "PRIM", "+")])
+        vm = MiniZamVM()
+        vm.prog = prog
+        self.assertEqual({2: 2}, pure_closures(prog, vm.get_position))
+
+    def test_impure(self):
+        for body in ([("", "CONST", "65"), ("", "PRIM", "print")],
+                     [("", "ENVACC", "1")],
+                     [("", "ACC", "0"), ("", "APPLY", "1")],
+                     [("", "ACC", "0"), ("", "PUSH", ""), ("", "ACC", "2"), ("", "SETVECTITEM", "")],
+                     [("", "BNEQI", "0,E"), ("", "CONST", "1"), ("E", "RAISE", "")],
+                     # appels réécrits par enable_tracing et enable_allocation_profiling
+                     [("", "ACC", "1"), ("", "PUSH", ""), ("", "ACC", "1"), ("", "TRACEAPPTERM", "1,3")],
+                     [("", "ACC", "0"), ("", "PROFAPPLY", "1")]):
+            prog = self.build(body)
+            vm = MiniZamVM()
+            vm.prog = prog
+            self.assertEqual({}, pure_closures(prog, vm.get_position), body)
+
+
+class MemoTest(unittest.TestCase):
+    def test_fibo(self):
+        result, memo = fibo(25)
+        self.assertEqual(MLValue.from_int(75025), result.acc)
+        stats = memo.stats()
+        self.assertEqual(1, stats["functions"])
+        self.assertEqual(26, stats["entries"])
+        self.assertEqual(23, stats["hits"])
+        self.assertTrue(0 < stats["hit_rate"] < 1)
+
+    def test_lru(self):
+        result, memo = fibo(12, max_entries=2)
+        self.assertEqual(MLValue.from_int(144), result.acc)
+        self.assertEqual(2, len(memo.table))
+        self.assertEqual(memo.misses - 2, memo.evictions)
+
+    def test_booleans(self):
+        for memoized in (False, True):
+            vm = load_text(MIXED)
+            if memoized:
+                memo = vm.enable_memoization()
+            first, second = vm.run().acc.value
+            self.assertIs(MLValue.true(), first)
+            self.assertEqual(1, second.value)
+            self.assertIsNot(MLValue.true(), second)
+        self.assertEqual((1, 1), (memo.stats()["functions"], memo.stats()["entries"]))
+
+    def test_captured_environment(self):
+        for memoized in (False, True):
+            vm = load_text(CAPTURED)
+            if memoized:
+                memo = vm.enable_memoization()
+            self.assertEqual([6, 7], [value.value for value in vm.run().acc.value])
+        self.assertEqual({}, memo.pure)
+
+    def test_after_other_tiers(self):
+        vm = load_optimized(FIBO)
+        vm.enable_tracing()
+        vm.enable_allocation_profiling()
+        memo = vm.enable_memoization()
+        self.assertEqual(MLValue.from_int(21), vm.run().acc)
+        self.assertEqual(1, memo.stats()["functions"])
+        self.assertGreater(memo.stats()["hits"], 0)
+
+    def test_return_to_caller(self):
+        vm = load(FIBO)
+        vm.enable_memoization()
+        self.assertEqual("MEMOSTORE", vm.prog[-1].command)
+        self.assertEqual(MLValue.from_int(21), vm.run().acc)
+        self.assertTrue(vm.stack.is_empty())
+        self.assertEqual(0, vm.extra_args)
@@ -0,0 +1,98 @@
+import asyncio
+import os
+import tempfile
+import unittest
+import urllib.request
+from .governor import ResourceLimits
+from .metrics import MetricsRegistry
+from .scheduler import Scheduler
+from .testing import load
+from .vm import MiniZamVM, RunResult
+
+
+def measured(name, registry):
+    vm = load(name)
+    vm.enable_metrics(registry)
+    return vm
+
+
+class MetricsRegistryTest(unittest.TestCase):
+    def test_render(self):
+        registry = MetricsRegistry()
+        runs = registry.counter("runs_total", "Runs.", labels=("status",))
+        runs.inc(labels=("stopped",))
+        runs.inc(2, labels=("a\"b",))
+        registry.gauge("depth", "Depth.").set_max(3)
+        registry.gauge("depth", "Depth.").set_max(2)
+        histogram = registry.histogram("seconds", "Seconds.", buckets=(0.1, 1))
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value)
+        self.assertEqual("""# HELP runs_total Runs.
+# TYPE runs_total counter
+runs_total{status="a\\"b"} 2
+runs_total{status="stopped"} 1
+# HELP depth Depth.
+# TYPE depth gauge
+depth 3
+# HELP seconds Seconds.
+# TYPE seconds histogram
+seconds_bucket{le="0.1"} 1
+seconds_bucket{le="1"} 2
+seconds_bucket{le="+Inf"} 3
+seconds_sum 5.55
+seconds_count 3
+""", registry.render())
+
+        with self.assertRaises(ValueError):
+            runs.inc(-1)
+        with self.assertRaises(ValueError):
+            registry.gauge("runs_total", "Runs.")
+
+    def test_write_and_serve(self):
+        registry = MetricsRegistry()
+        registry.counter("c_total", "C.").inc()
+        path = os.path.join(tempfile.mkdtemp(), "minizam.prom")
+        registry.write(path)
+        with open(path) as f:
+            self.assertEqual(registry.render(), f.read())
+
+        port = registry.serve()
+        try:
+            with urllib.request.urlopen("http://127.0.0.1:%d/metrics" % port) as response:
+                self.assertEqual(registry.render(), response.read().decode("utf-8"))
+        finally:
+            registry.close()
+
+
+class VMMetricsTest(unittest.TestCase):
+    def test_run(self):
+        registry = MetricsRegistry()
+        vm = measured("exceptions/exn.txt", registry)
+        result = vm.run(ResourceLimits())
+        metrics = vm.metrics
+        self.assertEqual(result.instructions, metrics.instructions.get())
+        self.assertEqual((2, 1), (metrics.calls.get(), metrics.raises.get()))
+        self.assertEqual(vm.heap_words, metrics.allocated.get())
+        self.assertGreater(metrics.stack_depth.get(), 0)
+        self.assertEqual(1, metrics.runs.get((RunResult.STOPPED,)))
+        self.assertEqual(1, metrics.duration.get()[0])
+        # les autres machines exécutent les instructions sans les compter
+        self.assertIsNot(vm.instructions, MiniZamVM.instructions)
+
+    def test_scheduler(self):
+        registry = MetricsRegistry()
+        scheduler = Scheduler(quantum=10, metrics=registry)
+        vms = [load(name) for name in ("exceptions/exn.txt", "exceptions/exn_uncaught.txt")]
+
+        async def main():
+            return await asyncio.gather(*(scheduler.run(vm) for vm in vms))
+
+        results = asyncio.run(main())
+        runs = registry.metrics["minizam_runs_total"]
+        self.assertEqual([RunResult.STOPPED, RunResult.UNCAUGHT], [result.status for result in results])
+        self.assertEqual((1, 1), (runs.get((RunResult.STOPPED,)), runs.get((RunResult.UNCAUGHT,))))
+        self.assertEqual(2, registry.metrics["minizam_raises_total"].get())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+from .vm import MiniZamVM, LineInstruction
+from .mlvalue import MLValue
+from .memo import pure_closures
+from . import snapshot
+from .testing import load_optimized as load
+
+
+class QuickeningTest(unittest.TestCase):
+    def test_facto(self):
+        plain = load("appterm/facto_tailrec.txt")
+        vm = load("appterm/facto_tailrec.txt")
+        quickener = vm.enable_quickening()
+        self.assertEqual(plain.run().acc, vm.run().acc)
+        stats = quickener.stats()
+        self.assertGreater(stats["quickened"], 0)
+        self.assertEqual(0, stats["deoptimized"])
+        self.assertIn("PRIM_MUL_INT", stats["variants"])
+        self.assertNotIn("QPRIM", [inst.command for inst in vm.prog])
+
+    def step(self, vm, acc, stack):
+        vm.pc = 0
+        vm.acc = acc
+        vm.stack.items = stack
+        vm.running = True
+        vm.step(1)
+
+    def test_deoptimize(self):
+        vm = MiniZamVM()
+        vm.prog = [LineInstruction(None, "PRIM", "=")]
+        quickener = vm.enable_quickening()
+
+        self.step(vm, MLValue.from_int(3), [MLValue.from_int(3)])
+        self.assertEqual("PRIM_EQ_INT", vm.prog[0].command)
+        self.assertIs(MLValue.true(), vm.acc)
+
+        self.step(vm, MLValue.from_block([MLValue.from_int(1)]), [MLValue.from_block([MLValue.from_int(2)])])
+        self.assertEqual("PRIM", vm.prog[0].command)
+        self.assertIs(MLValue.false(), vm.acc)
+        self.assertTrue(vm.stack.is_empty())
+        self.assertEqual({"quickened": 1, "generic": 0, "deoptimized": 1, "variants": {"PRIM_EQ_INT": 1}},
+                         quickener.stats())
+
+    def test_division_by_zero(self):
+        vm = MiniZamVM()
+        vm.prog = [LineInstruction(None, "PRIM", "/")]
+        quickener = vm.enable_quickening()
+        with self.assertRaises(ZeroDivisionError):
+            self.step(vm, MLValue.from_int(3), [MLValue.from_int(0)])
+        self.assertEqual("PRIM", vm.prog[0].command)
+        self.assertEqual(1, quickener.stats()["generic"])
+
+    def test_analyses(self):
+        # les analyses du programme voient les commandes génériques
+        vm = load("rec_funs/fibo.txt")
+        pure = pure_closures(vm.prog, vm.get_position)
+        vm.enable_quickening()
+        vm.run()
+        self.assertEqual(pure, pure_closures(vm.prog, vm.get_position))
+
+        vm = load("appterm/fun_appterm.txt")
+        vm.enable_quickening()
+        vm.enable_tracing(threshold=2)
+        self.assertEqual(1, vm.run().acc.value)
+        self.assertEqual(1, vm.tracer.stats()["traces"])
+
+    def test_snapshot(self):
+        vm = load("appterm/facto_tailrec.txt")
+        vm.enable_quickening()
+        vm.run(quantum=50)
+        restored = snapshot.loads(snapshot.dumps(vm))
+        self.assertEqual(load("appterm/facto_tailrec.txt").run().acc, restored.run().acc)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import signal
+import tempfile
+import unittest
+from .sampling import SamplingProfiler, function_owners
+from .testing import load_text as load
+
+# let g x = x + 1 in let f x = 2 * g x in f 3
+CALLS = """\tBRANCH L3
+G:\tCONST 1
+\tPUSH
+\tACC 1
+\tPRIM +
+\tRETURN 1
+F:\tACC 0
+\tPUSH
+\tENVACC 0
+\tAPPLY 1
+\tPUSH
+\tCONST 2
+\tPRIM *
+\tRETURN 1
+L3:\tCLOSURE G,0
+\tPUSH
+\tACC 0
+\tCLOSURE F,1
+\tPUSH
+\tCONST 3
+\tPUSH
+\tACC 1
+\tAPPLY 1
+\tSTOP
+"""
+
+# let rec loop n = if n = 0 then 0 else loop (n - 1) in loop 20000
+LOOP = """\tBRANCH L2
+L1:\tACC 0
+\tBRANCHIFNOT L3
+\tCONST 1
+\tPUSH
+\tACC 1
+\tPRIM -
+\tPUSH
+\tOFFSETCLOSURE 0
+\tAPPTERM 1,2
+L3:\tCONST 0
+\tRETURN 1
+L2:\tCLOSUREREC L1,0
+\tCONST 20000
+\tPUSH
+\tACC 1
+\tAPPLY 1
+\tSTOP
+"""
+
+
+class SamplingProfilerTest(unittest.TestCase):
+    def test_owners(self):
+        vm = load(CALLS)
+        owners = function_owners(vm.prog)
+        self.assertEqual(["main", "G", "G", "F", "main"], [owners[i] for i in (0, 1, 5, 6, 14)])
+
+    def test_sample(self):
+        vm = load(CALLS)
+        profiler = SamplingProfiler(vm)
+        # dans g, appelée par f, appelée par le programme principal
+        vm.run_until("G")
+        vm.step(3)
+        profiler.sample()
+        profiler.sample()
+        self.assertEqual({"main;F;G": 2}, profiler.collapsed())
+        self.assertEqual({"main": (0, 2), "F": (0, 2), "G": (2, 2)}, profiler.functions())
+        self.assertEqual(8, vm.run().acc.value)
+
+        path = os.path.join(tempfile.mkdtemp(), "stacks.folded")
+        profiler.write_collapsed(path)
+        with open(path) as f:
+            self.assertEqual("main;F;G 2\n", f.read())
+
+    def test_truncated(self):
+        vm = load(CALLS)
+        profiler = SamplingProfiler(vm, max_depth=1)
+        vm.run_until("G")
+        profiler.sample()
+        self.assertEqual({"...;F;G": 1}, profiler.collapsed())
+
+    def test_timer(self):
+        vm = load(LOOP)
+        previous = signal.getsignal(signal.SIGPROF)
+        with SamplingProfiler(vm, hz=1000) as profiler:
+            vm.run()
+        self.assertEqual(0, vm.acc.value)
+        self.assertIs(previous, signal.getsignal(signal.SIGPROF))
+        self.assertGreater(sum(profiler.samples.values()), 0)
+        self.assertIn("L1", profiler.functions())
+
+
+if __name__ == '__main__':
+    unittest.main()
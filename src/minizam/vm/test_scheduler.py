@@ -0,0 +1,68 @@
+import asyncio
+import unittest
+from .vm import MiniZamVM, LineInstruction, RunResult
+from .governor import ResourceLimits
+from .mlvalue import MLValue
+from .scheduler import Scheduler
+
+COUNTDOWN = [("", "CONST", "{n}"), ("", "PUSH", ""),
+             ("L", "ACC", "0"), ("", "PUSH", ""), ("", "CONST", "0"), ("", "PRIM", "="),
+             ("", "BRANCHIFNOT", "M"), ("", "STOP", ""),
+             ("M", "ACC", "0"), ("", "PUSH", ""), ("", "CONST", "-1"), ("", "PRIM", "+"),
+             ("", "ASSIGN", "0"), ("", "BRANCH", "L")]
+
+
+def countdown(n):
+    return list(map(LineInstruction.build, [(l, c, a.format(n=n)) for l, c, a in COUNTDOWN]))
+
+
+class TimeSliceTest(unittest.TestCase):
+    def test_quantum(self):
+        vm = MiniZamVM()
+        vm.prog = countdown(10)
+        result = vm.run(quantum=5)
+        self.assertEqual(RunResult.RUNNING, result.status)
+        self.assertEqual(5, result.instructions)
+        self.assertEqual(5, vm.pc)
+        while result.status == RunResult.RUNNING:
+            result = vm.resume(7)
+        self.assertEqual(RunResult.STOPPED, result.status)
+        self.assertIs(MLValue.true(), result.acc)
+
+
+class SchedulerTest(unittest.TestCase):
+    def test_run_all(self):
+        scheduler = Scheduler(quantum=10)
+        progs = [countdown(n) for n in (50, 1, 20)] + [[LineInstruction(None, "BRANCH", "L")]]
+        progs[-1][0].label = "L"
+
+        async def main():
+            return await scheduler.run_all(progs[:3]), await scheduler.submit(
+                progs[3], ResourceLimits(max_instructions=100))
+
+        results, looping = asyncio.run(main())
+        self.assertEqual([RunResult.STOPPED] * 3, [result.status for result in results])
+        self.assertEqual("instructions", looping.exhausted.resource)
+        self.assertEqual(4, scheduler.completed)
+
+    def test_interleaving(self):
+        scheduler = Scheduler(quantum=3, max_running=2)
+        order = []
+
+        class TracingVM(MiniZamVM):
+            def resume(self, quantum=None):
+                order.append(self.name)
+                return super().resume(quantum)
+
+        async def main():
+            vms = []
+            for name in "abc":
+                vm = TracingVM()
+                vm.name = name
+                vm.prog = countdown(3)
+                vms.append(scheduler.run(vm))
+            return await asyncio.gather(*vms)
+
+        asyncio.run(main())
+        self.assertEqual(["a", "b", "a", "b"], order[:4])
+        self.assertIn("c", order)
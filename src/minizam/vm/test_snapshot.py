@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+from .vm import MiniZamVM, LineInstruction, RunResult
+from .mlvalue import MLValue
+from . import snapshot
+
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.vm = MiniZamVM()
+        lines = [("", "CONST", "1"), ("L", "GRAB", "1"), ("", "BNEQI", "0,L"), ("", "STOP", "")]
+        self.vm.prog = list(map(LineInstruction.build, lines))
+
+    def test_sharing_and_cycles(self):
+        shared = MLValue.from_block([MLValue.from_int(2 ** 80), MLValue.true()])
+        cyclic = MLValue.from_block([MLValue.unit()])
+        cyclic.value.append(cyclic)
+        closure = self.vm.make_closure(1, (1, shared))
+        self.vm.push([shared, closure, 12, (closure.value[1], cyclic), None])
+        self.vm.acc = shared
+        self.vm.env = closure.value[1]
+        self.vm.pc = 2
+
+        vm = snapshot.loads(snapshot.dumps(self.vm))
+        items = vm.stack.items
+        self.assertIs(items[0], vm.acc)
+        self.assertIs(items[1].value[1], vm.env)
+        self.assertIs(items[3][0], vm.env)
+        self.assertIs(vm.env[1], items[0])
+        self.assertEqual(2 ** 80, items[0].value[0].value)
+        self.assertIs(MLValue.true(), items[0].value[1])
+        self.assertIs(items[3][1], items[3][1].value[1])
+        self.assertEqual((2, 2), items[1].entry)
+        self.assertEqual([12, None], items[2:4:2] + [items[4]])
+        self.assertEqual(2, vm.pc)
+        self.assertEqual(["CONST", "GRAB", "BNEQI", "STOP"], [inst.command for inst in vm.prog])
+        self.assertEqual([0, "L"], vm.prog[2].args)
+
+    def test_checkpoint_and_resume(self):
+        vm = MiniZamVM()
+        lines = [("", "CONST", "3"), ("", "PUSH", ""), ("", "CONST", "4"), ("C", "PRIM", "+"),
+                 ("", "STOP", "")]
+        vm.prog = list(map(LineInstruction.build, lines))
+        self.assertTrue(vm.run_until("C"))
+
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            snapshot.save(vm, path)
+            restored = snapshot.load(path)
+        finally:
+            os.remove(path)
+        result = restored.run()
+        self.assertEqual(RunResult.STOPPED, result.status)
+        self.assertEqual(MLValue.from_int(7), result.acc)
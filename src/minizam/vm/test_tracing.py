@@ -0,0 +1,59 @@
+import unittest
+from .governor import ResourceLimits
+from .testing import load_optimized, replace_const
+from .vm import MiniZamVM, LineInstruction, RunResult
+
+
+def load(name, old, new, tracing=True, **options):
+    vm = load_optimized(name)
+    replace_const(vm, old, new)
+    if tracing:
+        vm.enable_tracing(**options)
+    return vm
+
+
+class TracingTest(unittest.TestCase):
+    def test_countdown(self):
+        vm = load("appterm/fun_appterm.txt", 234, 5000)
+        self.assertEqual(1, vm.run().acc.value)
+        stats = vm.tracer.stats()
+        self.assertEqual(1, stats["traces"])
+        # la trace rend la main à la fin de chacune des tranches de run
+        self.assertEqual(5, stats["entries"])
+        self.assertEqual(1, stats["exits"])
+        self.assertTrue(vm.stack.is_empty())
+
+    def test_governor(self):
+        plain = load("appterm/fun_appterm.txt", 234, 5000, tracing=False).run(ResourceLimits())
+        vm = load("appterm/fun_appterm.txt", 234, 5000)
+        self.assertEqual(plain.instructions, vm.run(ResourceLimits()).instructions)
+
+        vm = load("appterm/fun_appterm.txt", 234, 5000)
+        result = vm.run(ResourceLimits(max_instructions=20001))
+        self.assertEqual((RunResult.EXHAUSTED, 20001), (result.status, result.instructions))
+        self.assertGreater(vm.tracer.stats()["entries"], 0)
+
+    def test_fuel_and_guard_exit(self):
+        vm = load("appterm/facto_tailrec.txt", 20, 30, threshold=2, fuel=4)
+        plain = load("appterm/facto_tailrec.txt", 20, 30, tracing=False)
+        self.assertEqual(plain.run().acc.value, vm.run().acc.value)
+        stats = vm.tracer.stats()
+        self.assertEqual(1, stats["traces"])
+        self.assertEqual(6, stats["entries"])
+        self.assertEqual(1, stats["exits"])
+
+    def test_abort(self):
+        # la boucle passe un bloc en argument : elle n'est pas compilée
+        lines = [("", "BRANCH", "M"), ("F", "ACC", "0"), ("", "GETFIELD", "0"), ("", "BEQI", "0,E"),
+                 ("", "CONST", "0"), ("", "PUSH", ""), ("", "ACC", "1"), ("", "GETFIELD", "0"),
+                 ("", "PUSH", ""), ("", "CONST", "-1"), ("", "PRIM", "+"), ("", "MAKEBLOCK", "2"),
+                 ("", "PUSH", ""), ("", "OFFSETCLOSURE", "0"), ("", "APPTERM", "1,2"),
+                 ("E", "ACC", "0"), ("", "RETURN", "1"),
+                 ("M", "CLOSUREREC", "F,0"), ("", "CONST", "0"), ("", "PUSH", ""), ("", "CONST", "20"),
+                 ("", "MAKEBLOCK", "2"), ("", "PUSH", ""), ("", "ACC", "1"), ("", "APPLY", "1"), ("", "STOP", "")]
+        vm = MiniZamVM()
+        vm.prog = list(map(LineInstruction.build, lines))
+        tracer = vm.enable_tracing(threshold=2)
+        self.assertEqual([0, 0], [v.value for v in vm.run().acc.value])
+        self.assertEqual({"traces": 0, "entries": 0, "exits": 0, "aborted": tracer.MAX_ATTEMPTS},
+                         tracer.stats())
@@ -0,0 +1,90 @@
+import os
+import socket
+import tempfile
+import time
+import unittest
+from . import client
+from .zygote import ZygoteServer
+from .testing import program
+
+# sortie de liste_iter.txt, suivie de la ligne du résultat comme avec ocamlzam
+BONJOUR = "BONJOUR\nacc =  MLValue(Value: 0)\n"
+
+
+@unittest.skipUnless(hasattr(os, "fork") and hasattr(socket, "send_fds"), "requires fork and send_fds")
+class ZygoteTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "zygote.sock")
+        self.metrics = os.path.join(self.directory.name, "zygote.prom")
+        server = ZygoteServer(self.path, metrics=self.metrics)
+        server.listen()
+        self.pid = os.fork()
+        if self.pid == 0:
+            try:
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        server.sock.close()
+
+    def tearDown(self):
+        try:
+            client.stop(self.path)
+        finally:
+            os.waitpid(self.pid, 0)
+            self.directory.cleanup()
+
+    def run_program(self, name, options=()):
+        """
+        :return: le code de sortie et les textes écrits sur la sortie et l'erreur
+        """
+
+        with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+            code = client.run(program(name), options, self.path, (0, out.fileno(), err.fileno()))
+            out.seek(0)
+            err.seek(0)
+            return code, out.read().decode("utf-8"), err.read().decode("utf-8")
+
+    def test_run(self):
+        self.assertEqual((0, BONJOUR, ""), self.run_program("block_values/liste_iter.txt"))
+        self.assertEqual((0, BONJOUR, ""), self.run_program("block_values/liste_iter.txt", ["-o", "-m", "-t"]))
+        # le cache du serveur garde le programme intact entre deux exécutions
+        self.assertEqual((0, BONJOUR, ""), self.run_program("block_values/liste_iter.txt", ["-o", "-m", "-t"]))
+        self.assertEqual((0, "acc =  MLValue(Value: 21)\n", ""), self.run_program("rec_funs/fibo.txt"))
+
+    def test_metrics(self):
+        for _ in range(2):
+            self.assertEqual((0, BONJOUR, ""), self.run_program("block_values/liste_iter.txt"))
+        with open(self.metrics) as f:
+            lines = f.read().splitlines()
+        for line in ("minizam_loader_cache_hits_total 1", "minizam_loader_cache_misses_total 1",
+                     "minizam_zygote_requests_total 2"):
+            self.assertIn(line, lines)
+
+    def test_errors(self):
+        code, out, err = self.run_program("missing.txt")
+        self.assertEqual(1, code)
+        self.assertIn("FileNotFoundError", err)
+
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+            f.write("\tCONST 0\n\tPUSH\n\tCONST 1\n\tPRIM /\n\tSTOP\n")
+        try:
+            with tempfile.TemporaryFile() as err:
+                code = client.run(f.name, (), self.path, (0, 1, err.fileno()))
+                err.seek(0)
+                self.assertIn("ZeroDivisionError", err.read().decode("utf-8"))
+            self.assertEqual(1, code)
+            # un fichier modifié est relu
+            time.sleep(0.01)
+            with open(f.name, "w") as g:
+                g.write("\tCONST 72\n\tPRIM print\n\tSTOP\n")
+            with tempfile.TemporaryFile() as out:
+                self.assertEqual(0, client.run(f.name, (), self.path, (0, out.fileno(), 2)))
+                out.seek(0)
+                self.assertEqual(b"H\nacc =  ()\n", out.read())
+        finally:
+            os.unlink(f.name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+"""
+Outils communs aux tests unitaires : chemin des programmes du dossier tests/ du dépôt
+et chargement d'une machine
+"""
+
+import os
+
+from .vm import MiniZamVM
+
+TESTS = os.path.join(os.path.dirname(__file__), "..", "..", "..", "tests")
+
+
+def program(name):
+    """
+    :param name: chemin d'un programme relatif à tests/, par exemple "rec_funs/fibo.txt"
+    :return: le chemin du fichier
+    """
+
+    return os.path.join(TESTS, name)
+
+
+def load(name):
+    """
+    :return: une machine qui a chargé le programme name de tests/
+    """
+
+    vm = MiniZamVM()
+    vm.load_file(program(name))
+    return vm
+
+
+def load_optimized(name):
+    """
+    :return: une machine qui a chargé et optimisé le programme name de tests/
+    """
+
+    vm = MiniZamVM()
+    vm.load_file_optimized(program(name))
+    return vm
+
+
+def load_text(text):
+    """
+    :return: une machine qui a chargé le programme text
+    """
+
+    vm = MiniZamVM()
+    vm.load_text(text)
+    return vm
+
+
+def replace_const(vm, old, new):
+    """
+    Remplace les CONST old du programme chargé par CONST new, pour changer la taille
+    du problème d'un programme de tests/
+    """
+
+    for inst in vm.prog:
+        if inst.command == "CONST" and inst.args == old:
+            inst.args = new
@@ -0,0 +1,306 @@
+from .instructions import GENERIC_COMMANDS, _is_int
+from .mlvalue import MLValue
+
+# opérations de PRIM compilées dans les traces : (expression Python, genre du résultat)
+# les entiers et les booléens de la machine sont représentés par des int et des bool Python
+ARITHMETIC = {"+": "%s + %s", "-": "%s - %s", "*": "%s * %s", "/": "int(%s / %s)"}
+COMPARISONS = {"=": "%s == %s", "<>": "%s != %s", "<": "%s < %s", "<=": "%s <= %s",
+               ">": "%s > %s", ">=": "%s >= %s"}
+LOGICAL = {"and": "%s and %s", "or": "%s or %s"}
+
+# branchement fusionné -> comparaison Python qui décide du saut, voir BranchCmp
+FUSED_TESTS = {"BEQ": "==", "BNEQ": "!=", "BLT": "<", "BLE": "<=", "BGT": ">", "BGE": ">="}
+
+TRACED = {"ACC", "PUSH", "POP", "CONST", "PRIM", "BRANCH", "BRANCHIFNOT", "OFFSETCLOSURE"} \
+    | set(FUSED_TESTS) | {name + "I" for name in FUSED_TESTS}
+
+INT = "int"
+BOOL = "bool"
+CLOSURE = "closure"
+
+
+class TraceAborted(Exception):
+    """
+    La trace enregistrée contient une opération que le compilateur ne sait pas traduire
+    """
+
+
+class Tracer:
+    """
+    Compilateur de boucles : une fonction qui s'appelle elle-même en position terminale
+    (OFFSETCLOSURE; APPTERM) avec ses arguments entiers est tracée après threshold tours.
+    Le tour suivant est exécuté instruction par instruction en enregistrant le chemin suivi,
+    puis compilé en une boucle Python qui ne rend la main à l'interpréteur que lorsqu'un
+    branchement ne suit plus ce chemin, ou après fuel tours. Les instructions exécutées
+    par l'enregistrement et par les traces sont reportées dans vm.traced et ne dépassent
+    pas vm.trace_budget : step, le contrôle des ressources et les métriques les comptent.
+    """
+
+    MAX_LENGTH = 500  # nombre maximal d'instructions d'une trace
+    MAX_ATTEMPTS = 3  # enregistrements infructueux avant d'abandonner une boucle
+
+    def __init__(self, threshold=50, fuel=10000):
+        """
+        :param threshold: nombre d'appels terminaux d'une fonction à elle-même avant de la tracer
+        :param fuel: nombre maximal de tours exécutés par une trace avant de rendre la main
+        """
+
+        self.threshold = threshold
+        self.fuel = fuel
+        self.counts = {}  # début du corps -> nombre d'appels terminaux
+        self.traces = {}  # début du corps -> boucle compilée
+        self.failures = {}
+        self.entries = 0
+        self.exits = 0
+        self.aborted = 0
+
+    def loop(self, vm, n):
+        """
+        Appelé après un appel terminal de la fonction à elle-même avec n arguments,
+        vm.pc désignant le début de son corps
+        """
+
+        pc = vm.pc
+        trace = self.traces.get(pc)
+        if trace is not None:
+            executed = trace(vm)
+            if executed is not None:
+                self.entries += 1
+                vm.traced = executed
+            return
+        if self.failures.get(pc, 0) >= self.MAX_ATTEMPTS:
+            return
+        count = self.counts.get(pc, 0) + 1
+        self.counts[pc] = count
+        if count >= self.threshold:
+            self.counts[pc] = 0
+            self.record(vm, pc, n)
+
+    def record(self, vm, body, n):
+        """
+        Exécute un tour de la boucle en enregistrant les instructions et les sauts effectués,
+        puis compile la trace
+        """
+
+        path = []
+        prog = vm.prog
+        limit = min(self.MAX_LENGTH, vm.trace_budget)
+        while vm.running and len(path) < limit:
+            pc = vm.pc
+            inst = prog[pc]
+            if inst.command == "TRACEAPPTERM" and pc > 0 and prog[pc - 1].command == "OFFSETCLOSURE":
+                try:
+                    self.traces[body] = compile_trace(path, inst.args, body, n, self, vm.get_position)
+                    vm.traced = len(path)
+                    return
+                except TraceAborted:
+                    break
+            if GENERIC_COMMANDS.get(inst.command, inst.command) not in TRACED:
+                break
+            vm.increment_pc()
+            vm.instructions[inst.command].execute(vm, inst.args)
+            path.append((pc, inst, vm.pc))
+        vm.traced = len(path)
+        if len(path) == limit < self.MAX_LENGTH:
+            # fin de la tranche : la boucle sera enregistrée après threshold autres tours
+            return
+        self.aborted += 1
+        self.failures[body] = self.failures.get(body, 0) + 1
+
+    def stats(self):
+        """
+        :return: les statistiques du traceur
+        """
+
+        return {"traces": len(self.traces), "entries": self.entries, "exits": self.exits,
+                "aborted": self.aborted}
+
+
+class _TraceCompiler:
+    """
+    Exécution symbolique d'une trace : la pile au-dessus des arguments et l'accumulateur
+    sont des couples (expression Python, genre)
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self.args = ["x%d" % i for i in range(n)]
+        self.stack = []  # le sommet en dernier
+        self.acc = None  # None : l'accumulateur d'entrée (la fermeture)
+        self.lines = []
+        self.temps = 0
+        self.index = 0  # position dans la trace de l'instruction compilée
+
+    def emit(self, line):
+        self.lines.append("        " + line)
+
+    def temp(self, expression, kind):
+        self.temps += 1
+        name = "t%d" % self.temps
+        self.emit("%s = %s" % (name, expression))
+        return name, kind
+
+    def slot(self, i):
+        if i < len(self.stack):
+            return self.stack[-1 - i]
+        i -= len(self.stack)
+        if i >= self.n:
+            raise TraceAborted("access below the arguments")
+        return self.args[i], INT
+
+    def pop(self):
+        if not self.stack:
+            raise TraceAborted("pop of an argument")
+        return self.stack.pop()
+
+    def value(self, kinds=(INT, BOOL)):
+        if self.acc is None or self.acc[1] not in kinds:
+            raise TraceAborted("unexpected accumulator")
+        return self.acc
+
+    @staticmethod
+    def box(value):
+        expression, kind = value
+        if kind == INT:
+            return "from_int(%s)" % expression
+        if kind == BOOL:
+            return "(TRUE if %s else FALSE)" % expression
+        return "acc0"
+
+    def exit(self, pc, acc):
+        """
+        Émet la sortie de la trace vers l'interpréteur, qui reprend en pc
+        """
+
+        items = [self.box(v) for v in reversed(self.stack)] + ["from_int(%s)" % x for x in self.args]
+        return ["vm.push([%s])" % ", ".join(items), "vm.acc = %s" % self.box(acc), "vm.pc = %d" % pc,
+                "tracer.exits += 1"]
+
+    def guard(self, condition, pc, acc):
+        self.emit("if %s:" % condition)
+        for line in self.exit(pc, acc):
+            self.emit("    " + line)
+        # le tour interrompu a exécuté les instructions de la trace jusqu'au branchement
+        self.emit("    return k * length + %d" % (self.index + 1))
+
+    def step(self, pc, inst, next_pc, position):
+        command, args = GENERIC_COMMANDS.get(inst.command, inst.command), inst.args
+        if command == "ACC":
+            self.acc = self.slot(int(args))
+        elif command == "PUSH":
+            self.stack.append(self.acc if self.acc is not None else (None, CLOSURE))
+        elif command == "POP":
+            self.pop()
+        elif command == "CONST":
+            self.acc = (repr(args), INT)
+        elif command == "OFFSETCLOSURE":
+            self.acc = (None, CLOSURE)
+        elif command == "BRANCH":
+            pass
+        elif command == "PRIM":
+            self.prim(args)
+        elif command == "BRANCHIFNOT":
+            one = self.value()
+            jumped = next_pc != pc + 1
+            condition = "%s != 0" if jumped else "%s == 0"
+            self.guard(condition % one[0], pc + 1 if jumped else position(args), one)
+        else:
+            self.fused(pc, command, args, next_pc, position)
+
+    def prim(self, op):
+        if op == "not":
+            one = self.value((BOOL,))
+            self.acc = self.temp("not %s" % one[0], BOOL)
+            return
+        one = self.value()
+        two = self.pop()
+        if two[1] not in (INT, BOOL):
+            raise TraceAborted("closure operand")
+        if op in ARITHMETIC:
+            self.acc = self.temp(ARITHMETIC[op] % (one[0], two[0]), INT)
+        elif op in COMPARISONS:
+            self.acc = self.temp(COMPARISONS[op] % (one[0], two[0]), BOOL)
+        elif op in LOGICAL and one[1] == BOOL and two[1] == BOOL:
+            self.acc = self.temp(LOGICAL[op] % (one[0], two[0]), BOOL)
+        else:
+            raise TraceAborted("unsupported primitive " + str(op))
+
+    def fused(self, pc, command, args, next_pc, position):
+        if command.endswith("I"):
+            n, label = args
+            test = FUSED_TESTS[command[:-1]]
+            one = self.value()
+            jump = self.temp("%d %s %s" % (n, test, one[0]), BOOL)[0]
+        else:
+            label = args
+            test = FUSED_TESTS[command]
+            one = self.value()
+            two = self.pop()
+            if two[1] not in (INT, BOOL):
+                raise TraceAborted("closure operand")
+            jump = self.temp("%s %s %s" % (one[0], test, two[0]), BOOL)[0]
+        # BranchCmp laisse false dans acc s'il saute, true sinon
+        if next_pc != pc + 1:
+            self.guard("not " + jump, pc + 1, ("True", BOOL))
+            self.acc = ("False", BOOL)
+        else:
+            self.guard(jump, position(label), ("False", BOOL))
+            self.acc = ("True", BOOL)
+
+    def close(self, args):
+        """
+        Appel terminal qui termine le tour : les nouveaux arguments remplacent les anciens
+        """
+
+        n, m = args
+        if n != self.n or self.acc is None or self.acc[1] != CLOSURE:
+            raise TraceAborted("not a self tail call")
+        if m != len(self.stack) + self.n:
+            raise TraceAborted("unexpected frame size")
+        new = [self.stack[-1 - i] for i in range(n)]
+        if any(kind != INT for _, kind in new):
+            raise TraceAborted("non-integer argument")
+        self.emit("%s = %s" % (", ".join(self.args), ", ".join(e for e, _ in new)))
+
+
+def compile_trace(path, closing, body, n, tracer, position):
+    """
+    Compile la trace path d'un tour de boucle
+
+    :param path: les triplets (position, instruction, position suivante) exécutés
+    :param closing: les arguments (n, m) de l'APPTERM qui termine le tour
+    :param body: position du début du corps de la fonction
+    :param n: arité de la fonction
+    :param position: fonction qui renvoie la position d'un label
+    :return: une fonction trace(vm) qui exécute au plus fuel tours de la boucle sans
+        dépasser vm.trace_budget instructions, et renvoie le nombre d'instructions
+        exécutées, ou None sans rien exécuter si les arguments ne sont pas des entiers
+        ou si le budget ne permet pas un tour
+    """
+
+    compiler = _TraceCompiler(n)
+    for compiler.index, (pc, inst, next_pc) in enumerate(path):
+        compiler.step(pc, inst, next_pc, position)
+    compiler.close(closing)
+
+    head = ["def trace(vm):",
+            "    turns = min(fuel, vm.trace_budget // length)",
+            "    if turns == 0:",
+            "        return None",
+            "    values = [vm.peek(i) for i in range(%d)]" % n,
+            "    for v in values:",
+            "        if not is_int(v) or v is TRUE or v is FALSE or v is UNIT:",
+            "            return None",
+            "    vm.pop(%d)" % n,
+            "    %s, = [v.value for v in values]" % ", ".join(compiler.args),
+            "    acc0 = vm.acc",
+            "    for k in range(turns):"]
+    tail = ["    vm.push([%s])" % ", ".join("from_int(%s)" % x for x in compiler.args),
+            "    vm.pc = %d" % body,
+            "    return turns * length"]
+    # un tour : les instructions de la trace et l'APPTERM qui la termine
+    namespace = {"from_int": MLValue.from_int, "is_int": _is_int, "TRUE": MLValue.true(),
+                 "FALSE": MLValue.false(), "UNIT": MLValue.unit(), "fuel": tracer.fuel, "tracer": tracer,
+                 "length": len(path) + 1}
+    exec("\n".join(head + compiler.lines + tail), namespace)
+    return namespace["trace"]
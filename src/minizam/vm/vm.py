@@ -1,5 +1,16 @@
 import re
 from .instructions import *
+from .governor import Governor, ResourceExhausted
+from .folding import fold_constants
+from .escape import unbox_blocks
+from .allocprof import AllocationProfiler
+from .metrics import MetricsCollector
+from .hashcons import BlockTable, immutable_blocks
+from .memo import MemoTable, pure_closures
+from .quickening import Quickener
+from .tracing import Tracer
+from .output import OutputChannel
+from .input import InputChannel
 import sys
 
 
@@ -44,6 +55,19 @@ class _Stack:
             del self.items[:n]
         return result
 
+    def pop_tuple(self, n, prefix=()):
+        """
+        Retire les n premiers éléments de la queue et les renvoie dans un tuple
+        précédé de prefix
+
+        :param n: nombre d'éléments à retirer
+        :param prefix: tuple placé devant les éléments retirés
+        """
+
+        result = prefix + tuple(self.items[:n])
+        del self.items[:n]
+        return result
+
     def push(self, elements):
         """
         Empile en tête de stack elements
@@ -51,9 +75,10 @@ class _Stack:
         :param elements : elements à ajouter dans la stack
         """
 
-        if not isinstance(elements, list):
-            elements = [elements]
-        self.items = elements + self.items
+        if isinstance(elements, list):
+            self.items[0:0] = elements
+        else:
+            self.items.insert(0, elements)
 
     def set_element(self, index, value):
         """
@@ -116,6 +141,14 @@ class LineInstruction:
     def __str__(self):
         return "(Label : %s, Command : %s, args : %s)" % (self.label, self.command, self.args)
 
+    @staticmethod
+    def parse(text):
+        """
+        Découpe le texte d'un programme en triplets (label, commande, arguments)
+        """
+
+        return re.findall(r'(?:(\w+):)?\t(\w+)(.*)', text)
+
     @staticmethod
     def build(line):
         label = line[0] if line[0] else None
@@ -125,6 +158,36 @@ class LineInstruction:
         return LineInstruction(label, command, args)
 
 
+class RunResult:
+    """
+    Résultat d'une exécution de la machine
+    """
+
+    STOPPED = "stopped"  # STOP atteint
+    UNCAUGHT = "uncaught"  # exception non rattrapée, acc contient l'exception
+    EXHAUSTED = "exhausted"  # une limite de ressources a été dépassée
+    RUNNING = "running"  # quantum épuisé, l'exécution se poursuit avec resume
+
+    def __init__(self, status, acc, instructions=None, exhausted=None, output=None):
+        """
+        :param status: STOPPED, UNCAUGHT, EXHAUSTED ou RUNNING
+        :param acc: la valeur de l'accumulateur à la fin de l'exécution
+        :param instructions: le nombre d'instructions exécutées, si compté
+        :param exhausted: l'exception ResourceExhausted qui a interrompu l'exécution
+        :param output: le texte écrit par le programme si sa sortie est capturée en mémoire
+        """
+
+        self.status = status
+        self.acc = acc
+        self.instructions = instructions
+        self.exhausted = exhausted
+        self.output = output
+
+    def __repr__(self):
+        return "RunResult(status : %s, acc : %s, instructions : %s, exhausted : %s, output : %r)" % (
+            self.status, self.acc, self.instructions, self.exhausted, self.output)
+
+
 class MiniZamVM:
     """
     Class qui contient les fonctions principales de la machine virtuelle
@@ -139,16 +202,40 @@ class MiniZamVM:
                     "GETVECTITEM": GetVectItem(), "SETFIELD": SetField(), "SETVECTITEM": SetVectItem(),
                     "ASSIGN": Assign(),
                     "PUSHTRAP": PushTrap(), "POPTRAP": PopTrap(), "RAISE": Raise(),
-                    "STOP": Stop()}
+                    "STOP": Stop(), "MEMOAPPLY": MemoApply(), "MEMOSTORE": MemoStore(),
+                    "TRACEAPPTERM": TraceAppTerm(), "HCMAKEBLOCK": HashConsMakeBlock(),
+                    "UNBOXAPPLY": UnboxApply(), "UNBOXAPPTERM": UnboxAppTerm(),
+                    **fused_branch_instructions(), **quick_instructions(), **profiled_instructions()}
 
-    def __init__(self):
+    SLICE = 10000  # nombre d'instructions exécutées par appel à step dans run
+
+    def __init__(self, output=None, input=None):
         """
         Initialisation de la machine, la mémoire à des tableau et liste vide et pc à zéro
+
+        :param output: le canal de sortie de PRIM print, par défaut la sortie standard
+        :param input: le canal d'entrée des PRIM read_*, par défaut l'entrée standard
         """
 
         self.prog = []
+        self.positions = None  # index label -> position, construit à la demande
+        self.entry_points = {}  # cache pointeur de code -> (arité, début du corps)
+        self.running = False
+        self.status = None
+        self.governor = None
+        self.heap_words = 0  # nombre de mots alloués pour les blocs et les fermetures
+        self.memo = None  # MemoTable des fonctions pures, voir enable_memoization
+        self.tracer = None  # Tracer des boucles terminales, voir enable_tracing
+        self.trace_budget = 0  # instructions qu'une trace peut exécuter sans dépasser la tranche
+        self.traced = 0  # instructions exécutées par la dernière trace, comptées par step
+        self.quickener = None  # Quickener des instructions spécialisées, voir enable_quickening
+        self.blocks = None  # BlockTable des blocs partagés, voir enable_hash_consing
+        self.allocations = None  # AllocationProfiler, voir enable_allocation_profiling
+        self.metrics = None  # MetricsCollector de la mesure de l'exécution, voir enable_metrics
+        self.output = output if output is not None else OutputChannel()
+        self.input = input if input is not None else InputChannel()
         self.stack = _Stack()  # structure LIFO
-        self.env = []  # un collection de mlvalue
+        self.env = ()  # tuple de mlvalue, partagé par les fermetures
         self.pc = 0  # pointeur de code vers l’instruction courante
         self.acc = MLValue.unit()
         self.extra_args = 0  # le nombre d’arguments restant a appliquer à une fonction
@@ -175,6 +262,17 @@ class MiniZamVM:
 
         return self.stack.pop(n)
 
+    def pop_tuple(self, n, prefix=()):
+        """
+        Retire n éléments en tête de stack et les renvoie dans un tuple précédé de prefix
+
+        :param n: le nombre d'éléments à retirer
+        :param prefix: les valeurs placées en tête du tuple
+        :return: le tuple prefix + éléments retirés
+        """
+
+        return self.stack.pop_tuple(n, prefix)
+
     def push(self, elements):
         """
         Empile en tête de stack un élément
@@ -235,9 +333,70 @@ class MiniZamVM:
         :return: renvoie la position du label dans prog
         """
 
-        inst = next(filter(lambda x: x.label == label, self.prog))
+        if self.positions is None:
+            self.positions = {inst.label: i for i, inst in enumerate(self.prog) if inst.label}
+
+        return self.positions[label]
+
+    def invalidate_caches(self):
+        """
+        Oublie les positions des labels et les points d'entrée calculés sur prog
+        """
+
+        self.positions = None
+        self.entry_points = {}
+
+    def get_entry_point(self, pc):
+        """
+        Renvoie l'arité et le début du corps du code situé à pc.
+        Un code qui commence par GRAB n attend n+1 arguments et son corps commence
+        après le GRAB, tout autre code est unaire.
+
+        :param pc: pointeur de code d'une fermeture
+        :return: le couple (arité, position du corps)
+        """
 
-        return self.prog.index(inst)
+        entry = self.entry_points.get(pc)
+        if entry is None:
+            if pc < len(self.prog) and self.prog[pc].command in ("GRAB", PROFILED["GRAB"]):
+                entry = (self.prog[pc].args + 1, pc + 1)
+            else:
+                entry = (1, pc)
+            self.entry_points[pc] = entry
+        return entry
+
+    def make_closure(self, pc, env):
+        """
+        Crée une fermeture qui porte son point d'entrée pré-calculé
+
+        :param pc: pointeur de code de la fermeture
+        :param env: environnement de la fermeture
+        :return: la fermeture
+        """
+
+        self.heap_words += len(env) + 1
+        return MLValue.from_closure(pc, env, self.get_entry_point(pc))
+
+    def apply_closure(self, nargs):
+        """
+        Branche sur le code de la fermeture contenue dans acc avec nargs arguments.
+        Lorsque assez d'arguments sont fournis, le GRAB d'entrée est sauté.
+
+        :param nargs: le nombre d'arguments disponibles pour la fermeture
+        """
+
+        closure = self.acc
+        pc, self.env = closure.value
+        entry = closure.entry
+        if entry is None:
+            entry = self.get_entry_point(pc)
+        arity, body = entry
+        if nargs >= arity:
+            self.pc = body
+            self.extra_args = nargs - arity
+        else:
+            self.pc = pc
+            self.extra_args = nargs - 1
 
     def change_context(self):
         """
@@ -255,23 +414,175 @@ class MiniZamVM:
         print('\n\tpc = ', self.pc, '\n\n\taccu =', self.acc, ' ',
               "\n\n\tstack=", self.stack.items, end="\n")
 
-    def run(self):
+    def run(self, limits=None, quantum=None):
         """
         Méthode qui exécute les instructions du programme
+
+        :param limits: ResourceLimits optionnelles, vérifiées périodiquement
+        :param quantum: nombre maximal d'instructions à exécuter avant de rendre la main,
+            l'exécution se poursuit ensuite avec resume
+        :return: le RunResult de l'exécution
+        """
+
+        self.start(limits)
+        return self.resume(quantum)
+
+    def start(self, limits=None):
+        """
+        Prépare une exécution, poursuivie par resume
+
+        :param limits: ResourceLimits optionnelles pour toute l'exécution
+        """
+
+        self.running = True
+        self.status = RunResult.STOPPED
+        self.governor = None if limits is None else Governor(self, limits)
+        if self.metrics is not None:
+            self.metrics.start(self)
+
+    def resume(self, quantum=None):
+        """
+        Poursuit l'exécution commencée par start
+
+        :param quantum: nombre maximal d'instructions à exécuter, None pour aller jusqu'au bout
+        :return: le RunResult de l'exécution, de statut RUNNING si elle n'est pas terminée
+        """
+
+        try:
+            governor = self.governor
+            if governor is not None:
+                return self._resume_governed(governor, quantum)
+
+            metrics = self.metrics
+            executed = None
+            if quantum is None:
+                while self.running:
+                    n = self.step(self.SLICE)
+                    if metrics is not None:
+                        metrics.update(self, n)
+            else:
+                executed = self.step(quantum)
+                if metrics is not None:
+                    metrics.update(self, executed)
+            return self._result(executed)
+        except BaseException:
+            self.output.flush()
+            raise
+
+    def _result(self, instructions, exhausted=None):
+        """
+        Construit le RunResult de l'état courant de la machine
+        """
+
+        if not self.running and self.metrics is not None:
+            self.metrics.finish(self)
+        status = self.status if not self.running else RunResult.RUNNING
+        return RunResult(status, self.acc, instructions, exhausted, self.output.getvalue())
+
+    def _resume_governed(self, governor, quantum):
+        """
+        Exécute le programme par tranches en vérifiant les limites entre deux tranches
+        """
+
+        try:
+            while self.running and (quantum is None or quantum > 0):
+                n = governor.next_slice()
+                if quantum is not None:
+                    n = min(n, quantum)
+                executed = self.step(n)
+                if self.metrics is not None:
+                    self.metrics.update(self, executed)
+                governor.check(executed)
+                if quantum is not None:
+                    quantum -= executed
+        except ResourceExhausted as exhausted:
+            self.halt(RunResult.EXHAUSTED)
+            return self._result(governor.instructions, exhausted)
+        return self._result(governor.instructions)
+
+    def run_until(self, pc):
+        """
+        Exécute le programme jusqu'à ce que pc atteigne la position donnée
+
+        :param pc: une position dans prog ou un label
+        :return: True si la position est atteinte, False si le programme s'est arrêté avant
+        """
+
+        if not isinstance(pc, int):
+            pc = self.get_position(pc)
+        self.running = True
+        self.status = RunResult.STOPPED
+        while self.running and self.pc != pc:
+            self.step(1)
+        return self.running
+
+    def step(self, n):
         """
+        Exécute au plus n instructions, moins si le programme s'arrête
 
-        while True:
+        :param n: le nombre maximal d'instructions à exécuter
+        :return: le nombre d'instructions exécutées
+        """
+
+        if self.tracer is not None:
+            return self._step_traced(n)
+        prog = self.prog
+        instructions = self.instructions
+        for i in range(n):
+            if not self.running:
+                return i
             # print('\n\\item',self.prog[self.pc].command, ' pc =', self.pc)
-            inst = self.prog[self.increment_pc()]
-            self.instructions[inst.command].execute(self, inst.args)
+            inst = prog[self.increment_pc()]
+            instructions[inst.command].execute(self, inst.args)
             # self.print_current_state()
+        return n
+
+    def _step_traced(self, n):
+        """
+        step d'une machine qui compile ses boucles : une instruction peut lancer une trace,
+        qui exécute au plus trace_budget instructions et en reporte le nombre dans traced
+        """
+
+        prog = self.prog
+        instructions = self.instructions
+        executed = 0
+        while executed < n and self.running:
+            self.trace_budget = n - executed - 1
+            self.traced = 0
+            inst = prog[self.increment_pc()]
+            instructions[inst.command].execute(self, inst.args)
+            executed += 1 + self.traced
+        self.trace_budget = 0
+        return executed
+
+    def halt(self, status=RunResult.STOPPED):
+        """
+        Arrête la boucle d'exécution après l'instruction courante
+
+        :param status: la raison de l'arrêt, voir RunResult
+        """
+
+        self.running = False
+        self.status = status
+        self.output.flush()
+
+    def print_result(self):
+        """
+        Affiche la valeur finale de l'accumulateur, sur une ligne à elle après la sortie
+        du programme
+        """
+
+        self.output.flush()
+        if not self.output.at_line_start:
+            print()
+        print("acc = ", self.acc)
 
     def shutdown(self):
         """
         Fin de l’exécution du programme
         """
 
-        print("acc = ", self.acc)
+        self.print_result()
         exit()
 
     def load_file(self, file):
@@ -281,15 +592,263 @@ class MiniZamVM:
         """
 
         with open(file, "r") as f:
-            lines = re.findall(r'(?:(\w+):)?\t(\w+)(.*)', f.read())
-            self.prog = list(map(LineInstruction.build, lines))
+            self.load_text(f.read())
+
+    def load_text(self, text):
+        """
+        Chargement d'un programme donné sous forme de texte dans le registre prog
+        """
+
+        self.prog = list(map(LineInstruction.build, LineInstruction.parse(text)))
+        self.invalidate_caches()
+
+    def load_shared(self, prog):
+        """
+        Chargement d'un programme d'un segment de code partagé (voir codesegment.ProgramView)
+        sans le recopier : les positions des labels sont celles du segment
+        """
+
+        self.prog = prog
+        self.invalidate_caches()
+        self.positions = prog.positions
 
     def load_file_optimized(self, file):
         self.load_file(file)
-        for i, line in enumerate(self.prog):
-            if self.prog[i].command == "APPLY" and self.prog[i + 1].command == "RETURN":
-                self.prog[i].command = "APPTERM"
-                n = self.prog[i].args
-                m = n + self.prog[i + 1].args
-                self.prog[i].args = [n, m]
-                del self.prog[i + 1]
+        self.optimize()
+
+    def optimize(self):
+        """
+        Applique les passes d'optimisation au programme chargé
+        """
+
+        self.fold_constants()
+        self.merge_tail_calls()
+        self.unbox_blocks()
+        self.fuse_branches()
+
+    def enable_memoization(self, max_entries=4096):
+        """
+        Active la mémoïsation des fonctions pures du programme chargé : leurs applications
+        complètes à des entiers sont rangées dans une table LRU de max_entries résultats.
+        À appeler après optimize, les APPLY (et PROFAPPLY) devenant des MEMOAPPLY (et
+        PROFMEMOAPPLY) ; l'analyse voit à travers les commandes des autres enable_*.
+
+        :return: la MemoTable, dont stats() donne le taux de succès
+        """
+
+        self._check_rewritable("enable_memoization")
+        if self.memo is not None:
+            return self.memo
+        pure = pure_closures(self.prog, self.get_position)
+        for inst in self.prog:
+            if inst.command == "APPLY":
+                inst.command = "MEMOAPPLY"
+            elif inst.command == PROFILED["APPLY"]:
+                inst.command = PROFILED["MEMOAPPLY"]
+        self.prog.append(LineInstruction(None, "MEMOSTORE", []))
+        self.invalidate_caches()
+        self.memo = MemoTable(pure, len(self.prog) - 1, max_entries)
+        return self.memo
+
+    def enable_tracing(self, threshold=50, fuel=10000):
+        """
+        Active la compilation des boucles : une fonction qui s'appelle elle-même par
+        APPTERM avec des arguments entiers est exécutée par une boucle Python spécialisée
+        après threshold tours. À appeler après optimize, les APPTERM devenant des TRACEAPPTERM.
+
+        :param fuel: nombre maximal de tours d'une trace avant de rendre la main
+            à l'interpréteur (et au contrôle des ressources)
+        :return: le Tracer, dont stats() donne le nombre de traces compilées
+        """
+
+        self._check_rewritable("enable_tracing")
+        if self.tracer is not None:
+            return self.tracer
+        for inst in self.prog:
+            if inst.command == "APPTERM":
+                inst.command = "TRACEAPPTERM"
+        self.tracer = Tracer(threshold, fuel)
+        return self.tracer
+
+    def fold_constants(self):
+        """
+        Propage les constantes dans les blocs de base et évalue au chargement les PRIM
+        et les BRANCHIFNOT dont les opérandes sont connus (voir folding.ConstantFolder)
+
+        :return: les compteurs des transformations : ACC remplacés par CONST ("propagated"),
+            PRIM évaluées ("folded"), BRANCHIFNOT résolus ("branches") et instructions
+            supprimées ("removed")
+        """
+
+        self.prog, stats = fold_constants(self.prog, LineInstruction)
+        self.invalidate_caches()
+        return stats
+
+    def unbox_blocks(self):
+        """
+        Supprime l'allocation des blocs qui n'échappent pas : un MAKEBLOCK suivi d'un GETFIELD,
+        ou le bloc passé à une fonction qui ne fait que le déstructurer, dont les champs
+        restent dans la pile (voir escape.BlockUnboxer). À appeler avant fuse_branches.
+
+        :return: les compteurs des transformations : MAKEBLOCK; GETFIELD remplacés ("local"),
+            fonctions copiées pour recevoir les champs ("functions") et appels remplacés ("calls")
+        """
+
+        self.prog, stats = unbox_blocks(self.prog, LineInstruction)
+        self.invalidate_caches()
+        return stats
+
+    def enable_quickening(self):
+        """
+        Active l'accélération du programme chargé : à sa première exécution, chaque PRIM,
+        ACC, CONST et ENVACC est remplacé par une variante spécialisée selon ses opérandes,
+        désoptimisée si ses conditions ne sont plus vérifiées. À appeler après optimize,
+        ces instructions devenant des QPRIM, QACC, QCONST et QENVACC.
+
+        :return: le Quickener, dont stats() donne le nombre d'instructions spécialisées
+        """
+
+        self._check_rewritable("enable_quickening")
+        if self.quickener is not None:
+            return self.quickener
+        for inst in self.prog:
+            if inst.command in QUICKENED:
+                inst.command = QUICKENED[inst.command]
+        self.quickener = Quickener()
+        return self.quickener
+
+    def enable_hash_consing(self):
+        """
+        Active le partage des blocs (hash-consing) si le programme chargé ne modifie
+        jamais un bloc (ni SETFIELD ni SETVECTITEM) : un MAKEBLOCK dont les champs sont
+        ceux d'un bloc encore vivant rend ce bloc. Les MAKEBLOCK deviennent des HCMAKEBLOCK.
+
+        :return: la BlockTable, dont stats() donne le nombre de blocs partagés,
+            None si le programme modifie des blocs
+        """
+
+        self._check_rewritable("enable_hash_consing")
+        if self.blocks is not None:
+            return self.blocks
+        if not immutable_blocks(self.prog):
+            return None
+        for inst in self.prog:
+            if inst.command == "MAKEBLOCK":
+                inst.command = "HCMAKEBLOCK"
+        self.blocks = BlockTable()
+        return self.blocks
+
+    def enable_allocation_profiling(self, interval=1000):
+        """
+        Active le profil des allocations : chaque bloc, fermeture ou bloc de retour alloué
+        est attribué à la position de l'instruction qui l'alloue, et suivi jusqu'à sa
+        libération. À appeler en dernier, après optimize et les autres enable_*, les
+        instructions qui allouent devenant des PROFMAKEBLOCK, PROFCLOSURE, PROFAPPLY...
+
+        :param interval: nombre d'allocations entre deux points de la série des octets vivants
+        :return: l'AllocationProfiler, dont report(n) donne les n sites qui allouent le plus
+        """
+
+        self._check_rewritable("enable_allocation_profiling")
+        if self.allocations is not None:
+            return self.allocations
+        for inst in self.prog:
+            if inst.command in PROFILED:
+                inst.command = PROFILED[inst.command]
+        self.allocations = AllocationProfiler(self.prog, interval)
+        return self.allocations
+
+    def enable_metrics(self, registry):
+        """
+        Active la mesure de l'exécution dans registry (voir metrics.py) : instructions
+        exécutées, appels, exceptions, mots alloués et profondeur maximale de la pile,
+        reportés entre deux tranches d'exécution, puis le statut et la durée de chaque exécution.
+        Les appels et les RAISE sont comptés par une copie de la table des instructions
+        propre à la machine.
+
+        :param registry: le MetricsRegistry, qui peut être partagé par plusieurs machines
+        :return: le MetricsCollector de la machine
+        """
+
+        if self.metrics is not None:
+            return self.metrics
+        self.instructions = counted_instructions(self.instructions)
+        self.metrics = MetricsCollector(registry)
+        return self.metrics
+
+    def _check_rewritable(self, name):
+        """
+        Vérifie que le programme chargé peut être réécrit en place : un programme
+        partagé (load_shared) est en lecture seule, ses instructions sont communes à
+        plusieurs positions et à plusieurs processus
+
+        :raise ValueError: si le programme est partagé
+        """
+
+        if not isinstance(self.prog, list):
+            raise ValueError("%s rewrites the program, which is a read-only shared view "
+                             "(load_shared); load it with load_text instead." % name)
+
+    def merge_tail_calls(self):
+        """
+        Remplace les séquences APPLY n; RETURN m par APPTERM n, n+m.
+        Un RETURN qui porte un label est conservé pour les branchements qui y mènent.
+        """
+
+        prog = self.prog
+        i = 0
+        while i + 1 < len(prog):
+            if prog[i].command == "APPLY" and prog[i + 1].command == "RETURN":
+                n = prog[i].args
+                m = n + prog[i + 1].args
+                prog[i].command = "APPTERM"
+                prog[i].args = [n, m]
+                if not prog[i + 1].label:
+                    del prog[i + 1]
+            i += 1
+        self.invalidate_caches()
+
+    def fuse_branches(self):
+        """
+        Remplace les comparaisons suivies d'un BRANCHIFNOT par un branchement fusionné :
+            PUSH; CONST n; PRIM op; BRANCHIFNOT L  ->  B<non op>I n, L
+            PRIM op; BRANCHIFNOT L                 ->  B<non op> L
+        Une séquence dont une instruction interne porte un label n'est pas fusionnée.
+
+        :return: le nombre de branchements fusionnés
+        """
+
+        prog = self.prog
+        fused = []
+        count = 0
+        i = 0
+        while i < len(prog):
+            inst = prog[i]
+            if i + 3 < len(prog) and inst.command == "PUSH" and prog[i + 1].command == "CONST" \
+                    and not prog[i + 1].label and not prog[i + 2].label \
+                    and self._is_compare_branch(prog[i + 2], prog[i + 3]):
+                name = FUSED_BRANCHES[prog[i + 2].args][0] + "I"
+                fused.append(LineInstruction(inst.label, name, [prog[i + 1].args, prog[i + 3].args]))
+                i += 4
+            elif i + 1 < len(prog) and self._is_compare_branch(inst, prog[i + 1]):
+                name = FUSED_BRANCHES[inst.args][0]
+                fused.append(LineInstruction(inst.label, name, prog[i + 1].args))
+                i += 2
+            else:
+                fused.append(inst)
+                i += 1
+                continue
+            count += 1
+        self.prog = fused
+        self.invalidate_caches()
+        return count
+
+    @staticmethod
+    def _is_compare_branch(prim, branch):
+        """
+        Vérifie que prim et branch forment un couple PRIM comparaison; BRANCHIFNOT
+        sans label sur le BRANCHIFNOT
+        """
+
+        return prim.command == "PRIM" and prim.args in FUSED_BRANCHES \
+            and branch.command == "BRANCHIFNOT" and not branch.label
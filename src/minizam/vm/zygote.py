@@ -0,0 +1,223 @@
+"""
+Serveur zygote : un processus qui a déjà importé la machine (instructions, passes
+d'optimisation, mémoïsation, traces) et qui garde les programmes décodés en cache,
+en attente sur une socket Unix. Pour chaque requête du client (client.py), il crée
+par fork un fils qui hérite de tout cet état, branche ses entrée, sortie et erreur
+sur celles du client (descripteurs transmis par la socket) et exécute le programme
+comme ocamlzam, sans payer le démarrage de l'interpréteur ni les imports.
+
+Le cache est rempli par le père, avant le fork : les passes qui réécrivent le programme
+(enable_memoization, enable_tracing, l'accélération) modifient la copie du fils,
+jamais celle du cache. Une entrée du cache est relue si le fichier a changé.
+
+    python -m src.minizam.vm.zygote [--socket chemin] [--metrics fichier]
+
+Avec --metrics, le serveur réécrit après chaque requête le fichier des métriques de son
+cache (succès et échecs) et des requêtes servies, au format texte de Prometheus.
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import traceback
+
+from .client import default_socket, decode
+from .metrics import MetricsRegistry
+from .vm import MiniZamVM
+
+
+def execute(prog, options):
+    """
+    Exécute un programme décodé avec les options de ocamlzam (-m, -t ; -o est appliqué
+    au chargement)
+
+    :return: le code de sortie
+    """
+
+    vm = MiniZamVM()
+    vm.prog = prog
+    if "-m" in options:
+        vm.enable_memoization()
+    if "-t" in options:
+        vm.enable_tracing()
+    vm.run()
+    # shutdown terminerait le fils par exit : le serveur le termine par os._exit
+    vm.print_result()
+    return 0
+
+
+class ZygoteServer:
+    """
+    Serveur qui exécute chaque requête dans un fils créé par fork
+    """
+
+    def __init__(self, path=None, backlog=64, metrics=None):
+        """
+        :param path: le chemin de la socket Unix, par défaut client.default_socket()
+        :param backlog: le nombre de connexions en attente d'accept
+        :param metrics: le chemin du fichier des métriques, None pour ne pas l'écrire
+        """
+
+        self.path = path or default_socket()
+        self.backlog = backlog
+        self.programs = {}  # (chemin, optimisé) -> (date de modification, taille, prog)
+        self.sock = None
+        self.served = 0
+        self.metrics_path = metrics
+        self.registry = MetricsRegistry()
+        self.cache_hits = self.registry.counter("minizam_loader_cache_hits_total",
+                                                "Programs found decoded in the zygote cache.")
+        self.cache_misses = self.registry.counter("minizam_loader_cache_misses_total",
+                                                  "Programs decoded by the zygote (absent or changed).")
+        self.requests = self.registry.counter("minizam_zygote_requests_total", "Run requests forked.")
+
+    def load(self, program, optimize):
+        """
+        :return: le programme décodé (et optimisé) du fichier program, lu dans le cache
+            s'il n'a pas changé
+        """
+
+        stat = os.stat(program)
+        key = (program, optimize)
+        entry = self.programs.get(key)
+        if entry is None or entry[:2] != (stat.st_mtime_ns, stat.st_size):
+            self.cache_misses.inc()
+            vm = MiniZamVM()
+            vm.load_file(program)
+            if optimize:
+                vm.optimize()
+            entry = (stat.st_mtime_ns, stat.st_size, vm.prog)
+            self.programs[key] = entry
+            # les objets du cache sortent du ramasse-miettes : les fils ne touchent
+            # pas leurs pages en les parcourant
+            gc.freeze()
+        else:
+            self.cache_hits.inc()
+        return entry[2]
+
+    def listen(self):
+        """
+        Crée la socket du serveur, en remplaçant celle d'un serveur arrêté
+        """
+
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(self.path)
+        self.sock.listen(self.backlog)
+
+    def serve_forever(self):
+        """
+        Traite les requêtes jusqu'à une requête stop
+        """
+
+        # les fils terminés sont récoltés par le système
+        signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+        gc.freeze()
+        try:
+            while True:
+                conn, _ = self.sock.accept()
+                with conn:
+                    try:
+                        message, fds, _, _ = socket.recv_fds(conn, 65536, 3)
+                        command, fields = decode(message)
+                    except (OSError, ValueError):
+                        continue
+                    try:
+                        if command == "stop":
+                            conn.sendall(b"0")
+                            return
+                        if command == "run" and fields:
+                            self.handle(conn, fields[0], fields[1:], fds)
+                    finally:
+                        for fd in fds:
+                            os.close(fd)
+        finally:
+            self.close()
+
+    def handle(self, conn, program, options, fds):
+        """
+        Exécute le programme dans un fils, qui répond au client avec le code de sortie
+
+        :param program: le chemin absolu du programme
+        :param options: les options de ocamlzam
+        :param fds: les descripteurs d'entrée, de sortie et d'erreur du client
+        """
+
+        try:
+            prog = self.load(program, "-o" in options)
+        except Exception:
+            if len(fds) == 3:
+                os.write(fds[2], traceback.format_exc().encode("utf-8"))
+            self.write_metrics()
+            conn.sendall(b"1")
+            return
+
+        # avant le fork : le client ne reçoit sa réponse qu'après l'écriture des métriques
+        self.requests.inc()
+        self.write_metrics()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                self.sock.close()
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                for target, fd in enumerate(fds):
+                    os.dup2(fd, target)
+                # les flux de sys écrivent sur les descripteurs du client
+                sys.stdin = open(0, "r", closefd=False)
+                sys.stdout = open(1, "w", closefd=False)
+                sys.stderr = open(2, "w", closefd=False)
+                code = execute(prog, options)
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                try:
+                    sys.stdout.flush()
+                    sys.stderr.flush()
+                    conn.sendall(str(code).encode("utf-8"))
+                finally:
+                    os._exit(code)
+        self.served += 1
+
+    def write_metrics(self):
+        """
+        Réécrit le fichier des métriques, s'il y en a un
+        """
+
+        if self.metrics_path is not None:
+            self.registry.write(self.metrics_path)
+
+    def close(self):
+        """
+        Ferme et retire la socket du serveur
+        """
+
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--socket", default=None, help="chemin de la socket Unix")
+    parser.add_argument("--metrics", default=None, help="fichier des métriques, au format de Prometheus")
+    args = parser.parse_args(argv)
+
+    server = ZygoteServer(args.socket, metrics=args.metrics)
+    server.listen()
+    # SIGTERM arrête le serveur proprement (la socket est retirée)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print("zygote server listening on %s" % server.path, flush=True)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -6,9 +6,36 @@ import time
 
 if __name__ == '__main__':
     vm = MiniZamVM()
-    if sys.argv[1] == "-o":
-        vm.load_file_optimized(sys.argv[2])
-        vm.run()
+    # options : -o optimise le programme, -m mémoïse ses fonctions pures,
+    # -t compile ses boucles terminales, -a affiche le profil de ses allocations,
+    # -s écrit les piles échantillonnées dans <programme>.folded, -p écrit les métriques
+    # de l'exécution dans <programme>.prom
+    options, path = sys.argv[1:-1], sys.argv[-1]
+    if "-o" in options:
+        vm.load_file_optimized(path)
+    else:
+        vm.load_file(path)
+    if "-m" in options:
+        vm.enable_memoization()
+    if "-t" in options:
+        vm.enable_tracing()
+    if "-a" in options:
+        vm.enable_allocation_profiling()
+    if "-p" in options:
+        from src.minizam.vm.metrics import MetricsRegistry
+
+        vm.enable_metrics(MetricsRegistry())
+    if "-s" in options:
+        # importé à la demande : le démarrage sans option reste aussi court que possible
+        from src.minizam.vm.sampling import SamplingProfiler
+
+        with SamplingProfiler(vm) as profiler:
+            vm.run()
+        profiler.write_collapsed(path + ".folded")
     else:
-        vm.load_file(sys.argv[1])
         vm.run()
+    if vm.allocations is not None:
+        sys.stderr.write(vm.allocations.report())
+    if vm.metrics is not None:
+        vm.metrics.registry.write(path + ".prom")
+    vm.shutdown()
@@ -0,0 +1,7 @@
+from src.minizam.vm.client import main
+import sys
+
+if __name__ == '__main__':
+    # client du serveur zygote (python -m src.minizam.vm.zygote) : mêmes options que
+    # ocamlzam, le programme est exécuté par un processus préchargé
+    sys.exit(main())